@@ -0,0 +1,3 @@
+"""
+Benchmarks des dashboards (à lancer depuis la racine : python -m benchmarks.<script>)
+"""
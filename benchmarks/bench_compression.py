@@ -0,0 +1,108 @@
+"""
+Taille des réponses : compaction des figures et compression HTTP.
+
+Sur des transactions synthétiques (365 jours pour l'exercice 2, cube
+chargé en mémoire), chaque callback de l'exercice 2 et le layout de
+l'exercice 1 (figures intégrées) sont demandés au serveur Flask du
+dashboard (client de test), figures compactées ou non
+(moteur.figures.FIGURES_COMPACTES). Pour chaque réponse : octets du corps
+JSON, puis compressé en gzip et en brotli (si le module est installé),
+comme par moteur.compression.
+
+Usage : python -m benchmarks.bench_compression [nb_lignes] [--json]
+"""
+
+import contextlib
+import io
+import json
+import sys
+
+import moteur.figures
+from benchmarks.donnees_synthetiques import generer_transactions, generer_transactions_kpi
+from benchmarks.suite import SourceFigee
+from moteur.compression import compresseurs
+
+# Valeurs des entrées des callbacks de l'exercice 2 (tous les filtres à ALL)
+ENTREES = {
+    'filtre-magasin.value': 'ALL', 'filtre-categorie.value': 'ALL',
+    'filtre-paiement.value': 'ALL', 'filtre-periode.start_date': None,
+    'filtre-periode.end_date': None, 'graph-ventes-quotidiennes.relayoutData': None,
+    'tableau-transactions.page_current': 0, 'tableau-transactions.page_size': 15,
+    'tableau-transactions.sort_by': [], 'tableau-transactions.filter_query': '',
+}
+
+
+def requetes_callbacks(client):
+    """(section, corps) de chaque callback dont les entrées sont connues"""
+    for dependance in client.get('/_dash-dependencies').get_json():
+        cles = [f"{e['id']}.{e['property']}" for e in dependance['inputs']]
+        if not all(cle in ENTREES for cle in cles):
+            continue
+        sorties = [dict(zip(('id', 'property'), sortie.split('.')))
+                   for sortie in dependance['output'].strip('.').split('...')]
+        section = '+'.join(dict.fromkeys(sortie['id'] for sortie in sorties))
+        yield section, {
+            'output': dependance['output'], 'outputs': sorties, 'changedPropIds': [],
+            'inputs': [{'id': e['id'], 'property': e['property'], 'value': ENTREES[cle]}
+                       for e, cle in zip(dependance['inputs'], cles)],
+        }
+
+
+def tailles(corps):
+    """Octets du corps : brut, puis par encodage disponible"""
+    return {'brut': len(corps), **{nom: len(fonction(corps))
+                                   for nom, fonction in reversed(compresseurs('auto'))}}
+
+
+def mesurer(dashboards, compactes):
+    """Tailles de chaque réponse, figures compactées ou non"""
+    moteur.figures.FIGURES_COMPACTES = compactes
+    ex1, ex2 = dashboards
+    ex2.cache.vider()
+    resultats = {'ex1/layout': tailles(ex1.server.test_client().get('/_dash-layout').get_data())}
+    client = ex2.server.test_client()
+    for section, corps in requetes_callbacks(client):
+        reponse = client.post('/_dash-update-component', json=corps)
+        assert reponse.status_code == 200, (section, reponse.status_code)
+        resultats[f'ex2/{section}'] = tailles(reponse.get_data())
+    return resultats
+
+
+def main(nb_lignes=100_000):
+    from moteur.kpi import AgregatsKPI, ServiceKPI
+    from moteur.schema import SCHEMA_KPI, SCHEMA_VENTES, appliquer_schema
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import exercice1_dashboard_kpi as ex1
+        import exercice2_dashboard_style as ex2
+    df, _, _ = appliquer_schema(generer_transactions_kpi(nb_lignes, categories=True), SCHEMA_KPI)
+    ex1.service_kpi = ServiceKPI(SourceFigee(AgregatsKPI(df, quantiles=ex1.MODE_QUANTILES)))
+    df, _, _ = appliquer_schema(generer_transactions(nb_lignes, categories=True), SCHEMA_VENTES)
+    ex2.source = SourceFigee(ex2.preparer_dashboard(df))
+    del df
+
+    avant = mesurer((ex1, ex2), False)
+    apres = mesurer((ex1, ex2), True)
+    encodages = list(avant['ex1/layout'])
+    print(f"\n{nb_lignes} transactions ; octets par réponse, figures d'origine -> compactées\n")
+    print(f"{'réponse':<58}" + ''.join(f'{nom:>22}' for nom in encodages))
+    totaux = {cle: [0, 0] for cle in encodages}
+    for section in avant:
+        cellules = []
+        for nom in encodages:
+            a, b = avant[section][nom], apres[section][nom]
+            totaux[nom][0] += a
+            totaux[nom][1] += b
+            cellules.append(f'{a:>9} -> {b:>9}')
+        print(f'{section[:57]:<58}' + ''.join(f'{c:>22}' for c in cellules))
+    brut = totaux['brut'][0]
+    print(f"\n{'total':<58}" + ''.join(f'{a:>9} -> {b:>9}'.rjust(22) for a, b in totaux.values()))
+    print("gain sur le JSON brut d'origine".ljust(58)
+          + ''.join(f'{1 - b / brut:>22.0%}' for _, b in totaux.values()))
+    return {'avant': avant, 'apres': apres}
+
+
+if __name__ == '__main__':
+    resultats = main(*(int(a) for a in sys.argv[1:] if not a.startswith('--')))
+    if '--json' in sys.argv:
+        print(json.dumps(resultats, indent=2))
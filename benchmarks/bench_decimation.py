@@ -0,0 +1,79 @@
+"""
+Ventes quotidiennes de l'exercice 2 : résolution adaptative (moteur.series)
+contre un point par jour.
+
+Avant : la figure recevait un point par jour de la période filtrée, soit
+des milliers de marqueurs sur plusieurs années. Après : au-delà du budget
+de points (POINTS_SERIE), la série est sommée par semaine ou par mois, ou
+décimée par LTTB ; une zone zoomée de quelques mois revient au jour.
+
+Pour chaque cas (période complète, zoom de 90 jours) : nombre de points,
+taille JSON du Patch envoyé, temps de la section (fonction du dashboard ;
+l'import du module charge aussi le classeur de l'exercice 2) sur la
+sélection complète d'un cube synthétique de plusieurs années. Contrôles :
+la somme des ventes est conservée par les périodes, LTTB garde le minimum
+et le maximum de la série.
+
+Usage : python -m benchmarks.bench_decimation [nb_lignes] [nb_jours]
+"""
+
+import inspect
+import sys
+import time
+
+import numpy as np
+import plotly.io as pio
+
+from benchmarks.donnees_synthetiques import generer_transactions
+from moteur.cube import CubeVentes
+from moteur.figures import CLE_TRACES, en_sortie
+from moteur.filtres import MoteurFiltres
+
+DIMENSIONS = ['Magasin', 'Categorie_Produit', 'Mode_Paiement']
+
+
+def chronometrer(fonction, repetitions=5):
+    durees = []
+    for _ in range(repetitions):
+        t0 = time.perf_counter()
+        resultat = fonction()
+        durees.append(time.perf_counter() - t0)
+    return min(durees), resultat
+
+
+def main(nb_lignes=1_000_000, nb_jours=1826):
+    import exercice2_dashboard_style as dashboard
+
+    section = inspect.unwrap(dashboard.maj_ventes_quotidiennes)
+    cube = CubeVentes(MoteurFiltres(generer_transactions(nb_lignes, nb_jours=nb_jours), DIMENSIONS))
+    selection = cube.selection({})
+    jours, ventes = selection.par_jour('montant')
+    zoom = str(jours[-90]), str(jours[-1])
+    budget = dashboard.POINTS_SERIE
+
+    print(f"\n{nb_lignes:,} lignes sur {len(jours)} jours, budget de {budget} points\n")
+    print(f"{'cas':<46}{'points':>8}{'JSON Patch':>13}{'section':>12}")
+    configurations = [('un point par jour (avant)', sys.maxsize, 'periodes'),
+                      ('semaines / mois', budget, 'periodes'),
+                      ('LTTB', budget, 'lttb')]
+    for titre, points, methode in configurations:
+        dashboard.POINTS_SERIE, dashboard.DECIMATION = points, methode
+        for fenetre, (debut, fin) in (('période complète', (None, None)), ('zoom 90 jours', zoom)):
+            duree, (sortie,) = chronometrer(lambda: section(selection, debut, fin))
+            trace = sortie[CLE_TRACES][0]
+            taille = len(pio.json.to_json_plotly(en_sortie(sortie).to_plotly_json()))
+            print(f"{titre + ', ' + fenetre:<46}{len(trace['x']):>8}{taille / 1024:>10.1f} Ko"
+                  f"{duree * 1000:>9.1f} ms")
+            if fenetre == 'période complète' and points == budget:
+                y = np.asarray(trace['y'])
+                if methode == 'periodes':
+                    controle = np.isclose(y.sum(), ventes.sum())
+                    print(f"  {trace['name']} : somme des ventes {'conservée' if controle else 'DIFFÉRENTE'}")
+                else:
+                    controle = y.min() == ventes.min() and y.max() == ventes.max()
+                    print(f"  extrêmes de la série {'gardés' if controle else 'PERDUS'}")
+    dashboard.POINTS_SERIE, dashboard.DECIMATION = budget, 'periodes'
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -0,0 +1,102 @@
+"""
+Figures de l'exercice 2 : gabarits et mises à jour partielles (dash.Patch)
+contre figures Plotly complètes.
+
+Avant : chaque callback construisait ses figures avec Plotly (px / go :
+mise en page, thème, échelles de couleurs, validation des traces) et
+renvoyait la figure entière. Après : la partie statique vient d'un gabarit
+construit une fois, le callback ne produit que les traces et la réponse
+est un Patch qui remplace la liste des traces de la figure affichée.
+
+Pour chaque section (fonctions du dashboard, appelées sur la sélection
+complète d'un cube synthétique ; l'import du module charge aussi le
+classeur de l'exercice 2) : temps de la section avec gabarits, temps de
+construction Plotly des mêmes figures complètes, taille JSON des figures
+complètes et des Patch envoyés.
+
+Usage : python -m benchmarks.bench_figures [nb_lignes] [nb_jours]
+"""
+
+import copy
+import inspect
+import sys
+import time
+from functools import partial
+
+import plotly.io as pio
+
+from benchmarks.donnees_synthetiques import generer_transactions
+from moteur.cube import CubeVentes
+from moteur.figures import CLE_TRACES, en_sortie
+from moteur.filtres import MoteurFiltres
+
+DIMENSIONS = ['Magasin', 'Categorie_Produit', 'Mode_Paiement']
+
+
+def chronometrer(fonction, repetitions=5):
+    durees = []
+    for _ in range(repetitions):
+        t0 = time.perf_counter()
+        fonction()
+        durees.append(time.perf_counter() - t0)
+    return min(durees)
+
+
+def main(nb_lignes=1_000_000, nb_jours=365):
+    import exercice2_dashboard_style as dashboard
+
+    cube = CubeVentes(MoteurFiltres(generer_transactions(nb_lignes, nb_jours=nb_jours), DIMENSIONS))
+    selection = cube.selection({})
+    categories = (tuple(selection.valeurs['Categorie_Produit']),)
+
+    # Section : (fonction, {position de la sortie : (constructeur du gabarit, paramètres)})
+    sections = {
+        'vue d\'ensemble': (partial(inspect.unwrap(dashboard.maj_ventes_quotidiennes), debut=None, fin=None), {
+            0: (dashboard.gabarit_ventes_quotidiennes, ())}),
+        'magasins': (dashboard.maj_magasins, {
+            0: (dashboard.gabarit_repartition_magasins, ()),
+            1: (dashboard.gabarit_montant_moyen_magasins, ())}),
+        'catégories': (dashboard.maj_categories, {
+            0: (dashboard.gabarit_quantites_categories, ()),
+            1: (dashboard.gabarit_ca_categories_magasins, categories)}),
+        'paiements': (dashboard.maj_paiements, {
+            0: (dashboard.gabarit_modes_paiement, ())}),
+        'satisfaction': (dashboard.maj_satisfaction, {
+            0: (dashboard.gabarit_satisfaction_magasins, ()),
+            1: (dashboard.gabarit_satisfaction_categories, ())}),
+    }
+
+    print(f"\n{nb_lignes:,} lignes sur {nb_jours} jours\n")
+    print(f"{'section':<18}{'section':>12}{'figures Plotly':>16}{'JSON complet':>15}{'JSON Patch':>13}")
+    totaux = [0.0, 0.0, 0, 0]
+    for nom, (section, gabarits) in sections.items():
+        section = inspect.unwrap(section)
+        sorties = section(selection)
+        duree_section = chronometrer(lambda: section(selection))
+
+        def figures_completes():
+            resultat = []
+            for position, (constructeur, parametres) in gabarits.items():
+                figure = constructeur(*parametres)
+                figure.data = []
+                for trace in sorties[position][CLE_TRACES]:
+                    figure.add_trace(copy.deepcopy(trace))
+                resultat.append(figure)
+            return resultat
+        duree_plotly = chronometrer(figures_completes)
+        complet = sum(len(pio.to_json(figure, validate=False)) for figure in figures_completes())
+        patch = sum(len(pio.json.to_json_plotly(en_sortie(sorties[position]).to_plotly_json()))
+                    for position in gabarits)
+
+        for i, valeur in enumerate((duree_section, duree_plotly, complet, patch)):
+            totaux[i] += valeur
+        print(f"{nom:<18}{duree_section * 1000:>9.1f} ms{duree_plotly * 1000:>13.1f} ms"
+              f"{complet / 1024:>12.1f} Ko{patch / 1024:>10.1f} Ko")
+    print(f"{'page complète':<18}{totaux[0] * 1000:>9.1f} ms{totaux[1] * 1000:>13.1f} ms"
+          f"{totaux[2] / 1024:>12.1f} Ko{totaux[3] / 1024:>10.1f} Ko")
+    print("\n(figures Plotly : construction, à chaque callback avant les gabarits, "
+          "des figures complètes de la section)")
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:3]))
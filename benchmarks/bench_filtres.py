@@ -0,0 +1,81 @@
+"""
+Benchmark du filtrage d'update_dashboard : df.copy() + masques booléens
+chaînés contre le moteur pré-indexé (moteur.filtres.MoteurFiltres).
+
+Usage : python -m benchmarks.bench_filtres [nb_lignes]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.donnees_synthetiques import generer_transactions
+from moteur.filtres import MoteurFiltres
+
+DIMENSIONS = ['Magasin', 'Categorie_Produit', 'Mode_Paiement']
+
+# (magasin, categorie, paiement, periode)
+COMBINAISONS = [
+    ('ALL', 'ALL', 'ALL', None),
+    ('Paris', 'ALL', 'ALL', None),
+    ('ALL', 'Meubles', 'ALL', None),
+    ('Paris', 'Électronique', 'ALL', None),
+    ('Lyon', 'Vêtements', 'PayPal', None),
+    ('ALL', 'ALL', 'ALL', ('2024-03-01', '2024-03-31')),
+    ('Paris', 'Meubles', 'Espèces', ('2024-06-01', '2024-08-31')),
+]
+
+
+def filtrer_masques(df, magasin, categorie, paiement, periode):
+    """Filtrage historique d'update_dashboard"""
+    df_filtered = df.copy()
+    if magasin != 'ALL':
+        df_filtered = df_filtered[df_filtered['Magasin'] == magasin]
+    if categorie != 'ALL':
+        df_filtered = df_filtered[df_filtered['Categorie_Produit'] == categorie]
+    if paiement != 'ALL':
+        df_filtered = df_filtered[df_filtered['Mode_Paiement'] == paiement]
+    if periode:
+        df_filtered = df_filtered[
+            (df_filtered['Date_Transaction'] >= periode[0]) &
+            (df_filtered['Date_Transaction'] <= periode[1])
+        ]
+    return df_filtered
+
+
+def chronometrer(fonction, repetitions=5):
+    """Meilleur temps (ms) sur plusieurs exécutions"""
+    temps = []
+    for _ in range(repetitions):
+        t0 = time.perf_counter()
+        fonction()
+        temps.append(time.perf_counter() - t0)
+    return min(temps) * 1000
+
+
+def main(nb_lignes=1_000_000):
+    df = generer_transactions(nb_lignes)
+    t0 = time.perf_counter()
+    moteur = MoteurFiltres(df, DIMENSIONS)
+    print(f"Index construit en {(time.perf_counter() - t0) * 1000:.0f} ms ({nb_lignes:,} lignes)\n")
+
+    print(f"{'magasin':<10}{'catégorie':<14}{'paiement':<16}{'période':<26}"
+          f"{'lignes':>10}{'masques (ms)':>14}{'index (ms)':>12}{'index+take (ms)':>17}{'gain':>8}")
+    for magasin, categorie, paiement, periode in COMBINAISONS:
+        debut, fin = periode or (None, None)
+        selection = {'Magasin': magasin, 'Categorie_Produit': categorie, 'Mode_Paiement': paiement}
+        idx = moteur.indices(selection, debut, fin)
+        attendu = filtrer_masques(moteur.df, magasin, categorie, paiement, periode)
+        assert np.array_equal(idx, attendu.index.values)
+
+        t_masques = chronometrer(lambda: filtrer_masques(moteur.df, magasin, categorie, paiement, periode))
+        t_index = chronometrer(lambda: moteur.indices(selection, debut, fin))
+        t_lignes = chronometrer(lambda: moteur.lignes(moteur.indices(selection, debut, fin)))
+        print(f"{magasin:<10}{categorie:<14}{paiement:<16}{str(periode or '-'):<26}"
+              f"{len(idx):>10,}{t_masques:>14.2f}{t_index:>12.3f}{t_lignes:>17.2f}"
+              f"{t_masques / t_index:>7.0f}x")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,43 @@
+"""
+Taille des figures d'histogramme : px.histogram (valeurs brutes embarquées,
+regroupement dans le navigateur) contre classes calculées côté serveur
+(moteur.histogrammes.figure_histogramme).
+
+Usage : python -m benchmarks.bench_histogrammes [nb_clients]
+"""
+
+import sys
+import time
+
+import numpy as np
+import plotly.express as px
+
+from moteur.histogrammes import figure_histogramme
+
+
+def mesurer(construire):
+    """Taille du JSON (octets) et temps de construction + sérialisation (ms)"""
+    t0 = time.perf_counter()
+    taille = len(construire().to_json())
+    return taille, (time.perf_counter() - t0) * 1000
+
+
+def main(nb_clients=1_000_000):
+    rng = np.random.default_rng(0)
+    series = {
+        'transactions par client': (rng.poisson(2.5, nb_clients) + 1, 20),
+        'CLV': (rng.gamma(2.0, 350.0, nb_clients).round(2), 30),
+    }
+    print(f"{nb_clients:,} clients\n")
+    print(f"{'histogramme':<26}{'classes':>9}{'brut (o)':>14}{'pré-calculé (o)':>17}"
+          f"{'ratio':>9}{'brut (ms)':>11}{'pré-calc. (ms)':>16}")
+    for nom, (valeurs, nbins) in series.items():
+        for nb_classes in (nbins, 'fd'):
+            taille_brut, t_brut = mesurer(lambda: px.histogram(x=valeurs, nbins=nbins))
+            taille_bins, t_bins = mesurer(lambda: figure_histogramme(valeurs, nb_classes=nb_classes))
+            print(f"{nom:<26}{str(nb_classes):>9}{taille_brut:>14,}{taille_bins:>17,}"
+                  f"{taille_brut / taille_bins:>8.0f}x{t_brut:>11.0f}{t_bins:>16.1f}")
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
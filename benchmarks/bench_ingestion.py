@@ -0,0 +1,84 @@
+"""
+Ajout de transactions par lots : agrégats mis à jour (AgregatsKPI.ajouter,
+CubeVentes.ajouter) contre reconstruction complète sur l'historique.
+
+Les lots arrivent après l'historique (nouveaux jours) et le dernier contient
+un nouveau magasin et un nouveau mode de paiement. Les résultats des deux
+approches sont comparés à la fin.
+
+Usage : python -m benchmarks.bench_ingestion [nb_lignes] [taille_lot]
+"""
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.donnees_synthetiques import generer_transactions
+from moteur.cube import CubeVentes
+from moteur.filtres import MoteurFiltres
+from moteur.kpi import AgregatsKPI, IndicateursKPI
+
+DIMENSIONS = ['Magasin', 'Categorie_Produit', 'Mode_Paiement']
+NB_LOTS = 20
+KPI_COMPARES = ['moyenne_transactions', 'mediane_transaction', 'ca_par_categorie',
+                'transactions_par_client', 'clv_par_client', 'modes_paiement']
+
+
+def construire(df):
+    """
+    Structures des deux dashboards construites sur tout l'historique
+    (quantiles exacts : comparables d'une approche à l'autre)
+    """
+    return AgregatsKPI(df, 'Montant', quantiles='exact'), CubeVentes(MoteurFiltres(df, DIMENSIONS))
+
+
+def main(nb_lignes=1_000_000, taille_lot=1_000):
+    df = generer_transactions(nb_lignes + NB_LOTS * taille_lot, nb_jours=380)
+    historique, arrivees = df.iloc[:nb_lignes], df.iloc[nb_lignes:].copy()
+    arrivees.iloc[-1, arrivees.columns.get_loc('Magasin')] = 'Nantes'
+    arrivees.iloc[-1, arrivees.columns.get_loc('Mode_Paiement')] = 'Virement'
+    lots = [arrivees.iloc[i * taille_lot:(i + 1) * taille_lot] for i in range(NB_LOTS)]
+
+    agregats, cube = construire(historique)
+    t0 = time.perf_counter()
+    for lot in lots:
+        agregats = agregats.ajouter(lot)
+        cube = cube.ajouter(lot)
+    temps_lot = (time.perf_counter() - t0) / NB_LOTS * 1000
+
+    t0 = time.perf_counter()
+    agregats_ref, cube_ref = construire(pd.concat([historique] + lots, ignore_index=True))
+    temps_complet = (time.perf_counter() - t0) * 1000
+
+    print(f"{nb_lignes:,} lignes d'historique, {NB_LOTS} lots de {taille_lot:,} lignes\n")
+    print(f"{'ajout par lot':<40}{temps_lot:>10.2f} ms")
+    print(f"{'reconstruction complète':<40}{temps_complet:>10.2f} ms")
+    print(f"{'gain':<40}{temps_complet / temps_lot:>10.0f}x\n")
+
+    # Vérification : mêmes KPI et mêmes agrégats du cube
+    kpi, kpi_ref = IndicateursKPI(1, agregats), IndicateursKPI(2, agregats_ref)
+    for nom in KPI_COMPARES:
+        valeur, reference = getattr(kpi, nom), getattr(kpi_ref, nom)
+        if isinstance(reference, pd.Series):
+            identique = valeur.index.equals(reference.index) and np.allclose(valeur, reference)
+        else:
+            identique = np.isclose(valeur, reference)
+        print(f"{nom:<40}{'OK' if identique else 'DIFFÉRENT':>10}")
+    for dimensions in (['Jour'], ['Magasin'], ['Categorie_Produit', 'Mode_Paiement']):
+        tableau = cube.selection({}).tableau(dimensions)
+        reference = cube_ref.selection({}).tableau(dimensions)
+        tableau = tableau.sort_values(dimensions, ignore_index=True)
+        reference = reference.sort_values(dimensions, ignore_index=True)
+        identique = tableau[dimensions].equals(reference[dimensions]) and np.allclose(
+            tableau.drop(columns=dimensions), reference.drop(columns=dimensions), equal_nan=True)
+        nom = 'cube ' + ' × '.join(dimensions)
+        print(f"{nom:<40}{'OK' if identique else 'DIFFÉRENT':>10}")
+    identique = cube.selection({}).distribution_satisfaction().equals(
+        cube_ref.selection({}).distribution_satisfaction())
+    print(f"{'cube satisfaction':<40}{'OK' if identique else 'DIFFÉRENT':>10}")
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:3]))
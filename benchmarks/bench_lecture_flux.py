@@ -0,0 +1,170 @@
+"""
+Lecture par blocs d'un gros fichier de transactions (moteur.lecture_flux).
+
+Un fichier synthétique (montants en texte à virgule décimale, comme le
+classeur) est écrit par morceaux dans un processus séparé. Il est ensuite
+lu par blocs pour alimenter en une passe les agrégats des deux dashboards
+(AgregatsKPI de l'exercice 1, cube de l'exercice 2). On mesure le débit et
+le pic de mémoire du processus, à comparer à la taille qu'aurait le
+DataFrame complet. Jusqu'à 2 millions de lignes, les résultats sont aussi
+comparés à un calcul pandas sur le fichier entier.
+
+Usage : python -m benchmarks.bench_lecture_flux [nb_lignes] [format] [taille_bloc]
+        format : parquet (défaut), csv ou xlsx
+"""
+
+import multiprocessing as mp
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.donnees_synthetiques import generer_transactions
+from moteur.chargement import preparer_donnees
+from moteur.cube import CubeVentes
+from moteur.filtres import MoteurFiltres
+from moteur.kpi import AgregatsKPI, IndicateursKPI
+from moteur.lecture_flux import agreger_par_blocs, lire_par_blocs
+
+DIMENSIONS = ['Magasin', 'Categorie_Produit', 'Mode_Paiement']
+LIGNES_PAR_MORCEAU = 1_000_000
+LIMITE_VERIFICATION = 2_000_000
+
+
+def morceau_texte(nb_lignes, graine):
+    """Transactions synthétiques, montant en texte à virgule décimale"""
+    df = generer_transactions(nb_lignes, graine=graine)
+    df['Montant'] = df['Montant'].astype(str).str.replace('.', ',', regex=False)
+    return df
+
+
+def ecrire_fichier(chemin, nb_lignes, format_fichier):
+    """Écrit le fichier par morceaux (mémoire bornée, y compris ici)"""
+    tailles = [min(LIGNES_PAR_MORCEAU, nb_lignes - debut)
+               for debut in range(0, nb_lignes, LIGNES_PAR_MORCEAU)]
+    if format_fichier == 'parquet':
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        ecrivain = None
+        for graine, taille in enumerate(tailles):
+            table = pa.Table.from_pandas(morceau_texte(taille, graine), preserve_index=False)
+            ecrivain = ecrivain or pq.ParquetWriter(chemin, table.schema)
+            ecrivain.write_table(table)
+        ecrivain.close()
+    elif format_fichier == 'csv':
+        for graine, taille in enumerate(tailles):
+            morceau_texte(taille, graine).to_csv(chemin, mode='a', header=graine == 0, index=False)
+    elif format_fichier == 'xlsx':
+        import openpyxl
+        classeur = openpyxl.Workbook(write_only=True)
+        feuille = classeur.create_sheet()
+        for graine, taille in enumerate(tailles):
+            df = morceau_texte(taille, graine)
+            if graine == 0:
+                feuille.append(list(df.columns))
+            for ligne in df.itertuples(index=False):
+                feuille.append([v.to_pydatetime() if isinstance(v, pd.Timestamp) else v
+                                for v in ligne])
+        classeur.save(chemin)
+    else:
+        raise ValueError(f"Format inconnu : {format_fichier}")
+
+
+def preparer(bloc):
+    return AgregatsKPI(bloc, 'Montant'), CubeVentes(MoteurFiltres(bloc, DIMENSIONS))
+
+
+def integrer(structures, bloc):
+    agregats, cube = structures
+    return agregats.ajouter(bloc), cube.ajouter(bloc)
+
+
+def pic_memoire():
+    """Pic de mémoire résidente du processus (Mo)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main(nb_lignes=50_000_000, format_fichier='parquet', taille_bloc=250_000):
+    with tempfile.TemporaryDirectory() as dossier:
+        chemin = os.path.join(dossier, f'transactions.{format_fichier}')
+        t0 = time.perf_counter()
+        processus = mp.get_context('spawn').Process(
+            target=ecrire_fichier, args=(chemin, nb_lignes, format_fichier))
+        processus.start()
+        processus.join()
+        print(f"{nb_lignes:,} lignes, {format_fichier}, "
+              f"{os.path.getsize(chemin) / 1024 ** 2:,.0f} Mo sur disque "
+              f"(écrit en {time.perf_counter() - t0:.0f} s)")
+
+        # Taille qu'aurait le DataFrame complet, estimée sur un échantillon nettoyé
+        echantillon = preparer_donnees(morceau_texte(100_000, 0), 'Montant')
+        octets_ligne = echantillon.memory_usage(deep=True).sum() / len(echantillon)
+        print(f"DataFrame complet estimé : {octets_ligne * nb_lignes / 1024 ** 2:,.0f} Mo\n")
+
+        memoire_avant = pic_memoire()
+        t0 = time.perf_counter()
+        agregats, cube = agreger_par_blocs(
+            lire_par_blocs(chemin, 'Montant', taille_bloc), preparer, integrer)
+        duree = time.perf_counter() - t0
+        print(f"lecture par blocs de {taille_bloc:,} lignes : {duree:.1f} s "
+              f"({nb_lignes / duree / 1e6:.2f} M lignes/s)")
+        print(f"pic de mémoire du processus : {pic_memoire():,.0f} Mo "
+              f"(avant lecture : {memoire_avant:,.0f} Mo)\n")
+
+        kpi = IndicateursKPI(None, agregats)
+        totaux = cube.selection({}).totaux()
+        resultats = {
+            'total_ventes': totaux['total_ventes'],
+            'nb_transactions': totaux['nb_transactions'],
+            'montant_moyen': totaux['montant_moyen'],
+            'satisfaction_moyenne': totaux['satisfaction_moyenne'],
+            'moyenne_transactions': kpi.moyenne_transactions,
+            'mediane_transaction': kpi.mediane_transaction,
+            'taux_recurrence': kpi.taux_recurrence,
+            'clv_moyenne': kpi.clv_moyenne,
+            'categorie_top': kpi.categorie_top,
+            'mode_plus_utilise': kpi.mode_plus_utilise,
+        }
+
+        reference = {}
+        if nb_lignes <= LIMITE_VERIFICATION:
+            if format_fichier == 'csv':
+                df = pd.read_csv(chemin, dtype={'Montant': str})
+            elif format_fichier == 'parquet':
+                df = pd.read_parquet(chemin)
+            else:
+                df = pd.read_excel(chemin)
+            df = preparer_donnees(df, 'Montant')
+            par_categorie = df.groupby('Categorie_Produit')['Montant'].sum()
+            transactions_par_client = df.groupby('ID_Client').size()
+            reference = {
+                'total_ventes': df['Montant'].sum(),
+                'nb_transactions': len(df),
+                'montant_moyen': df['Montant'].mean(),
+                'satisfaction_moyenne': df['Satisfaction_Client'].mean(),
+                'moyenne_transactions': df['Montant'].mean(),
+                'mediane_transaction': df['Montant'].median(),
+                'taux_recurrence': (transactions_par_client > 1).mean() * 100,
+                'clv_moyenne': df.groupby('ID_Client')['Montant'].sum().mean(),
+                'categorie_top': par_categorie.idxmax(),
+                'mode_plus_utilise': df['Mode_Paiement'].value_counts().index[0],
+            }
+
+        for nom, valeur in resultats.items():
+            ligne = f"{nom:<24}{valeur!s:>22}"
+            if nom in reference:
+                attendu = reference[nom]
+                if isinstance(attendu, str):
+                    ecart = 'OK' if valeur == attendu else 'DIFFÉRENT'
+                else:
+                    ecart = f"écart relatif {abs(valeur - attendu) / abs(attendu):.2e}"
+                ligne += f"   {ecart}"
+            print(ligne)
+
+
+if __name__ == '__main__':
+    arguments = sys.argv[1:4]
+    main(*(int(a) if a.isdigit() else a for a in arguments))
@@ -0,0 +1,87 @@
+"""
+Mémoire par worker : DataFrame privé (lecture Feather) contre colonnes
+partagées mappées en mémoire (moteur.memoire_partagee).
+
+Chaque worker charge les données, construit l'index de filtrage et le cube
+comme le dashboard, puis mesure RSS / PSS / USS (Linux, /proc/self/smaps_rollup).
+Les workers attendent d'avoir tous chargé avant de mesurer, pour que le PSS
+reflète le partage réel des pages.
+
+Usage : python -m benchmarks.bench_memoire [nb_lignes] [nb_workers]
+"""
+
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+
+from benchmarks.donnees_synthetiques import generer_transactions
+
+DIMENSIONS = ['Magasin', 'Categorie_Produit', 'Mode_Paiement']
+
+
+def memoire_processus():
+    """RSS, PSS et USS (Mo) du processus courant"""
+    valeurs = {}
+    with open('/proc/self/smaps_rollup') as f:
+        for ligne in f:
+            morceaux = ligne.split()
+            if len(morceaux) == 3 and morceaux[2] == 'kB':
+                valeurs[morceaux[0].rstrip(':')] = int(morceaux[1]) / 1024
+    uss = valeurs.get('Private_Clean', 0) + valeurs.get('Private_Dirty', 0)
+    return valeurs['Rss'], valeurs['Pss'], uss
+
+
+def worker(mode, chemin_feather, dossier_colonnes, barriere, resultats):
+    import pandas as pd
+    from moteur.cube import CubeVentes
+    from moteur.filtres import MoteurFiltres
+    from moteur.memoire_partagee import attacher_colonnes
+
+    avant = memoire_processus()
+    if mode == 'prive':
+        df = pd.read_feather(chemin_feather)
+    else:
+        df = attacher_colonnes(dossier_colonnes)
+    moteur = MoteurFiltres(df, DIMENSIONS)
+    CubeVentes(moteur)
+    # Parcours des colonnes numériques, comme le ferait un callback
+    float(moteur.df['Montant'].sum() + moteur.df['Quantite'].sum())
+
+    barriere.wait()
+    apres = memoire_processus()
+    resultats.put(tuple(a - b for a, b in zip(apres, avant)))
+    barriere.wait()
+
+
+def main(nb_lignes=2_000_000, nb_workers=4):
+    from moteur.memoire_partagee import exporter_colonnes
+
+    contexte = mp.get_context('spawn')
+    with tempfile.TemporaryDirectory() as dossier:
+        df = generer_transactions(nb_lignes)
+        chemin_feather = os.path.join(dossier, 'donnees.feather')
+        df.to_feather(chemin_feather, compression='uncompressed')
+        dossier_colonnes = os.path.join(dossier, 'donnees.colonnes')
+        exporter_colonnes(df, dossier_colonnes, DIMENSIONS)
+        del df
+
+        print(f"{nb_lignes:,} lignes, {nb_workers} workers (Mo par worker, après chargement)\n")
+        print(f"{'mode':<10}{'RSS':>10}{'PSS':>10}{'USS':>10}{'PSS total':>12}")
+        for mode in ('prive', 'partage'):
+            barriere = contexte.Barrier(nb_workers)
+            resultats = contexte.Queue()
+            processus = [contexte.Process(target=worker, args=(
+                mode, chemin_feather, dossier_colonnes, barriere, resultats))
+                for _ in range(nb_workers)]
+            for p in processus:
+                p.start()
+            mesures = [resultats.get() for _ in processus]
+            for p in processus:
+                p.join()
+            rss, pss, uss = (sum(m[i] for m in mesures) / nb_workers for i in range(3))
+            print(f"{mode:<10}{rss:>10.1f}{pss:>10.1f}{uss:>10.1f}{pss * nb_workers:>12.1f}")
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:3]))
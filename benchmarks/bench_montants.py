@@ -0,0 +1,68 @@
+"""
+Conversion des montants : moteur.chargement.convertir_montants contre
+l'ancienne conversion (astype(str) de toute la colonne, remplacement de la
+virgule, to_numeric).
+
+Trois colonnes : montants déjà numériques (float64), colonne objet mêlant
+nombres et texte à virgule décimale comme le classeur (part de texte
+variable, quelques dates et valeurs invalides), et colonne entièrement
+texte. Les deux conversions doivent donner les mêmes valeurs.
+
+Usage : python -m benchmarks.bench_montants [nb_lignes]
+"""
+
+import datetime
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from moteur.chargement import convertir_montants
+
+
+def conversion_texte(valeurs):
+    """Ancienne conversion : toute la colonne passe par le texte"""
+    return pd.to_numeric(valeurs.astype(str).str.replace(',', '.'), errors='coerce')
+
+
+def colonnes(nb_lignes, rng):
+    montants = rng.uniform(20, 1000, nb_lignes).round(2)
+    texte = pd.Series(montants).astype(str).str.replace('.', ',', regex=False).to_numpy(dtype=object)
+    resultat = {'numérique': pd.Series(montants)}
+    for part in (0.05, 0.5):
+        melange = montants.astype(object)
+        en_texte = rng.random(nb_lignes) < part
+        melange[en_texte] = texte[en_texte]
+        # Cellules converties en dates par Excel et saisies invalides
+        melange[rng.integers(0, nb_lignes, 20)] = datetime.datetime(2024, 12, 1)
+        melange[rng.integers(0, nb_lignes, 20)] = 'N/A'
+        melange[rng.integers(0, nb_lignes, 20)] = None
+        resultat[f'objet, {part:.0%} texte'] = pd.Series(melange)
+    resultat['texte'] = pd.Series(texte)
+    return resultat
+
+
+def chronometrer(fonction, *arguments, repetitions=3):
+    durees = []
+    for _ in range(repetitions):
+        t0 = time.perf_counter()
+        resultat = fonction(*arguments)
+        durees.append(time.perf_counter() - t0)
+    return min(durees), resultat
+
+
+def main(nb_lignes=1_000_000):
+    rng = np.random.default_rng(0)
+    print(f"{nb_lignes:,} montants\n")
+    print(f"{'colonne':<20}{'texte':>10}{'vectorisé':>12}{'gain':>8}{'NaN forcés':>12}  résultat")
+    for nom, valeurs in colonnes(nb_lignes, rng).items():
+        duree_texte, attendu = chronometrer(conversion_texte, valeurs)
+        duree, (montants, invalides) = chronometrer(convertir_montants, valeurs)
+        identique = np.array_equal(attendu.to_numpy(), montants.to_numpy(), equal_nan=True)
+        print(f"{nom:<20}{duree_texte * 1000:>8.0f} ms{duree * 1000:>9.0f} ms"
+              f"{duree_texte / duree:>7.1f}x{invalides:>12,}  {'OK' if identique else 'DIFFÉRENT'}")
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:2]))
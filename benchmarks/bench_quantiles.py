@@ -0,0 +1,109 @@
+"""
+Quantiles des montants : sketch KLL (moteur.quantiles) contre Series.quantile.
+
+Pour plusieurs distributions, les valeurs sont ajoutées par lots à un
+sketch, ou réparties en partitions dont les sketches sont fusionnés. Pour
+la médiane, p90 et p99, on mesure l'erreur de rang (part des valeurs
+inférieures à l'estimation, comparée au quantile demandé) et l'écart en
+valeur avec Series.quantile, ainsi que la borne documentée erreur_rang.
+
+Usage : python -m benchmarks.bench_quantiles [nb_valeurs] [k]
+"""
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from moteur.quantiles import (LIMITE_EXACTE, QUANTILES_KPI, QuantilesExacts, SketchKLL,
+                              creer_quantiles)
+
+NB_LOTS = 100
+NB_PARTITIONS = 8
+
+
+def distributions(nb_valeurs, rng):
+    """Jeux de montants de formes différentes"""
+    return {
+        'uniforme': rng.uniform(20, 1000, nb_valeurs).round(2),
+        'log-normale': rng.lognormal(4, 1, nb_valeurs).round(2),
+        'triée': np.sort(rng.uniform(20, 1000, nb_valeurs)),
+        'peu de valeurs': rng.integers(1, 10, nb_valeurs).astype(float),
+    }
+
+
+def erreur_rang(valeurs_triees, estimation, q):
+    """Écart entre le quantile demandé et le rang normalisé de l'estimation"""
+    bas = np.searchsorted(valeurs_triees, estimation, side='left') / len(valeurs_triees)
+    haut = np.searchsorted(valeurs_triees, estimation, side='right') / len(valeurs_triees)
+    # Valeurs répétées : tout rang de [bas, haut] est correct
+    return max(0.0, bas - q, q - haut)
+
+
+def main(nb_valeurs=1_000_000, k=200):
+    rng = np.random.default_rng(0)
+    borne = SketchKLL(k).erreur_rang
+    print(f"{nb_valeurs:,} valeurs, k = {k}, borne d'erreur de rang ε = {borne:.2%}\n")
+    print(f"{'distribution':<16}{'mode':<12}{'q':>6}{'Series':>12}{'sketch':>12}"
+          f"{'err. rang':>11}{'err. rel.':>11}")
+
+    depassements = 0
+    for nom, valeurs in distributions(nb_valeurs, rng).items():
+        triees = np.sort(valeurs)
+        reference = pd.Series(valeurs).quantile(list(QUANTILES_KPI))
+
+        # Ajout par lots, et fusion de sketches construits par partition
+        sketch = SketchKLL(k, graine=1)
+        for lot in np.array_split(valeurs, NB_LOTS):
+            sketch = sketch.ajouter(lot)
+        partitions = [SketchKLL(k, graine=i).ajouter(p)
+                      for i, p in enumerate(np.array_split(valeurs, NB_PARTITIONS))]
+        fusion = partitions[0]
+        for partition in partitions[1:]:
+            fusion = fusion.fusionner(partition)
+
+        for mode, resume in (('lots', sketch), ('fusion', fusion)):
+            for q, estimation in zip(QUANTILES_KPI, resume.quantile(QUANTILES_KPI)):
+                erreur = erreur_rang(triees, estimation, q)
+                depassements += erreur > borne
+                relative = abs(estimation - reference[q]) / abs(reference[q])
+                print(f"{nom:<16}{mode:<12}{q:>6}{reference[q]:>12.2f}{estimation:>12.2f}"
+                      f"{erreur:>11.3%}{relative:>11.3%}")
+
+    # Mode exact : identique à Series.quantile
+    valeurs = rng.lognormal(4, 1, nb_valeurs)
+    exact = QuantilesExacts()
+    for lot in np.array_split(valeurs, NB_LOTS):
+        exact = exact.ajouter(lot)
+    identique = np.allclose(exact.quantile(QUANTILES_KPI),
+                            pd.Series(valeurs).quantile(list(QUANTILES_KPI)), rtol=0, atol=1e-9)
+    print(f"\nmode exact identique à Series.quantile : {'OK' if identique else 'DIFFÉRENT'}")
+    print(f"estimations hors de la borne ε : {depassements}")
+    assert identique
+    assert depassements == 0
+
+    # Mode auto : au-delà de LIMITE_EXACTE valeurs, sketch dès la création
+    # (pas de saut des quantiles au premier lot ajouté)
+    auto = creer_quantiles(valeurs[:LIMITE_EXACTE + 1])
+    assert isinstance(auto, SketchKLL)
+    print(f"mode auto au-delà de {LIMITE_EXACTE:,} valeurs : sketch dès la création : OK")
+
+    # Coût : mémoire et temps de requête (résumé calculé une fois par version)
+    t0 = time.perf_counter()
+    sketch.quantile(QUANTILES_KPI)
+    premiere = (time.perf_counter() - t0) * 1e6
+    t0 = time.perf_counter()
+    sketch.quantile(QUANTILES_KPI)
+    suivante = (time.perf_counter() - t0) * 1e6
+    retenues = sum(map(len, sketch.niveaux))
+    print(f"\nsketch : {retenues:,} valeurs retenues ({retenues * 8 / 1024:.1f} Ko) "
+          f"contre {nb_valeurs * 8 / 1024 ** 2:.1f} Mo pour la colonne")
+    print(f"requête médiane/p90/p99 : {premiere:.0f} µs (résumé), puis {suivante:.0f} µs")
+    t0 = time.perf_counter()
+    pd.Series(valeurs).quantile(list(QUANTILES_KPI))
+    print(f"Series.quantile : {(time.perf_counter() - t0) * 1e6:.0f} µs")
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -0,0 +1,94 @@
+"""
+Ventes quotidiennes : colonne Date d'objets datetime.date contre ordinaux
+de jours int32 (moteur.cube).
+
+Avant : df['Date'] = df['Date_Transaction'].dt.date puis groupby sur cette
+colonne objet (code d'origine du callback). Après : ordinaux int32 des
+dates, axe des jours et codes par bincount (indexer_jours), ventes par
+jour agrégées par bincount, conversion en dates seulement pour l'axe du
+graphique. On compare aussi, à cube construit, le chemin par
+SelectionCube.tableau(['Jour']) et par SelectionCube.par_jour.
+
+Usage : python -m benchmarks.bench_quotidien [nb_lignes] [nb_jours]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.donnees_synthetiques import generer_transactions
+from moteur.cube import CubeVentes, indexer_jours, ordinaux_jours
+from moteur.filtres import MoteurFiltres
+
+DIMENSIONS = ['Magasin', 'Categorie_Produit', 'Mode_Paiement']
+
+
+def chronometrer(fonction, repetitions=3):
+    durees = []
+    for _ in range(repetitions):
+        t0 = time.perf_counter()
+        resultat = fonction()
+        durees.append(time.perf_counter() - t0)
+    return min(durees), resultat
+
+
+def avant(df):
+    """Colonne d'objets datetime.date et groupby (code d'origine)"""
+    df = df.copy()
+    df['Date'] = df['Date_Transaction'].dt.date
+    ventes = df.groupby('Date')['Montant'].sum()
+    return ventes.index.map(str).to_numpy(), ventes.to_numpy()
+
+
+def apres(df):
+    """Ordinaux int32, bincount, dates seulement pour l'axe"""
+    jours, codes = indexer_jours(ordinaux_jours(df['Date_Transaction'].to_numpy()))
+    ventes = np.bincount(codes, weights=df['Montant'].to_numpy(), minlength=len(jours))
+    return np.datetime_as_string(jours, unit='D'), ventes
+
+
+def main(nb_lignes=1_000_000, nb_jours=365):
+    df = generer_transactions(nb_lignes, nb_jours=nb_jours)
+    print(f"{nb_lignes:,} lignes sur {nb_jours} jours\n")
+
+    dates = df['Date_Transaction'].dt.date
+    octets_objets = dates.memory_usage(deep=True, index=False)
+    octets_ordinaux = ordinaux_jours(df['Date_Transaction'].to_numpy()).nbytes
+    print(f"colonne Date (objets datetime.date) : {octets_objets / 1024 ** 2:8.1f} Mo")
+    print(f"ordinaux de jours int32             : {octets_ordinaux / 1024 ** 2:8.1f} Mo\n")
+
+    duree_avant, (axe_avant, ventes_avant) = chronometrer(lambda: avant(df))
+    duree_apres, (axe_apres, ventes_apres) = chronometrer(lambda: apres(df))
+    identique = (np.array_equal(axe_avant, axe_apres)
+                 and np.allclose(ventes_avant, ventes_apres, rtol=1e-12, atol=0))
+    print("depuis les transactions")
+    print(f"  .dt.date + groupby          : {duree_avant * 1000:8.1f} ms")
+    print(f"  ordinaux int32 + bincount   : {duree_apres * 1000:8.1f} ms"
+          f"   ({duree_avant / duree_apres:.1f}x, {'OK' if identique else 'DIFFÉRENT'})\n")
+
+    # Chemin du callback : sélection du cube, puis série quotidienne
+    moteur = MoteurFiltres(df, DIMENSIONS)
+    duree_cube, cube = chronometrer(lambda: CubeVentes(moteur), repetitions=1)
+    selection = cube.selection({})
+
+    def par_tableau():
+        ventes = selection.tableau(['Jour'])
+        return ventes['Jour'].dt.date.map(str).to_numpy(), ventes['montant'].to_numpy()
+
+    def par_jour():
+        jours, ventes = selection.par_jour('montant')
+        return np.datetime_as_string(jours, unit='D'), ventes
+
+    duree_tableau, (axe_tableau, ventes_tableau) = chronometrer(par_tableau)
+    duree_jour, (axe_jour, ventes_jour) = chronometrer(par_jour)
+    identique = (np.array_equal(axe_tableau, axe_jour) and np.array_equal(ventes_tableau, ventes_jour)
+                 and np.array_equal(axe_jour, axe_avant))
+    print(f"depuis le cube (construit en {duree_cube:.2f} s)")
+    print(f"  tableau(['Jour']) + .dt.date : {duree_tableau * 1000:8.2f} ms")
+    print(f"  par_jour + datetime_as_string : {duree_jour * 1000:7.2f} ms"
+          f"   ({duree_tableau / duree_jour:.1f}x, {'OK' if identique else 'DIFFÉRENT'})")
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:3]))
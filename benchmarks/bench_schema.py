@@ -0,0 +1,82 @@
+"""
+Schéma catégoriel (moteur.schema) : colonnes texte contre catégories.
+
+Sur des transactions synthétiques, on compare la mémoire des colonnes
+déclarées catégorielles, puis les opérations des dashboards sur ces
+colonnes : agrégats des KPI de l'exercice 1, index de filtrage de
+l'exercice 2, options des listes déroulantes (unique) et filtre d'égalité.
+Les résultats doivent être identiques.
+
+Usage : python -m benchmarks.bench_schema [nb_lignes]
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.donnees_synthetiques import generer_transactions
+from moteur.filtres import MoteurFiltres
+from moteur.kpi import AgregatsKPI, IndicateursKPI
+from moteur.schema import SCHEMA_VENTES, appliquer_schema, codes_categories
+
+DIMENSIONS = ['Magasin', 'Categorie_Produit', 'Mode_Paiement']
+
+
+def chronometrer(fonction, repetitions=3):
+    durees = []
+    for _ in range(repetitions):
+        t0 = time.perf_counter()
+        resultat = fonction()
+        durees.append(time.perf_counter() - t0)
+    return min(durees), resultat
+
+
+def kpi(df):
+    k = IndicateursKPI(None, AgregatsKPI(df, 'Montant', quantiles='kll'))
+    return (k.ca_par_categorie.to_dict(), k.taux_recurrence, k.clv_moyenne,
+            k.modes_paiement.to_dict(), list(k.top_5_clients.index))
+
+
+def filtre_texte(df):
+    return np.flatnonzero(df['Magasin'].to_numpy() == 'Paris')
+
+
+def filtre_codes(df):
+    codes, categories = codes_categories(df['Magasin'])
+    return np.flatnonzero(codes == categories.get_loc('Paris'))
+
+
+def main(nb_lignes=1_000_000):
+    texte = generer_transactions(nb_lignes)
+    categoriel, avant, apres = appliquer_schema(texte.copy(), SCHEMA_VENTES)
+    print(f"{nb_lignes:,} lignes\n")
+    print(f"{'colonne':<20}{'texte (Mo)':>12}{'catégories (Mo)':>17}")
+    for colonne in [c for c, t in SCHEMA_VENTES.items() if t == 'categorie']:
+        print(f"{colonne:<20}{texte[colonne].memory_usage(deep=True, index=False) / 1024 ** 2:>12.1f}"
+              f"{categoriel[colonne].memory_usage(deep=True, index=False) / 1024 ** 2:>17.1f}")
+    print(f"{'total':<20}{avant / 1024 ** 2:>12.1f}{apres / 1024 ** 2:>17.1f}"
+          f"   ({1 - apres / avant:.0%} économisés)\n")
+
+    operations = {
+        'agrégats KPI (ex. 1)': (kpi, kpi),
+        'index de filtrage (ex. 2)': (lambda df: MoteurFiltres(df, DIMENSIONS).postings['Magasin']['Paris'],
+                                      lambda df: MoteurFiltres(df, DIMENSIONS).postings['Magasin']['Paris']),
+        'options (unique)': (lambda df: sorted(df['Magasin'].unique()),
+                             lambda df: list(df['Magasin'].cat.categories)),
+        "filtre d'égalité": (filtre_texte, filtre_codes),
+    }
+    print(f"{'opération':<28}{'texte':>10}{'catégories':>13}{'gain':>8}  résultat")
+    for nom, (sur_texte, sur_codes) in operations.items():
+        duree_texte, attendu = chronometrer(lambda: sur_texte(texte))
+        duree_codes, obtenu = chronometrer(lambda: sur_codes(categoriel))
+        if isinstance(attendu, np.ndarray):
+            identique = np.array_equal(attendu, obtenu)
+        else:
+            identique = attendu == obtenu
+        print(f"{nom:<28}{duree_texte * 1000:>7.1f} ms{duree_codes * 1000:>10.1f} ms"
+              f"{duree_texte / duree_codes:>7.1f}x  {'OK' if identique else 'DIFFÉRENT'}")
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:2]))
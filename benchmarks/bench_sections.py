@@ -0,0 +1,163 @@
+"""
+Sections de l'exercice 2 : agrégation fusionnée de SelectionCube contre
+réductions séparées.
+
+Avant : chaque tableau() d'une section réduit toutes les cellules retenues
+(jour × magasin × catégorie × paiement), et les sections recalculent les
+mêmes tableaux (magasins et catégories reviennent dans la section
+satisfaction). Après : les mesures sont sommées une fois sur l'axe des
+jours, les tableaux sont des réductions de ce petit cube, mémorisées pour
+la sélection partagée par les sections. Les temps sont donnés pour les
+seules agrégations de chaque section, puis pour la section complète
+(construction des figures comprise).
+
+Les fonctions des sections sont celles du dashboard (l'import du module
+charge aussi le classeur de l'exercice 2) ; elles sont appelées sur la
+sélection complète d'un cube synthétique. Pour chaque section : temps
+avant, après sur une sélection neuve (section seule), et après quand ses
+tableaux sont déjà mémorisés ; puis la page complète, toutes les sections
+appelées successivement sur une même sélection.
+
+Usage : python -m benchmarks.bench_sections [nb_lignes] [nb_jours]
+"""
+
+import inspect
+import sys
+import time
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.donnees_synthetiques import generer_transactions
+from moteur.cube import CubeVentes, SelectionCube, _ratio
+from moteur.filtres import MoteurFiltres
+
+DIMENSIONS = ['Magasin', 'Categorie_Produit', 'Mode_Paiement']
+TABLEAUX = [['Magasin'], ['Categorie_Produit'], ['Mode_Paiement'], ['Magasin', 'Categorie_Produit']]
+
+
+class SelectionSeparee(SelectionCube):
+    """
+    Comportement précédent : réductions indépendantes sur toutes les
+    cellules, tableau construit par MultiIndex, rien de mémorisé
+    """
+
+    def hors_jours(self):
+        return {mesure: cellules.sum(axis=0) for mesure, cellules in self.mesures.items()}
+
+    def _reduire(self, mesure, dimensions):
+        autres = tuple(i for i, axe in enumerate(self.axes) if axe not in dimensions)
+        return self.mesures[mesure].sum(axis=autres)
+
+    def tableau(self, dimensions):
+        dimensions = [axe for axe in self.axes if axe in dimensions]
+        index = pd.MultiIndex.from_product([self.valeurs[d] for d in dimensions], names=dimensions)
+        resultat = pd.DataFrame(
+            {mesure: self._reduire(mesure, dimensions).ravel() for mesure in self.mesures},
+            index=index,
+        )
+        resultat = resultat[resultat['n_lignes'] > 0].copy()
+        n, somme = resultat['n_montant'], resultat['montant']
+        resultat['montant_moyen'] = _ratio(somme, n)
+        variance = _ratio(resultat['montant_carre'] - somme * resultat['montant_moyen'], n - 1)
+        resultat['ecart_type'] = np.sqrt(np.maximum(variance, 0))
+        resultat['satisfaction_moyenne'] = _ratio(resultat['satisfaction'], resultat['n_satisfaction'])
+        return resultat.reset_index()
+
+
+def copie(selection, classe):
+    return classe(selection.mesures, selection.histogramme, selection.scores, selection.valeurs)
+
+
+def verifier_manquantes(nb_jours, nb_lignes=50_000):
+    """
+    Lignes sans valeur de dimension : le cube doit les ignorer comme
+    groupby(dropna=True), sans les reporter sur une autre cellule
+    """
+    df = generer_transactions(nb_lignes, nb_jours=nb_jours)
+    rng = np.random.default_rng(1)
+    for dimension in DIMENSIONS:
+        df.loc[rng.random(nb_lignes) < 0.02, dimension] = None
+    tableau = CubeVentes(MoteurFiltres(df, DIMENSIONS)).selection({}).tableau(DIMENSIONS)
+    attendu = df.groupby(DIMENSIONS, dropna=True).agg(
+        n_lignes=('Montant', 'size'), montant=('Montant', 'sum')).reset_index()
+    obtenu = tableau.sort_values(DIMENSIONS, ignore_index=True)
+    attendu = attendu.sort_values(DIMENSIONS, ignore_index=True)
+    assert obtenu[DIMENSIONS].equals(attendu[DIMENSIONS])
+    assert np.array_equal(obtenu['n_lignes'], attendu['n_lignes'])
+    assert np.allclose(obtenu['montant'], attendu['montant'])
+    print(f"valeurs manquantes ignorées comme groupby(dropna=True) : OK "
+          f"({nb_lignes - int(attendu['n_lignes'].sum()):,} lignes écartées)\n")
+
+
+def chronometrer(fonction, repetitions=5):
+    durees = []
+    for _ in range(repetitions):
+        t0 = time.perf_counter()
+        fonction()
+        durees.append(time.perf_counter() - t0)
+    return min(durees)
+
+
+def main(nb_lignes=1_000_000, nb_jours=365):
+    import exercice2_dashboard_style as dashboard
+
+    sections = {
+        'vue d\'ensemble': dashboard.maj_vue_ensemble,
+        'ventes quotidiennes': partial(inspect.unwrap(dashboard.maj_ventes_quotidiennes), debut=None, fin=None),
+        'magasins': dashboard.maj_magasins,
+        'catégories': dashboard.maj_categories,
+        'paiements': dashboard.maj_paiements,
+        'satisfaction': dashboard.maj_satisfaction,
+    }
+    sections = {nom: inspect.unwrap(section) for nom, section in sections.items()}
+    # Agrégations demandées par chaque section (sans construction des figures)
+    agregations = {
+        'vue d\'ensemble': lambda s: s.totaux(),
+        'ventes quotidiennes': lambda s: s.par_jour('montant'),
+        'magasins': lambda s: s.tableau(['Magasin']),
+        'catégories': lambda s: (s.tableau(['Categorie_Produit']),
+                                 s.tableau(['Magasin', 'Categorie_Produit'])),
+        'paiements': lambda s: s.tableau(['Mode_Paiement']),
+        'satisfaction': lambda s: (s.tableau(['Magasin']), s.tableau(['Categorie_Produit']),
+                                   s.distribution_satisfaction()),
+    }
+
+    cube = CubeVentes(MoteurFiltres(generer_transactions(nb_lignes, nb_jours=nb_jours), DIMENSIONS))
+    selection = cube.selection({})
+    print(f"\n{nb_lignes:,} lignes, cube de {int(np.prod(cube.forme)):,} cellules\n")
+
+    # Mêmes tableaux par les deux chemins
+    separee, fusionnee = copie(selection, SelectionSeparee), copie(selection, SelectionCube)
+    ecart, memes_cles = 0.0, True
+    for dimensions in TABLEAUX:
+        attendu, obtenu = separee.tableau(dimensions), fusionnee.tableau(dimensions)
+        memes_cles &= attendu[dimensions].equals(obtenu[dimensions])
+        attendu, obtenu = (t.drop(columns=dimensions).to_numpy(dtype=float) for t in (attendu, obtenu))
+        ecart = max(ecart, np.nanmax(np.abs(obtenu - attendu) / np.maximum(np.abs(attendu), 1)))
+    print(f"mêmes combinaisons : {'OK' if memes_cles else 'DIFFÉRENT'}, "
+          f"écart relatif maximal des agrégats : {ecart:.1e}")
+    verifier_manquantes(nb_jours)
+
+    for titre, fonctions in (('agrégations', agregations), ('sections complètes', sections)):
+        print(f"{titre:<22}{'avant':>10}{'après (neuve)':>16}{'après (mémo.)':>15}")
+        for nom, fonction in fonctions.items():
+            avant = chronometrer(lambda: fonction(copie(selection, SelectionSeparee)))
+            neuve = chronometrer(lambda: fonction(copie(selection, SelectionCube)))
+            memorisee = copie(selection, SelectionCube)
+            fonction(memorisee)
+            memo = chronometrer(lambda: fonction(memorisee))
+            print(f"  {nom:<20}{avant * 1000:>7.2f} ms{neuve * 1000:>13.2f} ms{memo * 1000:>12.2f} ms")
+
+        def page(classe):
+            partagee = copie(selection, classe)
+            for fonction in fonctions.values():
+                fonction(partagee)
+        avant, apres = chronometrer(lambda: page(SelectionSeparee)), chronometrer(lambda: page(SelectionCube))
+        print(f"  {'page complète':<20}{avant * 1000:>7.2f} ms{apres * 1000:>13.2f} ms"
+              f"   (sections successives sur une même sélection)\n")
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:3]))
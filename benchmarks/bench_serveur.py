@@ -0,0 +1,159 @@
+"""
+Test de charge : serveur de développement (app.run(debug=True)) contre
+lancement de production (serveur.py : gunicorn, workers préchargés,
+compression gzip).
+
+Chaque serveur est démarré dans un processus séparé, puis des clients
+concurrents (threads) envoient pendant une durée fixe les requêtes d'un
+affichage de la page : layout, puis tous les callbacks, pour une suite de
+combinaisons de filtres (sélections neuves et déjà en cache). Pour chaque
+serveur : requêtes par seconde, latences médiane et p95, erreurs et
+octets reçus par requête.
+
+Les clients tournent sur la même machine que le serveur : sur peu de CPU,
+ils en consomment une partie, et le gain des workers supplémentaires est
+borné par le nombre de cœurs.
+
+Usage : python -m benchmarks.bench_serveur [exercice1|exercice2] [duree_s] [clients] [workers]
+"""
+
+import itertools
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from serveur import DASHBOARDS
+
+PORT_PRODUCTION = 8061
+
+# Valeurs des entrées des callbacks, par affichage simulé
+ENTREES = {
+    'exercice2': [
+        {'filtre-magasin.value': magasin, 'filtre-categorie.value': categorie,
+         'filtre-paiement.value': paiement, 'filtre-periode.start_date': '2024-12-01',
+         'filtre-periode.end_date': fin, 'graph-ventes-quotidiennes.relayoutData': None,
+         'tableau-transactions.page_current': 0, 'tableau-transactions.page_size': 15,
+         'tableau-transactions.sort_by': [], 'tableau-transactions.filter_query': ''}
+        for magasin, categorie, paiement, fin in itertools.product(
+            ['ALL', 'Paris', 'Lyon'], ['ALL', 'Meubles'], ['ALL', 'PayPal'],
+            ['2024-12-07', '2024-12-04'])
+    ],
+    'exercice1': [
+        {'top-k.value': k, 'top-categorie.value': categorie, 'top-paiement.value': paiement,
+         'top-periode.start_date': None, 'top-periode.end_date': None}
+        for k, categorie, paiement in itertools.product(
+            [5, 10, 25], ['ALL', 'Maison', 'Jouets'], ['ALL', 'PayPal'])
+    ],
+}
+
+
+def requete(url, corps=None):
+    """(statut, octets reçus, durée) d'une requête GET ou POST JSON"""
+    donnees = None if corps is None else json.dumps(corps).encode('utf-8')
+    demande = urllib.request.Request(url, data=donnees, headers={
+        'Content-Type': 'application/json', 'Accept-Encoding': 'gzip'})
+    t0 = time.perf_counter()
+    try:
+        with urllib.request.urlopen(demande, timeout=60) as reponse:
+            statut, octets = reponse.status, len(reponse.read())
+    except urllib.error.HTTPError as erreur:
+        statut, octets = erreur.code, 0
+    except OSError:
+        statut, octets = None, 0
+    return statut, octets, time.perf_counter() - t0
+
+
+def attendre(url, delai=120):
+    fin = time.monotonic() + delai
+    while time.monotonic() < fin:
+        if requete(url + '/_dash-layout')[0] == 200:
+            return
+        time.sleep(0.5)
+    raise RuntimeError(f"Serveur injoignable : {url}")
+
+
+def affichages(url, dashboard):
+    """Requêtes (chemin, corps) de chaque affichage simulé"""
+    dependances = json.loads(urllib.request.urlopen(url + '/_dash-dependencies').read())
+    for valeurs in ENTREES[dashboard]:
+        requetes = [('/_dash-layout', None)]
+        for dependance in dependances:
+            cles = [f"{e['id']}.{e['property']}" for e in dependance['inputs']]
+            if not all(cle in valeurs for cle in cles):
+                continue
+            sorties = [dict(zip(('id', 'property'), sortie.split('.')))
+                       for sortie in dependance['output'].strip('.').split('...')]
+            requetes.append(('/_dash-update-component', {
+                'output': dependance['output'], 'outputs': sorties, 'changedPropIds': [],
+                'inputs': [{'id': e['id'], 'property': e['property'], 'value': valeurs[cle]}
+                           for e, cle in zip(dependance['inputs'], cles)],
+            }))
+        yield requetes
+
+
+def charger(url, dashboard, duree, clients):
+    """Envoie les affichages en boucle pendant duree secondes ; renvoie les mesures"""
+    cycle = itertools.cycle(list(affichages(url, dashboard)))
+    verrou = threading.Lock()
+    resultats = []
+    fin = time.monotonic() + duree
+
+    def client():
+        while time.monotonic() < fin:
+            with verrou:
+                requetes = next(cycle)
+            for chemin, corps in requetes:
+                resultats.append(requete(url + chemin, corps))
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(clients) as executeur:
+        for futur in [executeur.submit(client) for _ in range(clients)]:
+            futur.result()
+    return resultats, time.perf_counter() - t0
+
+
+def mesurer(nom, commande, url, dashboard, duree, clients):
+    processus = subprocess.Popen(commande, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                 start_new_session=True)
+    try:
+        attendre(url)
+        charger(url, dashboard, 2, clients)  # échauffement
+        resultats, ecoule = charger(url, dashboard, duree, clients)
+    finally:
+        os.killpg(processus.pid, signal.SIGTERM)
+        processus.wait()
+    statuts = [statut for statut, _, _ in resultats]
+    durees = np.array([d for _, _, d in resultats]) * 1000
+    erreurs = sum(statut != 200 for statut in statuts)
+    octets = np.mean([o for s, o, _ in resultats if s == 200] or [0])
+    print(f"{nom:<40}{len(resultats) / ecoule:>9.1f}{np.median(durees):>10.1f} ms"
+          f"{np.percentile(durees, 95):>9.1f} ms{erreurs:>9}{octets / 1024:>9.1f} Ko")
+    return len(resultats) / ecoule
+
+
+def main(dashboard='exercice2', duree=15, clients=8, workers=None):
+    module, port = DASHBOARDS[dashboard]
+    workers = workers or os.cpu_count() or 1
+    print(f"\n{dashboard} : {clients} clients pendant {duree} s, {os.cpu_count()} CPU\n")
+    print(f"{'serveur':<40}{'req/s':>9}{'médiane':>13}{'p95':>12}{'erreurs':>9}{'reçu/req':>12}")
+    debug = mesurer('app.run(debug=True)', [sys.executable, f'{module}.py'],
+                    f'http://127.0.0.1:{port}', dashboard, duree, clients)
+    production = mesurer(f'serveur.py ({workers} worker(s) × 4 threads)',
+                         [sys.executable, 'serveur.py', dashboard, '--workers', str(workers),
+                          '--port', str(PORT_PRODUCTION)],
+                         f'http://127.0.0.1:{PORT_PRODUCTION}', dashboard, duree, clients)
+    print(f"\ndébit : {production / debug:.1f}x")
+
+
+if __name__ == '__main__':
+    arguments = sys.argv[1:]
+    main(*arguments[:1], *(int(a) for a in arguments[1:4]))
@@ -0,0 +1,92 @@
+"""
+Tableau des transactions paginé côté serveur (moteur.tableaux) contre
+tableau complet envoyé au navigateur.
+
+Avant : un DataTable natif reçoit toutes les lignes retenues par les
+filtres (to_dict('records')) et trie ou filtre dans le navigateur ; côté
+serveur, un tri revient à trier le DataFrame. Après : le serveur ne renvoie
+que la page visible, triée par les permutations pré-calculées du
+MoteurFiltres.
+
+Pour chaque requête (sans tri, tri simple, tri multiple, filtre d'en-tête,
+sur toutes les lignes puis sur un magasin) : temps et taille JSON de la
+réponse avant / après, et contrôle que la page est celle d'un tri pandas
+stable. Le premier tri d'une colonne calcule sa permutation (mesuré à part).
+
+Usage : python -m benchmarks.bench_tableaux [nb_lignes]
+"""
+
+import json
+import sys
+import time
+
+from benchmarks.donnees_synthetiques import generer_transactions
+from moteur.filtres import MoteurFiltres
+from moteur.schema import SCHEMA_VENTES, appliquer_schema
+from moteur.tableaux import page_serveur
+
+DIMENSIONS = ['Magasin', 'Categorie_Produit', 'Mode_Paiement']
+TAILLE_PAGE = 15
+
+REQUETES = {
+    'sans tri': ([], ''),
+    'tri Montant décroissant': ([{'column_id': 'Montant', 'direction': 'desc'}], ''),
+    'tri Satisfaction, Montant': ([{'column_id': 'Satisfaction_Client', 'direction': 'desc'},
+                                   {'column_id': 'Montant', 'direction': 'asc'}], ''),
+    'filtre Montant > 900': ([{'column_id': 'Quantite', 'direction': 'desc'}], '{Montant} > 900'),
+}
+
+
+def chronometrer(fonction, repetitions=3):
+    durees = []
+    for _ in range(repetitions):
+        t0 = time.perf_counter()
+        resultat = fonction()
+        durees.append(time.perf_counter() - t0)
+    return min(durees), resultat
+
+
+def avant(moteur, indices, sort_by, filtre):
+    """Lignes retenues triées par pandas, toutes sérialisées"""
+    lignes = moteur.lignes(indices)
+    if filtre:
+        lignes = lignes[lignes['Montant'] > 900]
+    if sort_by:
+        lignes = lignes.sort_values([tri['column_id'] for tri in sort_by],
+                                    ascending=[tri['direction'] == 'asc' for tri in sort_by],
+                                    kind='stable')
+    return lignes, json.dumps(lignes.astype(str).to_dict('records'))
+
+
+def apres(moteur, indices, sort_by, filtre):
+    page, _ = page_serveur(moteur, indices, 0, TAILLE_PAGE, sort_by, filtre)
+    return page, json.dumps(page.astype(str).to_dict('records'))
+
+
+def main(nb_lignes=1_000_000):
+    df, _, _ = appliquer_schema(generer_transactions(nb_lignes), SCHEMA_VENTES)
+    moteur = MoteurFiltres(df, DIMENSIONS)
+
+    t0 = time.perf_counter()
+    for colonne in ('Montant', 'Satisfaction_Client', 'Quantite'):
+        for decroissant in (False, True):
+            moteur.rangs(colonne, decroissant)
+    print(f"\n{nb_lignes:,} lignes ; permutations et rangs de 3 colonnes : "
+          f"{(time.perf_counter() - t0) * 1000:.0f} ms (une fois par version des données)\n")
+
+    print(f"{'requête':<34}{'avant':>10}{'JSON':>11}{'après':>10}{'JSON':>9}  page")
+    for selection in ({}, {'Magasin': 'Paris'}):
+        indices = moteur.indices(selection)
+        portee = 'Paris' if selection else 'tout'
+        for nom, (sort_by, filtre) in REQUETES.items():
+            duree_avant, (attendu, json_avant) = chronometrer(lambda: avant(moteur, indices, sort_by, filtre))
+            duree_apres, (page, json_apres) = chronometrer(lambda: apres(moteur, indices, sort_by, filtre))
+            identique = page.index.equals(attendu.index[:TAILLE_PAGE])
+            print(f"{nom + ' (' + portee + ')':<34}{duree_avant * 1000:>7.0f} ms"
+                  f"{len(json_avant) / 1024 ** 2:>8.1f} Mo{duree_apres * 1000:>7.1f} ms"
+                  f"{len(json_apres) / 1024:>6.1f} Ko  {'OK' if identique else 'DIFFÉRENT'}")
+            assert identique
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:2]))
@@ -0,0 +1,87 @@
+"""
+Classement des meilleurs clients (IndicateursKPI.top_clients) contre
+groupby + nlargest.
+
+Avant : le top des clients demandait la CLV de tous les clients, par un
+groupby('ID_Client') sur les transactions retenues, puis nlargest. Après :
+sans filtre, sélection (argpartition) sur les sommes par client déjà
+agrégées ; avec filtres (catégorie, mode de paiement, période), sommes
+des clés retenues par bincount sur les agrégats de VentesClients (par
+client, catégorie et mode, et par jour pour une période), puis la même
+sélection.
+
+Pour chaque requête : temps avant / après et contrôle que le classement
+(clients, CLV, nombre de transactions) est identique. Sont aussi donnés le
+coût de construction des agrégats et la mémoire de VentesClients.
+
+Usage : python -m benchmarks.bench_top_clients [nb_lignes] [k]
+"""
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.donnees_synthetiques import generer_transactions
+from moteur.kpi import AgregatsKPI, IndicateursKPI
+from moteur.schema import SCHEMA_VENTES, appliquer_schema
+
+REQUETES = {
+    'sans filtre': (None, None, None, None),
+    'catégorie': ('Meubles', None, None, None),
+    'catégorie + paiement': ('Meubles', 'PayPal', None, None),
+    'période (un mois)': (None, None, '2024-06-01', '2024-06-30'),
+    'les trois': ('Électronique', 'Espèces', '2024-03-01', '2024-09-30'),
+}
+
+
+def chronometrer(fonction, repetitions=5):
+    durees = []
+    for _ in range(repetitions):
+        t0 = time.perf_counter()
+        resultat = fonction()
+        durees.append(time.perf_counter() - t0)
+    return min(durees), resultat
+
+
+def avant(df, k, categorie, mode, debut, fin):
+    retenues = pd.Series(True, index=df.index)
+    if categorie:
+        retenues &= df['Categorie_Produit'] == categorie
+    if mode:
+        retenues &= df['Mode_Paiement'] == mode
+    if debut:
+        retenues &= df['Date_Transaction'] >= pd.Timestamp(debut)
+    if fin:
+        retenues &= df['Date_Transaction'] < pd.Timestamp(fin) + pd.Timedelta(days=1)
+    groupes = df[retenues].groupby('ID_Client', observed=True)['Montant']
+    clv = groupes.sum().sort_index().nlargest(k)
+    return clv, groupes.size()[clv.index]
+
+
+def main(nb_lignes=1_000_000, k=10):
+    df, _, _ = appliquer_schema(generer_transactions(nb_lignes), SCHEMA_VENTES)
+    t0 = time.perf_counter()
+    agregats = AgregatsKPI(df, 'Montant', quantiles='kll')
+    duree_agregats = time.perf_counter() - t0
+    memoire = agregats.ventes_clients.octets()
+    print(f"\n{nb_lignes:,} lignes, {len(agregats.clients.cles):,} clients, top {k}")
+    print(f"agrégats de l'exercice 1 : {duree_agregats * 1000:.0f} ms ; VentesClients : "
+          f"{memoire / 1024 ** 2:.1f} Mo\n")
+
+    print(f"{'requête':<24}{'avant':>11}{'après':>11}{'gain':>8}  classement")
+    for nom, filtres in REQUETES.items():
+        kpi = IndicateursKPI(1, agregats)
+        duree_avant, (attendu, comptes) = chronometrer(lambda: avant(df, k, *filtres))
+        duree_apres, obtenu = chronometrer(lambda: kpi.top_clients(k, *filtres))
+        identique = (list(obtenu.index) == list(attendu.index)
+                     and np.allclose(obtenu['clv'], attendu.to_numpy())
+                     and (obtenu['nb_transactions'].to_numpy() == comptes.to_numpy()).all())
+        print(f"{nom:<24}{duree_avant * 1000:>8.1f} ms{duree_apres * 1000:>8.1f} ms"
+              f"{duree_avant / duree_apres:>7.1f}x  {'OK' if identique else 'DIFFÉRENT'}")
+        assert identique, nom
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:3]))
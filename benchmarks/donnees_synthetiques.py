@@ -0,0 +1,88 @@
+"""
+Générateurs de transactions synthétiques aux schémas des classeurs :
+data_dashboard_large.xlsx (exercice 2) et data_kpi.xlsx (exercice 1)
+"""
+
+import numpy as np
+import pandas as pd
+
+# Valeurs dans l'ordre trié : leurs positions sont les codes des catégories
+# produites par moteur.schema.appliquer_schema
+MAGASINS = ['Bordeaux', 'Lille', 'Lyon', 'Marseille', 'Paris']
+CATEGORIES = ['Meubles', 'Vêtements', 'Électronique']
+MODES_PAIEMENT = ['Carte bancaire', 'Espèces', 'PayPal']
+
+CATEGORIES_KPI = ['Jouets', 'Maison', 'Vêtements', 'Électronique']
+MODES_PAIEMENT_KPI = ['Carte bancaire', 'PayPal', 'Virement']
+
+LIGNES_PAR_MORCEAU = 1_000_000
+
+
+def _dimension(rng, valeurs, nb_lignes, p, categories):
+    """Tirage d'une dimension : texte, ou directement en catégories (même tirage)"""
+    codes = rng.choice(len(valeurs), nb_lignes, p=p)
+    if categories:
+        return pd.Categorical.from_codes(codes, categories=valeurs)
+    return np.asarray(valeurs, dtype=object)[codes]
+
+
+def _clients(identifiants, categories):
+    return pd.Categorical(identifiants) if categories else identifiants
+
+
+def generer_transactions(nb_lignes, nb_jours=365, nb_clients=50_000, graine=0, categories=False):
+    """
+    Génère un DataFrame de transactions (montant déjà numérique, dates
+    triées). Avec categories=True, clients et dimensions sont produits
+    comme après le schéma (sans passer par le texte : grands volumes).
+    """
+    rng = np.random.default_rng(graine)
+    debut = np.datetime64('2024-01-01')
+    jours = np.sort(rng.integers(0, nb_jours, nb_lignes))
+    return pd.DataFrame({
+        'ID_Client': _clients(rng.integers(1, nb_clients + 1, nb_lignes), categories),
+        'Date_Transaction': (debut + jours.astype('timedelta64[D]')).astype('datetime64[ns]'),
+        'Montant': rng.uniform(20, 1000, nb_lignes).round(2),
+        'Magasin': _dimension(rng, MAGASINS, nb_lignes, [0.15, 0.10, 0.25, 0.20, 0.30], categories),
+        'Categorie_Produit': _dimension(rng, CATEGORIES, nb_lignes, [0.25, 0.35, 0.40], categories),
+        'Quantite': rng.integers(1, 10, nb_lignes),
+        'Mode_Paiement': _dimension(rng, MODES_PAIEMENT, nb_lignes, [0.6, 0.1, 0.3], categories),
+        'Satisfaction_Client': rng.integers(1, 6, nb_lignes),
+    })
+
+
+def generer_transactions_kpi(nb_lignes, nb_jours=21, nb_clients=None, graine=0, categories=False):
+    """
+    Transactions au schéma de data_kpi.xlsx (Montant_Transaction). Par
+    défaut, un client pour 2,5 transactions comme dans le classeur.
+    """
+    rng = np.random.default_rng(graine)
+    nb_clients = nb_clients or max(1, int(nb_lignes / 2.5))
+    debut = np.datetime64('2024-12-01')
+    jours = np.sort(rng.integers(0, nb_jours, nb_lignes))
+    return pd.DataFrame({
+        'ID_Client': _clients(rng.integers(1, nb_clients + 1, nb_lignes), categories),
+        'Montant_Transaction': rng.uniform(10, 500, nb_lignes).round(2),
+        'Date_Transaction': (debut + jours.astype('timedelta64[D]')).astype('datetime64[ns]'),
+        'Categorie_Produit': _dimension(rng, CATEGORIES_KPI, nb_lignes, [0.2, 0.3, 0.2, 0.3], categories),
+        'Mode_Paiement': _dimension(rng, MODES_PAIEMENT_KPI, nb_lignes, [0.6, 0.3, 0.1], categories),
+    })
+
+
+def ecrire_parquet(chemin, generateur, nb_lignes, colonne_montant, **parametres):
+    """
+    Écrit nb_lignes transactions de generateur dans un fichier Parquet, par
+    morceaux (mémoire bornée), montant en texte à virgule décimale comme
+    dans les classeurs
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    ecrivain = None
+    for graine, debut in enumerate(range(0, nb_lignes, LIGNES_PAR_MORCEAU)):
+        df = generateur(min(LIGNES_PAR_MORCEAU, nb_lignes - debut), graine=graine, **parametres)
+        df[colonne_montant] = df[colonne_montant].astype(str).str.replace('.', ',', regex=False)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        ecrivain = ecrivain or pq.ParquetWriter(chemin, table.schema)
+        ecrivain.write_table(table)
+    ecrivain.close()
@@ -0,0 +1,310 @@
+"""
+Suite de benchmarks des deux dashboards, comparable à une référence.
+
+Pour chaque taille (10k, 1m, 20m lignes), des transactions synthétiques aux
+schémas des classeurs (data_kpi.xlsx, data_dashboard_large.xlsx) sont
+écrites dans des fichiers Parquet, montants en texte à virgule décimale.
+Chaque taille est mesurée dans un processus séparé :
+
+- exercice 1 : chargement par blocs (lecture, nettoyage, AgregatsKPI),
+  chaque KPI sur des indicateurs neufs (dépendances comprises), le top des
+  clients pour plusieurs filtres, le layout et sa sérialisation JSON ;
+- exercice 2 : chargement par blocs (cube), index de filtrage et cube sur
+  les données en mémoire, puis pour chaque combinaison de filtres : la
+  sélection du cube, chaque section (sans le cache des sections), la
+  sérialisation de ses sorties (temps et octets) et une page triée du
+  détail des transactions.
+
+Chaque mesure garde le meilleur temps de --repetitions exécutions, puis une
+exécution de plus sous tracemalloc donne son pic de mémoire (allocations
+Python et NumPy). Le pic de mémoire du processus (ru_maxrss) est relevé
+pour chaque taille. Les résultats sont écrits en JSON (--sortie) et
+comparés à la référence (--reference) : un écart au-delà de la tolérance
+(et d'un seuil absolu, contre le bruit des petites mesures) est signalé, et
+le code de retour vaut 1 en cas de régression.
+
+La référence benchmarks/reference.json couvre 10k et 1m ; 20m (plusieurs
+Go de mémoire) n'est mesuré qu'à la demande.
+
+Usage : python -m benchmarks.suite [--tailles 10k,1m] [--sortie resultats.json]
+        [--reference benchmarks/reference.json] [--tolerance 0.5]
+        [--repetitions 5] [--nouvelle-reference]
+"""
+
+import argparse
+import inspect
+import json
+import multiprocessing as mp
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from functools import partial
+
+import numpy as np
+
+from benchmarks.donnees_synthetiques import (ecrire_parquet, generer_transactions,
+                                             generer_transactions_kpi)
+
+TAILLES = {'10k': 10_000, '1m': 1_000_000, '20m': 20_000_000}
+REFERENCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reference.json')
+
+# En deçà de ces écarts absolus, une différence relative n'est pas signalée
+SEUIL_SECONDES = 0.002
+SEUIL_MEMOIRE_MO = 1.0
+
+# Combinaisons de filtres de l'exercice 2 : (magasin, catégorie, paiement, début, fin)
+COMBINAISONS = {
+    'tout': ('ALL', 'ALL', 'ALL', None, None),
+    'magasin': ('Paris', 'ALL', 'ALL', None, None),
+    'trois filtres': ('Lyon', 'Vêtements', 'Carte bancaire', None, None),
+    'un mois': ('ALL', 'ALL', 'ALL', '2024-03-01', '2024-03-31'),
+}
+
+# Filtres du top des clients de l'exercice 1 : (catégorie, paiement, début, fin)
+REQUETES_TOP = {
+    'sans filtre': (None, None, None, None),
+    'catégorie': ('Maison', None, None, None),
+    'catégorie + paiement': ('Maison', 'PayPal', None, None),
+    'une semaine': (None, None, '2024-12-05', '2024-12-11'),
+}
+
+TRI_TRANSACTIONS = [{'column_id': 'Montant', 'direction': 'desc'}]
+
+
+class SourceFigee:
+    """Source de données réduite à des structures déjà préparées"""
+
+    def __init__(self, structures, version='benchmark'):
+        self.version = version
+        self._courant = (version, structures)
+
+    def obtenir(self):
+        return self._courant
+
+
+class Mesures:
+    """Mesures d'une taille : meilleur temps, puis pic de mémoire sous tracemalloc"""
+
+    def __init__(self, repetitions):
+        self.repetitions = repetitions
+        self.resultats = {}
+
+    def mesurer(self, nom, fonction, preparer=None, repetitions=None):
+        """
+        Mesure fonction(*preparer()) ; preparer (non chronométré) fournit
+        des arguments neufs à chaque exécution. Renvoie le dernier résultat.
+        """
+        preparer = preparer or tuple
+        durees = []
+        for _ in range(repetitions or self.repetitions):
+            arguments = preparer()
+            t0 = time.perf_counter()
+            resultat = fonction(*arguments)
+            durees.append(time.perf_counter() - t0)
+        arguments = preparer()
+        tracemalloc.start()
+        try:
+            resultat = fonction(*arguments)
+            _, pic = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.resultats[nom] = {'secondes': min(durees), 'memoire_mo': pic / 1024 ** 2}
+        return resultat
+
+    def serialiser(self, nom, objet):
+        """Mesure la sérialisation JSON de objet (temps, mémoire et octets)"""
+        import plotly.io as pio
+
+        texte = self.mesurer(nom, lambda: pio.json.to_json_plotly(objet))
+        self.resultats[nom]['octets'] = len(texte.encode('utf-8'))
+
+
+# ==============================================================================
+# EXERCICE 1 : KPI
+# ==============================================================================
+def mesurer_exercice1(mesures, chemin):
+    import exercice1_dashboard_kpi as dashboard
+    from moteur.kpi import AgregatsKPI, IndicateursKPI, ServiceKPI, integrer_lot
+    from moteur.lecture_flux import agreger_par_blocs, lire_par_blocs
+
+    agregats = mesures.mesurer('ex1/chargement', lambda: agreger_par_blocs(
+        lire_par_blocs(chemin, 'Montant_Transaction'),
+        lambda bloc: AgregatsKPI(bloc, quantiles=dashboard.MODE_QUANTILES), integrer_lot
+    ), repetitions=1)
+
+    neufs = lambda: (IndicateursKPI(1, agregats),)
+    for nom, attribut in vars(IndicateursKPI).items():
+        if isinstance(attribut, property):
+            mesures.mesurer(f'ex1/kpi/{nom}', lambda kpi, nom=nom: getattr(kpi, nom), neufs)
+    for nom, filtres in REQUETES_TOP.items():
+        mesures.mesurer(f'ex1/top_clients/{nom}', lambda kpi, filtres=filtres: kpi.top_clients(10, *filtres), neufs)
+
+    # Construction du layout (layout() la mémorise ensuite par version)
+    dashboard.service_kpi = ServiceKPI(SourceFigee(agregats))
+    mesures.serialiser('ex1/layout (JSON)', mesures.mesurer(
+        'ex1/layout', lambda: dashboard.construire_layout(dashboard.service_kpi.actualiser())))
+
+
+# ==============================================================================
+# EXERCICE 2 : SECTIONS DU DASHBOARD
+# ==============================================================================
+def mesurer_exercice2(mesures, chemin, nb_lignes):
+    import exercice2_dashboard_style as dashboard
+    from moteur.lecture_flux import agreger_par_blocs, lire_par_blocs
+    from moteur.schema import SCHEMA_VENTES, appliquer_schema
+
+    mesures.mesurer('ex2/chargement', lambda: agreger_par_blocs(
+        lire_par_blocs(chemin, 'Montant'), dashboard.preparer_dashboard, dashboard.integrer_lot
+    ), repetitions=1)
+
+    # Index de filtrage complet (le détail des transactions en a besoin)
+    df, _, _ = appliquer_schema(generer_transactions(nb_lignes, categories=True), SCHEMA_VENTES)
+    structures = mesures.mesurer('ex2/index et cube',
+                                 lambda: dashboard.preparer_dashboard(df), repetitions=1)
+    del df
+    cube = structures[1]
+    dashboard.source = SourceFigee(structures)
+
+    sections = {
+        'vue d\'ensemble': dashboard.maj_vue_ensemble,
+        'ventes quotidiennes': partial(inspect.unwrap(dashboard.maj_ventes_quotidiennes),
+                                       debut=None, fin=None),
+        'magasins': dashboard.maj_magasins,
+        'catégories': dashboard.maj_categories,
+        'paiements': dashboard.maj_paiements,
+        'satisfaction': dashboard.maj_satisfaction,
+    }
+    sections = {nom: inspect.unwrap(section) for nom, section in sections.items()}
+
+    for combinaison, filtres in COMBINAISONS.items():
+        magasin, categorie, paiement, debut, fin = filtres
+        selectionner = lambda: cube.selection(
+            {'Magasin': magasin, 'Categorie_Produit': categorie, 'Mode_Paiement': paiement},
+            debut, fin
+        )
+        mesures.mesurer(f'ex2/{combinaison}/sélection', selectionner)
+        for nom, section in sections.items():
+            sorties = mesures.mesurer(f'ex2/{combinaison}/{nom}', section,
+                                      lambda: (selectionner(),))
+            mesures.serialiser(f'ex2/{combinaison}/{nom} (JSON)', list(sorties))
+        mesures.mesurer(f'ex2/{combinaison}/transactions', lambda: dashboard.maj_transactions(
+            *filtres, 0, 15, TRI_TRANSACTIONS, ''))
+
+
+# ==============================================================================
+# EXÉCUTION ET COMPARAISON
+# ==============================================================================
+def mesurer_taille(taille, repetitions):
+    """Toutes les mesures d'une taille (appelée dans un processus dédié)"""
+    nb_lignes = TAILLES[taille]
+    mesures = Mesures(repetitions)
+    with tempfile.TemporaryDirectory() as dossier:
+        chemin_kpi = os.path.join(dossier, 'kpi.parquet')
+        chemin_ventes = os.path.join(dossier, 'ventes.parquet')
+        ecrire_parquet(chemin_kpi, generer_transactions_kpi, nb_lignes, 'Montant_Transaction')
+        ecrire_parquet(chemin_ventes, generer_transactions, nb_lignes, 'Montant')
+        mesurer_exercice1(mesures, chemin_kpi)
+        mesurer_exercice2(mesures, chemin_ventes, nb_lignes)
+    rss_max = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return mesures.resultats, rss_max
+
+
+def meta():
+    import dash
+    import pandas as pd
+    import plotly
+    import pyarrow
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'machine': f'{platform.machine()}, {os.cpu_count()} CPU',
+        'python': platform.python_version(),
+        'versions': {module.__name__: module.__version__
+                     for module in (np, pd, pyarrow, plotly, dash)},
+    }
+
+
+def ecarts(resultats, reference, tolerance):
+    """(régressions, améliorations) : lignes décrivant les écarts significatifs"""
+    regressions, ameliorations = [], []
+    for taille, mesures in resultats['resultats'].items():
+        anciennes = reference['resultats'].get(taille, {})
+        valeurs = [(f'{taille} {nom}', grandeur, ancienne[grandeur], mesure[grandeur], seuil, unite)
+                   for nom, mesure in mesures.items() if (ancienne := anciennes.get(nom))
+                   for grandeur, seuil, unite in (('secondes', SEUIL_SECONDES, 's'),
+                                                  ('memoire_mo', SEUIL_MEMOIRE_MO, 'Mo'))]
+        if taille in reference.get('rss_max_mo', {}):
+            valeurs.append((f'{taille} processus', 'rss_max_mo', reference['rss_max_mo'][taille],
+                            resultats['rss_max_mo'][taille], 10 * SEUIL_MEMOIRE_MO, 'Mo'))
+        for nom, grandeur, avant, apres, seuil, unite in valeurs:
+            if abs(apres - avant) <= seuil or abs(apres - avant) <= tolerance * avant:
+                continue
+            ligne = f"{nom} [{grandeur}] : {avant:.4g} -> {apres:.4g} {unite} ({apres / max(avant, 1e-12):.2f}x)"
+            (regressions if apres > avant else ameliorations).append(ligne)
+    return regressions, ameliorations
+
+
+def main(arguments=None):
+    parseur = argparse.ArgumentParser(description="Suite de benchmarks des deux dashboards")
+    parseur.add_argument('--tailles', default='10k,1m',
+                         help="tailles séparées par des virgules, parmi " + ', '.join(TAILLES))
+    parseur.add_argument('--sortie', help="fichier JSON des résultats")
+    parseur.add_argument('--reference', default=REFERENCE, help="résultats de référence")
+    parseur.add_argument('--tolerance', type=float, default=0.5,
+                         help="écart relatif toléré avant de signaler une régression")
+    parseur.add_argument('--repetitions', type=int, default=5)
+    parseur.add_argument('--nouvelle-reference', action='store_true',
+                         help="écrit les résultats comme nouvelle référence")
+    options = parseur.parse_args(arguments)
+
+    tailles = options.tailles.split(',')
+    inconnues = [taille for taille in tailles if taille not in TAILLES]
+    if inconnues:
+        parseur.error(f"taille(s) inconnue(s) : {', '.join(inconnues)}")
+
+    resultats = {'meta': meta(), 'resultats': {}, 'rss_max_mo': {}}
+    contexte = mp.get_context('fork')
+    for taille in tailles:
+        print(f"⏱️  {taille} ({TAILLES[taille]:,} lignes)...", flush=True)
+        t0 = time.perf_counter()
+        with contexte.Pool(1) as processus:
+            mesures, rss_max = processus.apply(mesurer_taille, (taille, options.repetitions))
+        resultats['resultats'][taille] = mesures
+        resultats['rss_max_mo'][taille] = rss_max
+        print(f"   {len(mesures)} mesures en {time.perf_counter() - t0:.0f} s, "
+              f"pic mémoire du processus : {rss_max:.0f} Mo")
+
+    sortie = options.reference if options.nouvelle_reference else options.sortie
+    if sortie:
+        with open(sortie, 'w', encoding='utf-8') as f:
+            json.dump(resultats, f, indent=1, ensure_ascii=False)
+        print(f"💾 Résultats écrits dans {sortie}")
+    if options.nouvelle_reference or not os.path.isfile(options.reference):
+        return 0
+
+    with open(options.reference, encoding='utf-8') as f:
+        reference = json.load(f)
+    regressions, ameliorations = ecarts(resultats, reference, options.tolerance)
+    print(f"\nComparaison à {options.reference} (commit {reference['meta'].get('commit')}, "
+          f"tolérance {options.tolerance:.0%}) :")
+    for titre, lignes in (('🔺 Régressions', regressions), ('🟢 Améliorations', ameliorations)):
+        print(f"{titre} : {len(lignes)}")
+        for ligne in lignes:
+            print(f"   {ligne}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
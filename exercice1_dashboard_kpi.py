@@ -3,66 +3,75 @@ TP DataViz N°1 - EXERCICE 1 : DASHBOARD KPI STYLÉ
 Dashboard interactif pour l'analyse des 6 KPI
 """
 
+import os
+from functools import partial
+
 import dash
-from dash import dcc, html, dash_table
+from dash import dcc, html, dash_table, Input, Output
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 
+from moteur.chargement import SourceDonnees, charger_donnees
+from moteur.compression import installer_compression
+from moteur.figures import figure_compacte
+from moteur.histogrammes import figure_histogramme
+from moteur.ingestion import route_ingestion
+from moteur.instrumentation import etape, installer_metriques
+from moteur.profilage import Profileur, dossier_profil
+from moteur.kpi import AgregatsKPI, ServiceKPI, integrer_lot
+from moteur.schema import SCHEMA_KPI
+
 # ==============================================================================
-# CHARGEMENT ET PRÉPARATION DES DONNÉES
+# PARAMÈTRES
 # ==============================================================================
-print("🔄 Chargement des données de l'Exercice 1...")
-df = pd.read_excel('data_kpi.xlsx')
-
-# Conversion du montant en numérique
-df['Montant_Transaction'] = pd.to_numeric(df['Montant_Transaction'], errors='coerce')
+def _nb_classes(defaut):
+    """Nombre de classes : DASHBOARD_NB_CLASSES (entier ou 'fd') sinon defaut"""
+    valeur = os.environ.get('DASHBOARD_NB_CLASSES')
+    if not valeur:
+        return defaut
+    return valeur if valeur == 'fd' else int(valeur)
 
-print(f"✅ Données chargées : {len(df)} transactions")
-print(f"📅 Période : du {df['Date_Transaction'].min().date()} au {df['Date_Transaction'].max().date()}")
 
-# ==============================================================================
-# CALCUL DES 6 KPI
-# ==============================================================================
+# Histogrammes calculés côté serveur : nombre de classes, ou 'fd' (Freedman–Diaconis)
+NB_CLASSES_TRANSACTIONS = _nb_classes(20)
+NB_CLASSES_CLV = _nb_classes(30)
 
-# KPI 1 : Valeur moyenne des transactions
-moyenne_transactions = df['Montant_Transaction'].mean()
-min_transaction = df['Montant_Transaction'].min()
-max_transaction = df['Montant_Transaction'].max()
-mediane_transaction = df['Montant_Transaction'].median()
+# Quantiles des montants : 'auto' (exacts jusqu'à 100 000 transactions, puis
+# sketch KLL), 'exact' (toutes les valeurs conservées) ou 'kll'
+MODE_QUANTILES = os.environ.get('DASHBOARD_QUANTILES', 'auto')
 
-# KPI 2 : Répartition des catégories de produits
-ca_par_categorie = df.groupby('Categorie_Produit')['Montant_Transaction'].sum()
-ca_total = ca_par_categorie.sum()
-pourcentage_par_categorie = (ca_par_categorie / ca_total * 100).round(2)
+# Lecture du classeur par blocs de DASHBOARD_TAILLE_BLOC lignes (fichiers plus
+# gros que la mémoire : seuls les agrégats sont conservés)
+TAILLE_BLOC = int(os.environ.get('DASHBOARD_TAILLE_BLOC') or 0) or None
 
-# KPI 3 : Taux de récurrence des clients
-transactions_par_client = df.groupby('ID_Client').size()
-clients_recurrents = transactions_par_client[transactions_par_client > 1]
-nombre_clients_recurrents = len(clients_recurrents)
-nombre_total_clients = len(transactions_par_client)
-taux_recurrence = (nombre_clients_recurrents / nombre_total_clients * 100)
+# Taille maximale du classement des meilleurs clients (section CLV)
+TOP_K_MAX = 100
 
-# KPI 4 : Modes de paiement
-modes_paiement = df['Mode_Paiement'].value_counts()
-total_transactions = len(df)
-pourcentage_modes = (modes_paiement / total_transactions * 100).round(2)
-mode_plus_utilise = modes_paiement.index[0]
+# ==============================================================================
+# CHARGEMENT DES DONNÉES ET SERVICE DES KPI
+# ==============================================================================
+def preparer_kpi(df):
+    """Appelée à chaque (re)chargement du classeur (premier bloc en lecture par blocs)"""
+    if TAILLE_BLOC is None:
+        print(f"✅ Données chargées : {len(df)} transactions")
+        print(f"📅 Période : du {df['Date_Transaction'].min().date()} au {df['Date_Transaction'].max().date()}")
+    return AgregatsKPI(df, quantiles=MODE_QUANTILES)
 
-# KPI 5 : Customer Lifetime Value (CLV)
-clv_par_client = df.groupby('ID_Client')['Montant_Transaction'].sum()
-clv_moyenne = clv_par_client.mean()
-clv_min = clv_par_client.min()
-clv_max = clv_par_client.max()
-clv_mediane = clv_par_client.median()
-top_5_clients = clv_par_client.nlargest(5)
 
-# KPI 6 : Indice de performance des catégories
-categorie_top = ca_par_categorie.idxmax()
-ca_top = ca_par_categorie.max()
-part_ca_top = (ca_top / ca_total * 100)
+# Rien n'est lu ni calculé à l'import : le classeur est chargé (via le cache
+# colonnaire) au premier affichage, et chaque KPI est calculé à la demande
+# puis mémorisé jusqu'au prochain changement des données (classeur modifié
+# ou lot de transactions ajouté via service_kpi.ajouter_transactions).
+# Le schéma stocke clients, catégories et modes de paiement en catégories.
+source = SourceDonnees('data_kpi.xlsx', 'Montant_Transaction', preparer_kpi,
+                       charger=partial(charger_donnees, schema=SCHEMA_KPI),
+                       integrer=integrer_lot, taille_bloc=TAILLE_BLOC, schema=SCHEMA_KPI)
+service_kpi = ServiceKPI(source)
 
-print("\n✅ Tous les KPI ont été calculés !")
+# Mode profilage (DASHBOARD_PROFIL=dossier ou --profil dossier) : chargement
+# et requêtes de callback et de layout profilés, voir moteur/profilage.py
+profileur = Profileur(dossier_profil())
 
 # ==============================================================================
 # CRÉATION DE L'APPLICATION DASH
@@ -383,432 +392,539 @@ app.index_string = '''
 # ==============================================================================
 # LAYOUT DU DASHBOARD
 # ==============================================================================
-app.layout = html.Div([
+def lignes_top_clients(top):
+    """Lignes du tableau des meilleurs clients (médailles pour les 3 premiers)"""
+    return [
+        {
+            'Rang': f'🥇' if i == 0 else f'🥈' if i == 1 else f'🥉' if i == 2 else f'{i+1}',
+            'Client ID': client_id,
+            'CLV (€)': f'{clv:.2f}',
+            'Nb Trans.': nb_transactions
+        }
+        for i, (client_id, clv, nb_transactions) in enumerate(
+            zip(top.index, top['clv'], top['nb_transactions']))
+    ]
+
+
+# Dernier layout construit : (version des données, composants)
+_layout_courant = (None, None)
+
+
+def layout():
+    """
+    Layout de la version courante des données : construit (figures
+    comprises) au premier affichage de chaque version, puis réutilisé
+    """
+    global _layout_courant
+    with etape('layout', 'donnees'):
+        kpi = service_kpi.actualiser()
+    version, composants = _layout_courant
+    if composants is None or version != kpi.version:
+        with etape('layout', 'construction'):
+            composants = construire_layout(kpi)
+        _layout_courant = (kpi.version, composants)
+    return composants
+
+
+def construire_layout(kpi):
+    """Layout de la page pour les KPI d'une version"""
+    premier_jour, dernier_jour = (None if jour is None else str(jour)
+                                  for jour in kpi.periode_transactions)
+    return html.Div([
     
-    # HEADER
-    html.Div([
-        html.H1('Exercice 1 : Calcul des KPI'),
-        html.P('Analyse des Indicateurs Clés de Performance')
-    ], className='main-title'),
+        # HEADER
+        html.Div([
+            html.H1('Exercice 1 : Calcul des KPI'),
+            html.P('Analyse des Indicateurs Clés de Performance')
+        ], className='main-title'),
     
-    # ===========================================================================
-    # RÉSUMÉ DES 6 KPI PRINCIPAUX
-    # ===========================================================================
-    html.Div([
-        html.H2('Résumé des 6 KPI', style={'textAlign': 'center'}),
+        # ===========================================================================
+        # RÉSUMÉ DES 6 KPI PRINCIPAUX
+        # ===========================================================================
         html.Div([
+            html.H2('Résumé des 6 KPI', style={'textAlign': 'center'}),
             html.Div([
+                html.Div([
                 
-                html.Span('1. Valeur moyenne des transactions '), html.Strong(f'{moyenne_transactions:.2f} €')
-            ], className='summary-item'),
+                    html.Span('1. Valeur moyenne des transactions '), html.Strong(f'{kpi.moyenne_transactions:.2f} €')
+                ], className='summary-item'),
             
-            html.Div([
+                html.Div([
                 
-                html.Span('2. Catégorie la plus performante '), html.Strong(f'{categorie_top}')
-            ], className='summary-item'),
+                    html.Span('2. Catégorie la plus performante '), html.Strong(f'{kpi.categorie_top}')
+                ], className='summary-item'),
             
-            html.Div([
+                html.Div([
                 
-                html.Span('3. Taux de récurrence des clients '), html.Strong(f'{taux_recurrence:.2f}%')
-            ], className='summary-item'),
+                    html.Span('3. Taux de récurrence des clients '), html.Strong(f'{kpi.taux_recurrence:.2f}%')
+                ], className='summary-item'),
             
-            html.Div([
+                html.Div([
                 
-                html.Span('4. Mode de paiement le plus utilisé '), html.Strong(f'{mode_plus_utilise}')
-            ], className='summary-item'),
+                    html.Span('4. Mode de paiement le plus utilisé '), html.Strong(f'{kpi.mode_plus_utilise}')
+                ], className='summary-item'),
             
-            html.Div([
+                html.Div([
                 
-                html.Span('5. CLV moyenne '), html.Strong(f'{clv_moyenne:.2f} €')
-            ], className='summary-item'),
+                    html.Span('5. CLV moyenne '), html.Strong(f'{kpi.clv_moyenne:.2f} €')
+                ], className='summary-item'),
             
-            html.Div([
+                html.Div([
                 
-                html.Span('6. Chiffre d\'affaires total '), html.Strong(f'{ca_total:,.2f} €')
-            ], className='summary-item'),
-        ], className='summary-grid')
-    ], className='summary-box'),
+                    html.Span('6. Chiffre d\'affaires total '), html.Strong(f'{kpi.ca_total:,.2f} €')
+                ], className='summary-item'),
+            ], className='summary-grid')
+        ], className='summary-box'),
     
-    # ===========================================================================
-    # KPI 1 : VALEUR MOYENNE DES TRANSACTIONS
-    # ===========================================================================
-    html.Div([
-        html.H2('KPI 1 : Valeur Moyenne des Transactions', className='section-title'),
-        
-        # Carte principale
+        # ===========================================================================
+        # KPI 1 : VALEUR MOYENNE DES TRANSACTIONS
+        # ===========================================================================
         html.Div([
+            html.H2('KPI 1 : Valeur Moyenne des Transactions', className='section-title'),
+        
+            # Carte principale
             html.Div([
-                html.Div('💶', className='kpi-icon'),
-                html.Div(f'{moyenne_transactions:.2f} €', className='kpi-number'),
-                html.Div('Valeur Moyenne', className='kpi-label'),
                 html.Div([
-                    html.Span('✨ ', style={'fontSize': '20px'}),
-                    html.Span('Montant moyen dépensé par transaction', 
-                             style={'fontSize': '14px', 'color': '#718096'})
-                ], style={'marginTop': '15px'})
-            ], className='kpi-card-main', style={'textAlign': 'center', 'flex': '1'}),
-        ], style={'display': 'flex', 'gap': '20px', 'marginBottom': '25px'}),
+                    html.Div('💶', className='kpi-icon'),
+                    html.Div(f'{kpi.moyenne_transactions:.2f} €', className='kpi-number'),
+                    html.Div('Valeur Moyenne', className='kpi-label'),
+                    html.Div([
+                        html.Span('✨ ', style={'fontSize': '20px'}),
+                        html.Span('Montant moyen dépensé par transaction', 
+                                 style={'fontSize': '14px', 'color': '#718096'})
+                    ], style={'marginTop': '15px'})
+                ], className='kpi-card-main', style={'textAlign': 'center', 'flex': '1'}),
+            ], style={'display': 'flex', 'gap': '20px', 'marginBottom': '25px'}),
         
-        # Détails
-        html.Div([
+            # Détails
             html.Div([
-                html.Span('Montant minimum', className='detail-label'),
-                html.Span(f'{min_transaction:.2f} €', className='detail-value')
-            ], className='detail-item'),
-            html.Div([
-                html.Span('Montant maximum', className='detail-label'),
-                html.Span(f'{max_transaction:.2f} €', className='detail-value')
-            ], className='detail-item'),
-            html.Div([
-                html.Span('Médiane', className='detail-label'),
-                html.Span(f'{mediane_transaction:.2f} €', className='detail-value')
-            ], className='detail-item'),
-        ], className='detail-box'),
-    ], className='section-card'),
+                html.Div([
+                    html.Span('Montant minimum', className='detail-label'),
+                    html.Span(f'{kpi.min_transaction:.2f} €', className='detail-value')
+                ], className='detail-item'),
+                html.Div([
+                    html.Span('Montant maximum', className='detail-label'),
+                    html.Span(f'{kpi.max_transaction:.2f} €', className='detail-value')
+                ], className='detail-item'),
+                html.Div([
+                    html.Span('Médiane', className='detail-label'),
+                    html.Span(f'{kpi.mediane_transaction:.2f} €', className='detail-value')
+                ], className='detail-item'),
+            ], className='detail-box'),
+        ], className='section-card'),
     
-    # ===========================================================================
-    # KPI 2 : RÉPARTITION DES CATÉGORIES
-    # ===========================================================================
-    html.Div([
-        html.H2(' KPI 2 : Répartition des Catégories de Produits', className='section-title'),
+        # ===========================================================================
+        # KPI 2 : RÉPARTITION DES CATÉGORIES
+        # ===========================================================================
+        html.Div([
+            html.H2(' KPI 2 : Répartition des Catégories de Produits', className='section-title'),
         
-        # Graphique circulaire
-        dcc.Graph(
-            figure=px.pie(
-                values=pourcentage_par_categorie.values,
-                names=pourcentage_par_categorie.index,
-                title='Répartition des ventes par catégorie',
-                hole=0.4,
-                color_discrete_sequence=px.colors.sequential.RdBu
-            ).update_traces(
-                textposition='inside',
-                textinfo='percent+label',
-                textfont_size=14
-            ).update_layout(
-                font=dict(family='Poppins', size=13),
-                showlegend=True,
-                height=500
+            # Graphique circulaire
+            dcc.Graph(
+                figure=figure_compacte(px.pie(
+                    values=kpi.pourcentage_par_categorie.values,
+                    names=kpi.pourcentage_par_categorie.index,
+                    title='Répartition des ventes par catégorie',
+                    hole=0.4,
+                    color_discrete_sequence=px.colors.sequential.RdBu
+                ).update_traces(
+                    textposition='inside',
+                    textinfo='percent+label',
+                    textfont_size=14
+                ).update_layout(
+                    font=dict(family='Poppins', size=13),
+                    showlegend=True,
+                    height=500
+                )),
+                config={'displayModeBar': False}
             ),
-            config={'displayModeBar': False}
-        ),
         
-        # Tableau détails
-        html.Div([
-            html.H3(' Détails par catégorie', style={'marginBottom': '15px', 'color': '#2d3748'}),
-            dash_table.DataTable(
-                data=[
-                    {
-                        'Catégorie': cat,
-                        'CA (€)': f'{ca_par_categorie[cat]:,.2f}',
-                        'Part du CA': f'{pourcentage_par_categorie[cat]:.2f}%'
-                    }
-                    for cat in ca_par_categorie.index
-                ],
-                columns=[
-                    {'name': 'Catégorie', 'id': 'Catégorie'},
-                    {'name': 'Chiffre d\'affaires (€)', 'id': 'CA (€)'},
-                    {'name': 'Part du CA total', 'id': 'Part du CA'}
-                ],
-                style_cell={
-                    'textAlign': 'left',
-                    'padding': '15px',
-                    'fontFamily': 'Poppins',
-                    'fontSize': '14px'
-                },
-                style_header={
-                    'backgroundColor': '#667eea',
-                    'color': 'white',
-                    'fontWeight': '700',
-                    'border': 'none',
-                    'fontSize': '15px'
-                },
-                style_data_conditional=[
-                    {'if': {'row_index': 'odd'}, 'backgroundColor': '#f7fafc'}
-                ]
-            )
-        ], style={'marginTop': '30px'})
-    ], className='section-card'),
+            # Tableau détails
+            html.Div([
+                html.H3(' Détails par catégorie', style={'marginBottom': '15px', 'color': '#2d3748'}),
+                dash_table.DataTable(
+                    data=[
+                        {
+                            'Catégorie': cat,
+                            'CA (€)': f'{kpi.ca_par_categorie[cat]:,.2f}',
+                            'Part du CA': f'{kpi.pourcentage_par_categorie[cat]:.2f}%'
+                        }
+                        for cat in kpi.ca_par_categorie.index
+                    ],
+                    columns=[
+                        {'name': 'Catégorie', 'id': 'Catégorie'},
+                        {'name': 'Chiffre d\'affaires (€)', 'id': 'CA (€)'},
+                        {'name': 'Part du CA total', 'id': 'Part du CA'}
+                    ],
+                    style_cell={
+                        'textAlign': 'left',
+                        'padding': '15px',
+                        'fontFamily': 'Poppins',
+                        'fontSize': '14px'
+                    },
+                    style_header={
+                        'backgroundColor': '#667eea',
+                        'color': 'white',
+                        'fontWeight': '700',
+                        'border': 'none',
+                        'fontSize': '15px'
+                    },
+                    style_data_conditional=[
+                        {'if': {'row_index': 'odd'}, 'backgroundColor': '#f7fafc'}
+                    ]
+                )
+            ], style={'marginTop': '30px'})
+        ], className='section-card'),
     
-    # ===========================================================================
-    # KPI 3 : TAUX DE RÉCURRENCE
-    # ===========================================================================
-    html.Div([
-        html.H2('KPI 3 : Taux de Récurrence des Clients', className='section-title'),
-        
+        # ===========================================================================
+        # KPI 3 : TAUX DE RÉCURRENCE
+        # ===========================================================================
         html.Div([
+            html.H2('KPI 3 : Taux de Récurrence des Clients', className='section-title'),
+        
             html.Div([
-                html.Div('👥', className='kpi-icon'),
-                html.Div(f'{taux_recurrence:.2f}%', className='kpi-number'),
-                html.Div('Taux de Récurrence', className='kpi-label'),
                 html.Div([
-                    html.Span(f'{nombre_clients_recurrents} clients récurrents sur {nombre_total_clients}', 
-                             style={'fontSize': '16px', 'color': '#718096', 'marginTop': '15px'})
-                ])
-            ], className='kpi-card-main', style={'textAlign': 'center'}),
-        ], style={'display': 'flex', 'justifyContent': 'center', 'marginBottom': '25px'}),
+                    html.Div('👥', className='kpi-icon'),
+                    html.Div(f'{kpi.taux_recurrence:.2f}%', className='kpi-number'),
+                    html.Div('Taux de Récurrence', className='kpi-label'),
+                    html.Div([
+                        html.Span(f'{kpi.nombre_clients_recurrents} clients récurrents sur {kpi.nombre_total_clients}', 
+                                 style={'fontSize': '16px', 'color': '#718096', 'marginTop': '15px'})
+                    ])
+                ], className='kpi-card-main', style={'textAlign': 'center'}),
+            ], style={'display': 'flex', 'justifyContent': 'center', 'marginBottom': '25px'}),
         
-        # Distribution
-        html.Div([
-            html.H3('Distribution des transactions par client', 
-                   style={'marginBottom': '15px', 'color': '#2d3748'}),
-            html.Div([
-                html.Span('Clients avec 1 transaction', className='detail-label'),
-                html.Span(f'{len(transactions_par_client[transactions_par_client == 1])}', 
-                         className='detail-value')
-            ], className='detail-item'),
-            html.Div([
-                html.Span('Clients avec 2 transactions', className='detail-label'),
-                html.Span(f'{len(transactions_par_client[transactions_par_client == 2])}', 
-                         className='detail-value')
-            ], className='detail-item'),
+            # Distribution
             html.Div([
-                html.Span('Clients avec 3+ transactions', className='detail-label'),
-                html.Span(f'{len(transactions_par_client[transactions_par_client >= 3])}', 
-                         className='detail-value')
-            ], className='detail-item'),
-            html.Div([
-                html.Span('Maximum de transactions par client', className='detail-label'),
-                html.Span(f'{transactions_par_client.max()}', className='detail-value')
-            ], className='detail-item'),
-        ], className='detail-box'),
+                html.H3('Distribution des transactions par client', 
+                       style={'marginBottom': '15px', 'color': '#2d3748'}),
+                html.Div([
+                    html.Span('Clients avec 1 transaction', className='detail-label'),
+                    html.Span(f'{len(kpi.transactions_par_client[kpi.transactions_par_client == 1])}', 
+                             className='detail-value')
+                ], className='detail-item'),
+                html.Div([
+                    html.Span('Clients avec 2 transactions', className='detail-label'),
+                    html.Span(f'{len(kpi.transactions_par_client[kpi.transactions_par_client == 2])}', 
+                             className='detail-value')
+                ], className='detail-item'),
+                html.Div([
+                    html.Span('Clients avec 3+ transactions', className='detail-label'),
+                    html.Span(f'{len(kpi.transactions_par_client[kpi.transactions_par_client >= 3])}', 
+                             className='detail-value')
+                ], className='detail-item'),
+                html.Div([
+                    html.Span('Maximum de transactions par client', className='detail-label'),
+                    html.Span(f'{kpi.transactions_par_client.max()}', className='detail-value')
+                ], className='detail-item'),
+            ], className='detail-box'),
         
-        # Graphique distribution
-        dcc.Graph(
-            figure=px.histogram(
-                x=transactions_par_client.values,
-                nbins=20,
-                title='Distribution du nombre de transactions par client',
-                labels={'x': 'Nombre de transactions', 'y': 'Nombre de clients'},
-                color_discrete_sequence=['#667eea']
-            ).update_layout(
-                font=dict(family='Poppins'),
-                showlegend=False
-            ),
-            config={'displayModeBar': False},
-            style={'marginTop': '25px'}
-        )
-    ], className='section-card'),
+            # Graphique distribution (classes calculées côté serveur)
+            dcc.Graph(
+                figure=figure_compacte(figure_histogramme(
+                    kpi.transactions_par_client.values,
+                    nb_classes=NB_CLASSES_TRANSACTIONS,
+                    titre='Distribution du nombre de transactions par client',
+                    titre_x='Nombre de transactions',
+                    titre_y='Nombre de clients',
+                    couleur='#667eea'
+                ).update_layout(
+                    font=dict(family='Poppins'),
+                    showlegend=False
+                )),
+                config={'displayModeBar': False},
+                style={'marginTop': '25px'}
+            )
+        ], className='section-card'),
     
-    # ===========================================================================
-    # KPI 4 : MODES DE PAIEMENT
-    # ===========================================================================
-    html.Div([
-        html.H2('KPI 4 : Modes de Paiement', className='section-title'),
-        
+        # ===========================================================================
+        # KPI 4 : MODES DE PAIEMENT
+        # ===========================================================================
         html.Div([
-            # Graphique
-            html.Div([
-                dcc.Graph(
-                    figure=px.bar(
-                        x=pourcentage_modes.index,
-                        y=pourcentage_modes.values,
-                        title='Répartition des transactions par mode de paiement',
-                        labels={'x': 'Mode de paiement', 'y': 'Pourcentage (%)'},
-                        color=pourcentage_modes.values,
-                        color_continuous_scale='Viridis'
-                    ).update_layout(
-                        font=dict(family='Poppins'),
-                        showlegend=False
-                    ),
-                    config={'displayModeBar': False}
-                )
-            ], style={'width': '60%', 'display': 'inline-block'}),
-            
-            # KPI principal
+            html.H2('KPI 4 : Modes de Paiement', className='section-title'),
+        
             html.Div([
+                # Graphique
                 html.Div([
-                    html.Div('💳', style={'fontSize': '80px', 'marginBottom': '20px'}),
-                    html.H3('Mode le plus utilisé', 
-                           style={'color': '#718096', 'marginBottom': '15px', 'fontSize': '18px'}),
-                    html.H1(mode_plus_utilise, 
-                           style={'color': '#667eea', 'marginBottom': '15px', 'fontWeight': '700'}),
-                    html.H2(f'{pourcentage_modes[mode_plus_utilise]:.1f}%', 
-                           style={'color': '#48bb78', 'fontWeight': '700'}),
-                    html.Div(f'{modes_paiement[mode_plus_utilise]} transactions', 
-                            style={'color': '#718096', 'marginTop': '15px', 'fontSize': '16px'})
-                ], style={'textAlign': 'center', 'padding': '40px'})
-            ], style={'width': '38%', 'display': 'inline-block', 'float': 'right', 
-                     'verticalAlign': 'top'})
-        ])
-    ], className='section-card'),
+                    dcc.Graph(
+                        figure=figure_compacte(px.bar(
+                            x=kpi.pourcentage_modes.index,
+                            y=kpi.pourcentage_modes.values,
+                            title='Répartition des transactions par mode de paiement',
+                            labels={'x': 'Mode de paiement', 'y': 'Pourcentage (%)'},
+                            color=kpi.pourcentage_modes.values,
+                            color_continuous_scale='Viridis'
+                        ).update_layout(
+                            font=dict(family='Poppins'),
+                            showlegend=False
+                        )),
+                        config={'displayModeBar': False}
+                    )
+                ], style={'width': '60%', 'display': 'inline-block'}),
+            
+                # KPI principal
+                html.Div([
+                    html.Div([
+                        html.Div('💳', style={'fontSize': '80px', 'marginBottom': '20px'}),
+                        html.H3('Mode le plus utilisé', 
+                               style={'color': '#718096', 'marginBottom': '15px', 'fontSize': '18px'}),
+                        html.H1(kpi.mode_plus_utilise, 
+                               style={'color': '#667eea', 'marginBottom': '15px', 'fontWeight': '700'}),
+                        html.H2(f'{kpi.pourcentage_modes[kpi.mode_plus_utilise]:.1f}%', 
+                               style={'color': '#48bb78', 'fontWeight': '700'}),
+                        html.Div(f'{kpi.modes_paiement[kpi.mode_plus_utilise]} transactions', 
+                                style={'color': '#718096', 'marginTop': '15px', 'fontSize': '16px'})
+                    ], style={'textAlign': 'center', 'padding': '40px'})
+                ], style={'width': '38%', 'display': 'inline-block', 'float': 'right', 
+                         'verticalAlign': 'top'})
+            ])
+        ], className='section-card'),
     
-    # ===========================================================================
-    # KPI 5 : CUSTOMER LIFETIME VALUE
-    # ===========================================================================
-    html.Div([
-        html.H2('KPI 5 : Customer Lifetime Value (CLV)', className='section-title'),
-        
+        # ===========================================================================
+        # KPI 5 : CUSTOMER LIFETIME VALUE
+        # ===========================================================================
         html.Div([
-            html.Div([
-                html.Div('💰', className='kpi-icon'),
-                html.Div(f'{clv_moyenne:.2f} €', className='kpi-number'),
-                html.Div('CLV Moyenne', className='kpi-label'),
-                html.Div('Valeur moyenne générée par client', 
-                        style={'fontSize': '14px', 'color': '#718096', 'marginTop': '15px'})
-            ], className='kpi-card-main', style={'textAlign': 'center'}),
-        ], style={'display': 'flex', 'justifyContent': 'center', 'marginBottom': '25px'}),
+            html.H2('KPI 5 : Customer Lifetime Value (CLV)', className='section-title'),
         
-        # Statistiques CLV
-        html.Div([
             html.Div([
-                html.Span('CLV minimum', className='detail-label'),
-                html.Span(f'{clv_min:.2f} €', className='detail-value')
-            ], className='detail-item'),
+                html.Div([
+                    html.Div('💰', className='kpi-icon'),
+                    html.Div(f'{kpi.clv_moyenne:.2f} €', className='kpi-number'),
+                    html.Div('CLV Moyenne', className='kpi-label'),
+                    html.Div('Valeur moyenne générée par client', 
+                            style={'fontSize': '14px', 'color': '#718096', 'marginTop': '15px'})
+                ], className='kpi-card-main', style={'textAlign': 'center'}),
+            ], style={'display': 'flex', 'justifyContent': 'center', 'marginBottom': '25px'}),
+        
+            # Statistiques CLV
             html.Div([
-                html.Span('CLV maximum', className='detail-label'),
-                html.Span(f'{clv_max:.2f} €', className='detail-value')
-            ], className='detail-item'),
+                html.Div([
+                    html.Span('CLV minimum', className='detail-label'),
+                    html.Span(f'{kpi.clv_min:.2f} €', className='detail-value')
+                ], className='detail-item'),
+                html.Div([
+                    html.Span('CLV maximum', className='detail-label'),
+                    html.Span(f'{kpi.clv_max:.2f} €', className='detail-value')
+                ], className='detail-item'),
+                html.Div([
+                    html.Span('CLV médiane', className='detail-label'),
+                    html.Span(f'{kpi.clv_mediane:.2f} €', className='detail-value')
+                ], className='detail-item'),
+            ], className='detail-box'),
+        
+            # Top clients : K et filtres, classement recalculé côté serveur
             html.Div([
-                html.Span('CLV médiane', className='detail-label'),
-                html.Span(f'{clv_mediane:.2f} €', className='detail-value')
-            ], className='detail-item'),
-        ], className='detail-box'),
+                html.H3('🏆 Top 5 des clients par CLV', id='titre-top-clients',
+                       style={'marginTop': '30px', 'marginBottom': '15px', 'color': '#2d3748'}),
+                html.Div([
+                    html.Div([
+                        html.Label('Nombre de clients', className='detail-label'),
+                        dcc.Input(id='top-k', type='number', min=1, max=TOP_K_MAX, step=1,
+                                  value=5, debounce=True, style={'width': '100%', 'padding': '8px'})
+                    ], style={'flex': '1'}),
+                    html.Div([
+                        html.Label('Catégorie', className='detail-label'),
+                        dcc.Dropdown(id='top-categorie', value='ALL', clearable=False,
+                                     options=[{'label': 'Toutes les catégories', 'value': 'ALL'}] +
+                                             [{'label': c, 'value': c} for c in kpi.ca_par_categorie.index])
+                    ], style={'flex': '2'}),
+                    html.Div([
+                        html.Label('Mode de paiement', className='detail-label'),
+                        dcc.Dropdown(id='top-paiement', value='ALL', clearable=False,
+                                     options=[{'label': 'Tous', 'value': 'ALL'}] +
+                                             [{'label': m, 'value': m} for m in kpi.modes_paiement.index])
+                    ], style={'flex': '2'}),
+                    html.Div([
+                        html.Label('Période', className='detail-label'),
+                        dcc.DatePickerRange(id='top-periode', display_format='DD/MM/YYYY',
+                                            min_date_allowed=premier_jour, max_date_allowed=dernier_jour,
+                                            start_date_placeholder_text='Début',
+                                            end_date_placeholder_text='Fin')
+                    ], style={'flex': '3'}),
+                ], style={'display': 'flex', 'gap': '15px', 'marginBottom': '15px', 'alignItems': 'flex-end'}),
+                dash_table.DataTable(
+                    id='tableau-top-clients',
+                    data=lignes_top_clients(kpi.top_clients(5)),
+                    columns=[
+                        {'name': 'Rang', 'id': 'Rang'},
+                        {'name': 'ID Client', 'id': 'Client ID'},
+                        {'name': 'CLV (€)', 'id': 'CLV (€)'},
+                        {'name': 'Nombre de transactions', 'id': 'Nb Trans.'}
+                    ],
+                    style_cell={
+                        'textAlign': 'center',
+                        'padding': '15px',
+                        'fontFamily': 'Poppins',
+                        'fontSize': '14px'
+                    },
+                    style_header={
+                        'backgroundColor': '#667eea',
+                        'color': 'white',
+                        'fontWeight': '700',
+                        'border': 'none'
+                    },
+                    style_data_conditional=[
+                        {'if': {'row_index': 0}, 'backgroundColor': '#fff3cd', 'fontWeight': '700'},
+                        {'if': {'row_index': 1}, 'backgroundColor': '#e2e8f0', 'fontWeight': '700'},
+                        {'if': {'row_index': 2}, 'backgroundColor': '#fed7d7', 'fontWeight': '700'},
+                    ]
+                )
+            ]),
         
-        # Top 5 clients
-        html.Div([
-            html.H3('🏆 Top 5 des clients par CLV', 
-                   style={'marginTop': '30px', 'marginBottom': '15px', 'color': '#2d3748'}),
-            dash_table.DataTable(
-                data=[
-                    {
-                        'Rang': f'🥇' if i == 0 else f'🥈' if i == 1 else f'🥉' if i == 2 else f'{i+1}',
-                        'Client ID': client_id,
-                        'CLV (€)': f'{clv:.2f}',
-                        'Nb Trans.': transactions_par_client[client_id]
-                    }
-                    for i, (client_id, clv) in enumerate(top_5_clients.items())
-                ],
-                columns=[
-                    {'name': 'Rang', 'id': 'Rang'},
-                    {'name': 'ID Client', 'id': 'Client ID'},
-                    {'name': 'CLV (€)', 'id': 'CLV (€)'},
-                    {'name': 'Nombre de transactions', 'id': 'Nb Trans.'}
-                ],
-                style_cell={
-                    'textAlign': 'center',
-                    'padding': '15px',
-                    'fontFamily': 'Poppins',
-                    'fontSize': '14px'
-                },
-                style_header={
-                    'backgroundColor': '#667eea',
-                    'color': 'white',
-                    'fontWeight': '700',
-                    'border': 'none'
-                },
-                style_data_conditional=[
-                    {'if': {'row_index': 0}, 'backgroundColor': '#fff3cd', 'fontWeight': '700'},
-                    {'if': {'row_index': 1}, 'backgroundColor': '#e2e8f0', 'fontWeight': '700'},
-                    {'if': {'row_index': 2}, 'backgroundColor': '#fed7d7', 'fontWeight': '700'},
-                ]
+            # Graphique distribution CLV (classes calculées côté serveur)
+            dcc.Graph(
+                figure=figure_compacte(figure_histogramme(
+                    kpi.clv_par_client.values,
+                    nb_classes=NB_CLASSES_CLV,
+                    titre='Distribution de la CLV',
+                    titre_x='CLV (€)',
+                    titre_y='Nombre de clients',
+                    couleur='#764ba2'
+                ).update_layout(
+                    font=dict(family='Poppins'),
+                    showlegend=False
+                )),
+                config={'displayModeBar': False},
+                style={'marginTop': '25px'}
             )
-        ]),
-        
-        # Graphique distribution CLV
-        dcc.Graph(
-            figure=px.histogram(
-                x=clv_par_client.values,
-                nbins=30,
-                title='Distribution de la CLV',
-                labels={'x': 'CLV (€)', 'y': 'Nombre de clients'},
-                color_discrete_sequence=['#764ba2']
-            ).update_layout(
-                font=dict(family='Poppins'),
-                showlegend=False
-            ),
-            config={'displayModeBar': False},
-            style={'marginTop': '25px'}
-        )
-    ], className='section-card'),
+        ], className='section-card'),
     
-    # ===========================================================================
-    # KPI 6 : PERFORMANCE DES CATÉGORIES
-    # ===========================================================================
-    html.Div([
-        html.H2('KPI 6 : Indice de Performance des Catégories', className='section-title'),
-        
+        # ===========================================================================
+        # KPI 6 : PERFORMANCE DES CATÉGORIES
+        # ===========================================================================
         html.Div([
+            html.H2('KPI 6 : Indice de Performance des Catégories', className='section-title'),
+        
             html.Div([
-                html.Div('🏆', className='kpi-icon'),
-                html.Div(categorie_top, className='kpi-number', style={'fontSize': '36px'}),
-                html.Div('Catégorie la Plus Performante', className='kpi-label'),
                 html.Div([
-                    html.Div(f'{ca_top:,.2f} €', 
-                            style={'fontSize': '24px', 'color': '#48bb78', 
-                                   'fontWeight': '700', 'marginTop': '15px'}),
-                    html.Div(f'{part_ca_top:.2f}% du CA total', 
-                            style={'fontSize': '16px', 'color': '#718096', 'marginTop': '10px'})
-                ])
-            ], className='kpi-card-main', style={'textAlign': 'center'}),
-        ], style={'display': 'flex', 'justifyContent': 'center', 'marginBottom': '25px'}),
+                    html.Div('🏆', className='kpi-icon'),
+                    html.Div(kpi.categorie_top, className='kpi-number', style={'fontSize': '36px'}),
+                    html.Div('Catégorie la Plus Performante', className='kpi-label'),
+                    html.Div([
+                        html.Div(f'{kpi.ca_top:,.2f} €', 
+                                style={'fontSize': '24px', 'color': '#48bb78', 
+                                       'fontWeight': '700', 'marginTop': '15px'}),
+                        html.Div(f'{kpi.part_ca_top:.2f}% du CA total', 
+                                style={'fontSize': '16px', 'color': '#718096', 'marginTop': '10px'})
+                    ])
+                ], className='kpi-card-main', style={'textAlign': 'center'}),
+            ], style={'display': 'flex', 'justifyContent': 'center', 'marginBottom': '25px'}),
         
-        # Graphique comparatif
-        dcc.Graph(
-            figure=go.Figure([
-                go.Bar(
-                    x=ca_par_categorie.index,
-                    y=ca_par_categorie.values,
-                    marker_color=['gold' if cat == categorie_top else '#667eea' 
-                                 for cat in ca_par_categorie.index],
-                    text=[f'{val:,.0f}€' for val in ca_par_categorie.values],
-                    textposition='outside'
-                )
-            ]).update_layout(
-                title='Performance des catégories de produits (Chiffre d\'affaires)',
-                xaxis_title='Catégorie',
-                yaxis_title='CA (€)',
-                font=dict(family='Poppins', size=13),
-                showlegend=False,
-                height=500
-            ),
-            config={'displayModeBar': False}
-        )
-    ], className='section-card'),
+            # Graphique comparatif
+            dcc.Graph(
+                figure=figure_compacte(go.Figure([
+                    go.Bar(
+                        x=kpi.ca_par_categorie.index,
+                        y=kpi.ca_par_categorie.values,
+                        marker_color=['gold' if cat == kpi.categorie_top else '#667eea' 
+                                     for cat in kpi.ca_par_categorie.index],
+                        text=[f'{val:,.0f}€' for val in kpi.ca_par_categorie.values],
+                        textposition='outside'
+                    )
+                ]).update_layout(
+                    title='Performance des catégories de produits (Chiffre d\'affaires)',
+                    xaxis_title='Catégorie',
+                    yaxis_title='CA (€)',
+                    font=dict(family='Poppins', size=13),
+                    showlegend=False,
+                    height=500
+                )),
+                config={'displayModeBar': False}
+            )
+        ], className='section-card'),
     
-    # ===========================================================================
-    # CONCLUSION
-    # ===========================================================================
-    html.Div([
-        html.H2('Résumé de l\'Analyse', className='section-title'),
+        # ===========================================================================
+        # CONCLUSION
+        # ===========================================================================
         html.Div([
-            html.P([
-                html.Strong('Données analysées : '),
-                f'{len(df)} transactions de {nombre_total_clients} clients'
-            ], style={'fontSize': '16px', 'marginBottom': '15px'}),
-            html.P([
-                html.Strong('Chiffre d\'affaires total : '),
-                f'{ca_total:,.2f} €'
-            ], style={'fontSize': '16px', 'marginBottom': '15px'}),
-            html.P([
-                html.Strong('Catégorie leader : '),
-                f'{categorie_top} ({part_ca_top:.2f}% du CA)'
-            ], style={'fontSize': '16px', 'marginBottom': '15px'}),
-            html.P([
-                html.Strong('Fidélisation : '),
-                f'{taux_recurrence:.2f}% de clients récurrents - Excellent !'
-            ], style={'fontSize': '16px', 'marginBottom': '15px'}),
-            html.P([
-                html.Strong('Préférence de paiement : '),
-                f'{mode_plus_utilise} ({pourcentage_modes[mode_plus_utilise]:.1f}%)'
-            ], style={'fontSize': '16px', 'marginBottom': '15px'}),
-            html.P([
-                html.Strong('Valeur client : '),
-                f'CLV moyenne de {clv_moyenne:.2f} €'
-            ], style={'fontSize': '16px'}),
-        ], style={'padding': '20px', 'background': '#f7fafc', 'borderRadius': '15px'})
-    ], className='section-card'),
+            html.H2('Résumé de l\'Analyse', className='section-title'),
+            html.Div([
+                html.P([
+                    html.Strong('Données analysées : '),
+                    f'{kpi.total_transactions} transactions de {kpi.nombre_total_clients} clients'
+                ], style={'fontSize': '16px', 'marginBottom': '15px'}),
+                html.P([
+                    html.Strong('Chiffre d\'affaires total : '),
+                    f'{kpi.ca_total:,.2f} €'
+                ], style={'fontSize': '16px', 'marginBottom': '15px'}),
+                html.P([
+                    html.Strong('Catégorie leader : '),
+                    f'{kpi.categorie_top} ({kpi.part_ca_top:.2f}% du CA)'
+                ], style={'fontSize': '16px', 'marginBottom': '15px'}),
+                html.P([
+                    html.Strong('Fidélisation : '),
+                    f'{kpi.taux_recurrence:.2f}% de clients récurrents - Excellent !'
+                ], style={'fontSize': '16px', 'marginBottom': '15px'}),
+                html.P([
+                    html.Strong('Préférence de paiement : '),
+                    f'{kpi.mode_plus_utilise} ({kpi.pourcentage_modes[kpi.mode_plus_utilise]:.1f}%)'
+                ], style={'fontSize': '16px', 'marginBottom': '15px'}),
+                html.P([
+                    html.Strong('Valeur client : '),
+                    f'CLV moyenne de {kpi.clv_moyenne:.2f} €'
+                ], style={'fontSize': '16px'}),
+            ], style={'padding': '20px', 'background': '#f7fafc', 'borderRadius': '15px'})
+        ], className='section-card'),
     
-    # Footer
-    html.Div([
-        html.P('✨ Dashboard KPI créé avec Python Dash | © 2024 | Analyse Décisionnelle', 
-               className='footer')
+        # Footer
+        html.Div([
+            html.P('✨ Dashboard KPI créé avec Python Dash | © 2024 | Analyse Décisionnelle', 
+                   className='footer')
+        ])
     ])
+
+
+# Layout de validation des callbacks : sans lui, Dash appellerait layout() dès
+# l'affectation ci-dessous, et donc chargerait les données à l'import. Il
+# déclare les composants dont dépendent les callbacks.
+app.validation_layout = html.Div([
+    html.Div(className='main-title'),
+    html.H3(id='titre-top-clients'),
+    dcc.Input(id='top-k'),
+    dcc.Dropdown(id='top-categorie'),
+    dcc.Dropdown(id='top-paiement'),
+    dcc.DatePickerRange(id='top-periode'),
+    dash_table.DataTable(id='tableau-top-clients'),
 ])
+app.layout = layout
+
+# ==============================================================================
+# CALLBACKS : TOP DES CLIENTS
+# ==============================================================================
+@app.callback(
+    [Output('titre-top-clients', 'children'),
+     Output('tableau-top-clients', 'data')],
+    [Input('top-k', 'value'),
+     Input('top-categorie', 'value'),
+     Input('top-paiement', 'value'),
+     Input('top-periode', 'start_date'),
+     Input('top-periode', 'end_date')],
+    prevent_initial_call=True
+)
+def maj_top_clients(k, categorie, paiement, start_date, end_date):
+    """
+    Classement des K meilleurs clients sur les transactions filtrées : le
+    layout affiche le top 5 sans filtre, ce callback ne sert qu'aux changements
+    """
+    k = min(max(int(k or 5), 1), TOP_K_MAX)
+    debut = None if not start_date else pd.Timestamp(start_date).ceil('D').strftime('%Y-%m-%d')
+    fin = None if not end_date else pd.Timestamp(end_date).floor('D').strftime('%Y-%m-%d')
+    with etape('top_clients', 'classement'):
+        top = service_kpi.actualiser().top_clients(k, categorie, paiement, debut, fin)
+    return f'🏆 Top {k} des clients par CLV', lignes_top_clients(top)
 
 # ==============================================================================
 # LANCEMENT DU SERVEUR
 # ==============================================================================
 server = app.server
+route_ingestion(server, source)
+# Durées des KPI et des requêtes, tailles des réponses : /metrics (Prometheus),
+# et en-tête Server-Timing avec DASHBOARD_SERVER_TIMING=1
+installer_metriques(server)
+# Réponses compressées (brotli ou gzip, DASHBOARD_COMPRESSION)
+installer_compression(server)
+profileur.installer(server)
+
 if __name__ == '__main__':
     print("\n" + "="*80)
     print("🚀 DASHBOARD KPI EXERCICE 1 LANCÉ")
@@ -816,5 +932,11 @@ if __name__ == '__main__':
     print("\n📍 Ouvrez votre navigateur à l'adresse : http://127.0.0.1:8050/")
     print("\n📊 Tous les 6 KPI sont affichés de manière interactive !")
     print("⏹️  Appuyez sur Ctrl+C pour arrêter le serveur\n")
+    if profileur.actif:
+        # Chargement des données profilé dès le démarrage plutôt qu'au premier affichage
+        print(f"🔬 Profilage actif : profils écrits dans {profileur.dossier}\n")
+        with profileur.profiler('demarrage'):
+            service_kpi.actualiser()
     
-    app.run(debug=True, host='0.0.0.0', port=8050)
\ No newline at end of file
+    # Pas de rechargement automatique en profilage (il relancerait le démarrage)
+    app.run(debug=True, host='0.0.0.0', port=8050, use_reloader=not profileur.actif)
\ No newline at end of file
@@ -4,41 +4,251 @@ Dashboard moderne avec design gradient et animations
 """
 
 import dash
-from dash import dcc, html, Input, Output, dash_table
+from dash import dcc, html, ctx, Input, Output, dash_table
+from dash.exceptions import PreventUpdate
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
 from datetime import datetime
+import json
+import os
+from functools import partial, wraps
+
+import plotly.io as pio
+
+from moteur.cache import creer_cache
+from moteur.chargement import SourceDonnees, charger_donnees
+from moteur.compression import installer_compression
+from moteur.memoire_partagee import charger_partage
+from moteur.filtres import MoteurFiltres
+from moteur.cube import CubeVentes
+from moteur.figures import RegistreGabarits, donnees_traces, en_sortie
+from moteur.ingestion import route_ingestion
+from moteur.instrumentation import etape, installer_metriques, instrumentation
+from moteur.profilage import Profileur, dossier_profil
+from moteur.schema import SCHEMA_VENTES
+from moteur.series import reduire_serie
+from moteur.tableaux import page_serveur
 
 # ==============================================================================
 # CHARGEMENT ET PRÉPARATION DES DONNÉES
 # ==============================================================================
-print("🔄 Chargement des données...")
-df = pd.read_excel('data_dashboard_large.xlsx')
+DIMENSIONS = ['Magasin', 'Categorie_Produit', 'Mode_Paiement']
+
+# Cache des sélections du cube et des sections sérialisées : en mémoire par
+# défaut, partagé entre workers avec DASHBOARD_CACHE=sqlite:///... ou redis://...
+cache = creer_cache(max_entrees=512, max_octets=128 * 1024 ** 2)
+
+
+def preparer_dashboard(df):
+    """Construit l'index de filtrage et le cube à partir des données chargées"""
+    # Index de filtrage (lignes triées par date, listes de positions par valeur)
+    moteur_filtres = MoteurFiltres(df, DIMENSIONS)
+    # Cube pré-agrégé jour × magasin × catégorie × mode de paiement
+    return moteur_filtres, CubeVentes(moteur_filtres)
+
+
+def preparer_premier_bloc(df):
+    """
+    Lecture par blocs : cube construit sur le premier bloc, sans index des
+    lignes (seuls les agrégats restent en mémoire ; pas de détail des
+    transactions)
+    """
+    return None, CubeVentes(MoteurFiltres(df, DIMENSIONS))
 
-# Conversion du montant en numérique
-df['Montant'] = pd.to_numeric(df['Montant'].astype(str).str.replace(',', '.'), errors='coerce')
 
-# Conversion de la date
-df['Date_Transaction'] = pd.to_datetime(df['Date_Transaction'])
-df['Date'] = df['Date_Transaction'].dt.date
+def integrer_lot(structures, lot):
+    """
+    Ajoute un bloc ou un lot de transactions au cube (les sections en
+    tiennent compte dès le callback suivant) et, s'il est conservé, à
+    l'index des lignes du détail des transactions
+    """
+    moteur_filtres, cube_courant = structures
+    if moteur_filtres is not None:
+        moteur_filtres = moteur_filtres.ajouter(lot)
+    return moteur_filtres, cube_courant.ajouter(lot)
+
+
+# Colonnes validées et dimensions stockées en catégories (moteur.schema).
+# Avec DASHBOARD_MEMOIRE_PARTAGEE=1, les colonnes sont mappées en mémoire depuis
+# des fichiers NumPy partagés par tous les workers au lieu d'être copiées
+if os.environ.get('DASHBOARD_MEMOIRE_PARTAGEE') == '1':
+    charger = partial(charger_partage, dimensions=DIMENSIONS, schema=SCHEMA_VENTES)
+else:
+    charger = partial(charger_donnees, schema=SCHEMA_VENTES)
+
+# Avec DASHBOARD_TAILLE_BLOC=n, le classeur est lu par blocs de n lignes, intégrés
+# un à un au cube : la mémoire ne dépend plus de la taille du fichier, et le
+# détail des transactions (qui demande toutes les lignes) est désactivé
+taille_bloc = int(os.environ.get('DASHBOARD_TAILLE_BLOC') or 0) or None
+
+# Au-delà de DASHBOARD_POINTS_SERIE jours affichés, les ventes quotidiennes sont
+# sommées par semaine ou par mois (DASHBOARD_DECIMATION=periodes), ou décimées
+# par LTTB (lttb) ; un zoom sur le graphique rétablit la résolution du jour
+POINTS_SERIE = int(os.environ.get('DASHBOARD_POINTS_SERIE') or 400)
+DECIMATION = os.environ.get('DASHBOARD_DECIMATION') or 'periodes'
+
+# Mode profilage (DASHBOARD_PROFIL=dossier ou --profil dossier) : chargement
+# et requêtes de callback profilés, voir moteur/profilage.py
+profileur = Profileur(dossier_profil())
+
+print("🔄 Chargement des données...")
+# Lecture via le cache colonnaire, rechargée (et cache vidé) si le classeur change.
+# Les lots ajoutés par source.ajouter_transactions produisent une nouvelle version.
+source = SourceDonnees('data_dashboard_large.xlsx', 'Montant',
+                       preparer_premier_bloc if taille_bloc else preparer_dashboard,
+                       sur_changement=cache.vider, charger=charger, integrer=integrer_lot,
+                       taille_bloc=taille_bloc, schema=SCHEMA_VENTES)
+with profileur.profiler('demarrage'):
+    cube_ventes = source.obtenir()[1][1]
 
-print(f"✅ Données chargées : {len(df)} transactions")
-print(f"📅 Période : du {df['Date_Transaction'].min().date()} au {df['Date_Transaction'].max().date()}")
+print(f"✅ Données chargées : {int(cube_ventes.mesures['n_lignes'].sum())} transactions")
+print(f"📅 Période : du {cube_ventes.jours[0]} au {cube_ventes.jours[-1]}")
 
 # ==============================================================================
-# CALCUL DES KPI GLOBAUX
+# GABARITS DES FIGURES
 # ==============================================================================
-def calculer_kpis(data):
-    """Calcule les KPI globaux"""
-    kpis = {
-        'total_ventes': data['Montant'].sum(),
-        'nb_transactions': len(data),
-        'montant_moyen': data['Montant'].mean(),
-        'satisfaction_moyenne': data['Satisfaction_Client'].mean()
-    }
-    return kpis
+# Mise en page et style de chaque figure construits une fois, sur des données
+# vides ; les callbacks n'envoient ensuite que les traces (dash.Patch)
+figures = RegistreGabarits()
+
+
+def _vide(**colonnes):
+    """DataFrame sans ligne aux colonnes typées, pour construire un gabarit"""
+    return pd.DataFrame({nom: pd.Series([], dtype=type_colonne) for nom, type_colonne in colonnes.items()})
+
+
+@figures.enregistrer('ventes-quotidiennes')
+def gabarit_ventes_quotidiennes():
+    fig_ventes_quotidiennes = go.Figure()
+    fig_ventes_quotidiennes.add_trace(go.Scatter(
+        x=[],
+        y=[],
+        mode='lines+markers',
+        line=dict(color='#667eea', width=3),
+        marker=dict(size=8, color='#764ba2'),
+        fill='tonexty',
+        fillcolor='rgba(102, 126, 234, 0.1)',
+        name='Ventes'
+    ))
+    fig_ventes_quotidiennes.update_layout(
+        title='Évolution des ventes quotidiennes',
+        xaxis_title='Date',
+        yaxis_title='Ventes (€)',
+        template='plotly_white',
+        hovermode='x unified',
+        font=dict(family='Poppins', size=12),
+        title_font=dict(size=18, color='#2d3748', family='Poppins'),
+        # Le zoom de l'utilisateur survit aux mises à jour des traces
+        uirevision='ventes-quotidiennes'
+    )
+    return fig_ventes_quotidiennes
+
+
+@figures.enregistrer('repartition-magasins')
+def gabarit_repartition_magasins():
+    fig_repartition = px.pie(
+        _vide(Magasin=object, montant=float), values='montant', names='Magasin',
+        title='Répartition des ventes par magasin',
+        labels={'montant': 'Montant'},
+        hole=0.4,
+        color_discrete_sequence=px.colors.sequential.RdBu
+    )
+    fig_repartition.update_traces(textposition='inside', textinfo='percent+label', textfont_size=12)
+    fig_repartition.update_layout(font=dict(family='Inter'))
+    return fig_repartition
+
+
+@figures.enregistrer('montant-moyen-magasins')
+def gabarit_montant_moyen_magasins():
+    fig_montant_moyen = px.bar(
+        _vide(Magasin=object, montant_moyen=float), x='Magasin', y='montant_moyen',
+        title='Montant moyen par transaction et par magasin',
+        labels={'montant_moyen': 'Montant moyen (€)'},
+        color='montant_moyen',
+        color_continuous_scale='Purples'
+    )
+    fig_montant_moyen.update_layout(showlegend=False, font=dict(family='Inter'))
+    return fig_montant_moyen
+
+
+@figures.enregistrer('quantites-categories')
+def gabarit_quantites_categories():
+    fig_quantites = px.bar(
+        _vide(Categorie_Produit=object, quantite=float), x='Categorie_Produit', y='quantite',
+        title='Quantités vendues par catégorie',
+        labels={'quantite': 'Quantité totale', 'Categorie_Produit': 'Catégorie'},
+        color='quantite',
+        color_continuous_scale='Teal'
+    )
+    fig_quantites.update_layout(font=dict(family='Inter'))
+    return fig_quantites
+
+
+@figures.enregistrer('ca-categories-magasins')
+def gabarit_ca_categories_magasins(categories):
+    """Une trace (couleur de la légende) par catégorie"""
+    fig_ca_empile = px.bar(
+        pd.DataFrame({'Magasin': [None] * len(categories), 'montant': np.nan,
+                      'Categorie_Produit': list(categories)}),
+        x='Magasin', y='montant', color='Categorie_Produit',
+        category_orders={'Categorie_Produit': list(categories)},
+        title='Chiffre d\'affaires par catégorie et magasin',
+        labels={'montant': 'CA (€)'},
+        barmode='stack',
+        color_discrete_sequence=px.colors.qualitative.Set2
+    )
+    fig_ca_empile.update_layout(font=dict(family='Inter'))
+    return fig_ca_empile
+
+
+@figures.enregistrer('modes-paiement')
+def gabarit_modes_paiement():
+    fig_modes = px.pie(
+        _vide(Mode_Paiement=object, Count=float), values='Count', names='Mode_Paiement',
+        title='Répartition des transactions par mode de paiement',
+        hole=0.3,
+        color_discrete_sequence=px.colors.qualitative.Set3
+    )
+    fig_modes.update_layout(font=dict(family='Inter'))
+    return fig_modes
+
+
+@figures.enregistrer('satisfaction-magasins')
+def gabarit_satisfaction_magasins():
+    fig_sat_mag = px.bar(
+        _vide(Magasin=object, satisfaction_moyenne=float), x='Magasin', y='satisfaction_moyenne',
+        title='Satisfaction moyenne par magasin',
+        labels={'satisfaction_moyenne': 'Score moyen'},
+        color='satisfaction_moyenne',
+        color_continuous_scale='RdYlGn',
+        range_color=[1, 5]
+    )
+    fig_sat_mag.update_layout(font=dict(family='Inter'))
+    return fig_sat_mag
+
+
+@figures.enregistrer('satisfaction-categories')
+def gabarit_satisfaction_categories():
+    fig_sat_cat = px.bar(
+        _vide(Categorie_Produit=object, satisfaction_moyenne=float),
+        x='Categorie_Produit', y='satisfaction_moyenne',
+        title='Satisfaction moyenne par catégorie',
+        labels={'satisfaction_moyenne': 'Score moyen', 'Categorie_Produit': 'Catégorie'},
+        color='satisfaction_moyenne',
+        color_continuous_scale='RdYlGn',
+        range_color=[1, 5]
+    )
+    fig_sat_cat.update_layout(font=dict(family='Inter'))
+    return fig_sat_cat
+
+
+def traces_barres(gabarit, tableau, x, y):
+    """Trace d'un diagramme en barres coloré par la valeur (échelle continue)"""
+    return donnees_traces([gabarit.trace(
+        x=tableau[x].to_numpy(), y=tableau[y].to_numpy(), marker_color=tableau[y].to_numpy())])
+
 
 # ==============================================================================
 # CRÉATION DE L'APPLICATION DASH
@@ -276,6 +486,18 @@ app.index_string = '''
 </html>
 '''
 
+# Colonnes du détail des transactions (le type guide la saisie des filtres)
+COLONNES_TRANSACTIONS = [
+    {'name': 'Date', 'id': 'Date_Transaction', 'type': 'datetime'},
+    {'name': 'Client', 'id': 'ID_Client', 'type': 'numeric'},
+    {'name': 'Magasin', 'id': 'Magasin', 'type': 'text'},
+    {'name': 'Catégorie', 'id': 'Categorie_Produit', 'type': 'text'},
+    {'name': 'Quantité', 'id': 'Quantite', 'type': 'numeric'},
+    {'name': 'Montant (€)', 'id': 'Montant', 'type': 'numeric'},
+    {'name': 'Paiement', 'id': 'Mode_Paiement', 'type': 'text'},
+    {'name': 'Satisfaction', 'id': 'Satisfaction_Client', 'type': 'numeric'},
+]
+
 # ==============================================================================
 # LAYOUT DU DASHBOARD AVEC STYLE MODERNE
 # ==============================================================================
@@ -303,7 +525,7 @@ app.layout = html.Div([
                 dcc.Dropdown(
                     id='filtre-magasin',
                     options=[{'label': '🌍 Tous les magasins', 'value': 'ALL'}] + 
-                            [{'label': f'🏢 {m}', 'value': m} for m in sorted(df['Magasin'].unique())],
+                            [{'label': f'🏢 {m}', 'value': m} for m in cube_ventes.valeurs['Magasin']],
                     value='ALL',
                     clearable=False,
                     style={'borderRadius': '12px'}
@@ -317,7 +539,7 @@ app.layout = html.Div([
                 dcc.Dropdown(
                     id='filtre-categorie',
                     options=[{'label': '📊 Toutes les catégories', 'value': 'ALL'}] + 
-                            [{'label': f'📦 {c}', 'value': c} for c in sorted(df['Categorie_Produit'].unique())],
+                            [{'label': f'📦 {c}', 'value': c} for c in cube_ventes.valeurs['Categorie_Produit']],
                     value='ALL',
                     clearable=False,
                     style={'borderRadius': '12px'}
@@ -331,7 +553,7 @@ app.layout = html.Div([
                 dcc.Dropdown(
                     id='filtre-paiement',
                     options=[{'label': '💰 Tous', 'value': 'ALL'}] + 
-                            [{'label': f'💳 {p}', 'value': p} for p in sorted(df['Mode_Paiement'].unique())],
+                            [{'label': f'💳 {p}', 'value': p} for p in cube_ventes.valeurs['Mode_Paiement']],
                     value='ALL',
                     clearable=False,
                     style={'borderRadius': '12px'}
@@ -344,8 +566,8 @@ app.layout = html.Div([
                                                 'color': '#2d3748', 'display': 'block'}),
                 dcc.DatePickerRange(
                     id='filtre-periode',
-                    start_date=df['Date_Transaction'].min(),
-                    end_date=df['Date_Transaction'].max(),
+                    start_date=pd.Timestamp(cube_ventes.jours[0]),
+                    end_date=pd.Timestamp(cube_ventes.jours[-1]),
                     display_format='DD/MM/YYYY',
                     style={'borderRadius': '12px'}
                 )
@@ -365,6 +587,7 @@ app.layout = html.Div([
         
         # Graphique ventes quotidiennes
         dcc.Graph(id='graph-ventes-quotidiennes', 
+                  figure=figures.figure('ventes-quotidiennes'),
                   config={'displayModeBar': False},
                   style={'borderRadius': '15px'})
     ], className='section-card'),
@@ -378,12 +601,14 @@ app.layout = html.Div([
         html.Div([
             # Graphique en secteurs
             html.Div([
-                dcc.Graph(id='graph-repartition-magasins', config={'displayModeBar': False})
+                dcc.Graph(id='graph-repartition-magasins', figure=figures.figure('repartition-magasins'),
+                          config={'displayModeBar': False})
             ], style={'width': '48%', 'display': 'inline-block'}),
             
             # Graphique montant moyen
             html.Div([
-                dcc.Graph(id='graph-montant-moyen-magasins', config={'displayModeBar': False})
+                dcc.Graph(id='graph-montant-moyen-magasins', figure=figures.figure('montant-moyen-magasins'),
+                          config={'displayModeBar': False})
             ], style={'width': '48%', 'display': 'inline-block', 'float': 'right'})
         ]),
         
@@ -401,12 +626,14 @@ app.layout = html.Div([
         html.Div([
             # Histogramme quantités
             html.Div([
-                dcc.Graph(id='graph-quantites-categories', config={'displayModeBar': False})
+                dcc.Graph(id='graph-quantites-categories', figure=figures.figure('quantites-categories'),
+                          config={'displayModeBar': False})
             ], style={'width': '48%', 'display': 'inline-block'}),
             
             # Graphique empilé
             html.Div([
-                dcc.Graph(id='graph-ca-categories-magasins', config={'displayModeBar': False})
+                dcc.Graph(id='graph-ca-categories-magasins', figure=figures.figure('ca-categories-magasins', tuple(cube_ventes.valeurs['Categorie_Produit'])),
+                          config={'displayModeBar': False})
             ], style={'width': '48%', 'display': 'inline-block', 'float': 'right'})
         ])
     ], className='section-card'),
@@ -420,7 +647,8 @@ app.layout = html.Div([
         html.Div([
             # Graphique secteurs
             html.Div([
-                dcc.Graph(id='graph-modes-paiement', config={'displayModeBar': False})
+                dcc.Graph(id='graph-modes-paiement', figure=figures.figure('modes-paiement'),
+                          config={'displayModeBar': False})
             ], style={'width': '48%', 'display': 'inline-block'}),
             
             # KPI mode le plus utilisé
@@ -439,12 +667,14 @@ app.layout = html.Div([
         html.Div([
             # Satisfaction par magasin
             html.Div([
-                dcc.Graph(id='graph-satisfaction-magasins', config={'displayModeBar': False})
+                dcc.Graph(id='graph-satisfaction-magasins', figure=figures.figure('satisfaction-magasins'),
+                          config={'displayModeBar': False})
             ], style={'width': '48%', 'display': 'inline-block'}),
             
             # Satisfaction par catégorie
             html.Div([
-                dcc.Graph(id='graph-satisfaction-categories', config={'displayModeBar': False})
+                dcc.Graph(id='graph-satisfaction-categories', figure=figures.figure('satisfaction-categories'),
+                          config={'displayModeBar': False})
             ], style={'width': '48%', 'display': 'inline-block', 'float': 'right'})
         ]),
         
@@ -453,6 +683,42 @@ app.layout = html.Div([
         html.Div(id='tableau-satisfaction')
     ], className='section-card'),
     
+    # ===========================================================================
+    # SECTION 6 : DÉTAIL DES TRANSACTIONS
+    # ===========================================================================
+    html.Div([
+        html.H2('🔎 Détail des transactions', className='section-title'),
+        *([html.P('Détail indisponible en lecture par blocs (DASHBOARD_TAILLE_BLOC) : '
+                  'seuls les agrégats des transactions sont conservés en mémoire.',
+                  style={'color': '#718096', 'textAlign': 'center'})] if taille_bloc else []),
+        
+        # Pagination, tri et filtres des colonnes exécutés côté serveur
+        dash_table.DataTable(
+            id='tableau-transactions',
+            columns=COLONNES_TRANSACTIONS,
+            page_action='custom',
+            page_current=0,
+            page_size=15,
+            sort_action='custom',
+            sort_mode='multi',
+            sort_by=[],
+            filter_action='custom',
+            filter_query='',
+            style_cell={'textAlign': 'left', 'padding': '12px', 'fontFamily': 'Poppins'},
+            style_header={
+                'backgroundColor': '#667eea',
+                'color': 'white',
+                'fontWeight': '600',
+                'border': 'none'
+            },
+            style_data_conditional=[
+                {'if': {'row_index': 'odd'}, 'backgroundColor': '#f7fafc'}
+            ],
+            style_table={'borderRadius': '10px', 'overflow': 'hidden',
+                         **({'display': 'none'} if taille_bloc else {})}
+        )
+    ], className='section-card'),
+    
     # Footer
     html.Div([
         html.P('Dashboard créé avec ❤️ en Python Dash | © 2024 | Analyse Décisionnelle', 
@@ -463,48 +729,107 @@ app.layout = html.Div([
 # ==============================================================================
 # CALLBACKS POUR L'INTERACTIVITÉ
 # ==============================================================================
+# Un callback par section : chaque section est calculée et envoyée
+# séparément (affichage progressif), à partir d'une sélection du cube
+# mise en cache et partagée entre les sections.
+FILTRES = [Input('filtre-magasin', 'value'),
+           Input('filtre-categorie', 'value'),
+           Input('filtre-paiement', 'value'),
+           Input('filtre-periode', 'start_date'),
+           Input('filtre-periode', 'end_date')]
+
 
+def filtres_normalises(magasin, categorie, paiement, start_date, end_date):
+    """Clé des filtres : période ramenée aux jours entiers qu'elle couvre"""
+    if not (start_date and end_date):
+        return magasin, categorie, paiement, None, None
+    debut = pd.Timestamp(start_date).ceil('D').strftime('%Y-%m-%d')
+    fin = pd.Timestamp(end_date).floor('D').strftime('%Y-%m-%d')
+    return magasin, categorie, paiement, debut, fin
+
+
+def selection_filtres(version, cube, filtres):
+    """Sélection du cube pour un jeu de filtres (partagée par les sections)"""
+    magasin, categorie, paiement, debut, fin = filtres
+    return cache.calculer(('selection', version, filtres), lambda: cube.selection(
+        {'Magasin': magasin, 'Categorie_Produit': categorie, 'Mode_Paiement': paiement},
+        debut, fin
+    ))
+
+
+def section_en_cache(nom, parametres=None):
+    """
+    Mémoïse une section : la fonction décorée reçoit la sélection du cube,
+    et ses sorties sont conservées sous forme de JSON sérialisé, par version
+    des données et par jeu de filtres. Les données de traces des figures
+    (donnees_traces) sont renvoyées sous forme de dash.Patch. Les entrées
+    qui suivent les filtres sont converties par parametres(*entrees) en un
+    tuple, ajouté à la clé et passé à la fonction après la sélection.
+    Les étapes sont mesurées (moteur.instrumentation) : sélection, calcul
+    et sérialisation en cas de calcul, cache_ou_calcul (les englobe) et
+    réponse (reconstruction des Patch), ainsi que les lignes retenues.
+    """
+    def decorateur(fonction):
+        @wraps(fonction)
+        def section(*valeurs):
+            version, (_, cube_courant) = source.obtenir()
+            filtres = filtres_normalises(*valeurs[:len(FILTRES)])
+            supplementaires = parametres(*valeurs[len(FILTRES):]) if parametres else ()
+            calculs = []
+
+            def calculer():
+                calculs.append(nom)
+                with etape(nom, 'selection'):
+                    selection = selection_filtres(version, cube_courant, filtres)
+                with etape(nom, 'calcul'):
+                    sorties = fonction(selection, *supplementaires)
+                instrumentation.resumer('dashboard_lignes', nom, selection.totaux()['nb_transactions'])
+                with etape(nom, 'serialisation'):
+                    return pio.json.to_json_plotly(list(sorties))
+
+            with etape(nom, 'cache_ou_calcul'):
+                texte = cache.calculer((nom, version, filtres) + supplementaires, calculer)
+            instrumentation.compter('dashboard_cache_total', section=nom,
+                                    resultat='calcul' if calculs else 'cache')
+            with etape(nom, 'reponse'):
+                return tuple(en_sortie(sortie) for sortie in json.loads(texte))
+        return section
+    return decorateur
+
+
+def fenetre_zoom(relayout):
+    """
+    Jours extrêmes (debut, fin) de la zone zoomée du graphique des ventes
+    quotidiennes, (None, None) en vue complète. Les autres événements du
+    graphique (redimensionnement, zoom vertical seul) ne recalculent rien.
+    """
+    relayout = relayout or {}
+    if 'xaxis.range[0]' in relayout:
+        bornes = relayout['xaxis.range[0]'], relayout['xaxis.range[1]']
+    elif 'xaxis.range' in relayout:
+        bornes = relayout['xaxis.range']
+    elif ctx.triggered_id == 'graph-ventes-quotidiennes' and 'xaxis.autorange' not in relayout:
+        raise PreventUpdate
+    else:
+        return None, None
+    debut = pd.Timestamp(bornes[0]).floor('D').strftime('%Y-%m-%d')
+    fin = pd.Timestamp(bornes[1]).ceil('D').strftime('%Y-%m-%d')
+    return debut, fin
+
+
+# ==============================================================================
+# 1. VUE D'ENSEMBLE : CARTES KPI ET VENTES QUOTIDIENNES
+# ==============================================================================
 @app.callback(
-    [Output('kpi-cards', 'children'),
-     Output('graph-ventes-quotidiennes', 'figure'),
-     Output('graph-repartition-magasins', 'figure'),
-     Output('graph-montant-moyen-magasins', 'figure'),
-     Output('tableau-magasins', 'children'),
-     Output('graph-quantites-categories', 'figure'),
-     Output('graph-ca-categories-magasins', 'figure'),
-     Output('graph-modes-paiement', 'figure'),
-     Output('kpi-mode-paiement', 'children'),
-     Output('graph-satisfaction-magasins', 'figure'),
-     Output('graph-satisfaction-categories', 'figure'),
-     Output('tableau-satisfaction', 'children')],
-    [Input('filtre-magasin', 'value'),
-     Input('filtre-categorie', 'value'),
-     Input('filtre-paiement', 'value'),
-     Input('filtre-periode', 'start_date'),
-     Input('filtre-periode', 'end_date')]
+    [Output('kpi-cards', 'children')],
+    FILTRES
 )
-def update_dashboard(magasin, categorie, paiement, start_date, end_date):
-    # Filtrer les données
-    df_filtered = df.copy()
-    
-    if magasin != 'ALL':
-        df_filtered = df_filtered[df_filtered['Magasin'] == magasin]
-    if categorie != 'ALL':
-        df_filtered = df_filtered[df_filtered['Categorie_Produit'] == categorie]
-    if paiement != 'ALL':
-        df_filtered = df_filtered[df_filtered['Mode_Paiement'] == paiement]
-    if start_date and end_date:
-        df_filtered = df_filtered[
-            (df_filtered['Date_Transaction'] >= start_date) & 
-            (df_filtered['Date_Transaction'] <= end_date)
-        ]
+@section_en_cache('vue_ensemble')
+def maj_vue_ensemble(selection):
+    """Section vue d'ensemble : cartes KPI"""
+    kpis = selection.totaux()
     
-    # Calculer les KPI
-    kpis = calculer_kpis(df_filtered)
-    
-    # ===========================================================================
-    # 1. CARTES KPI STYLÉES
-    # ===========================================================================
+    # Cartes KPI
     kpi_cards = [
         html.Div([
             html.Div('💰', style={'fontSize': '40px', 'marginBottom': '10px'}),
@@ -531,59 +856,63 @@ def update_dashboard(magasin, categorie, paiement, start_date, end_date):
         ], className='kpi-card', style={'flex': '1', 'textAlign': 'center'})
     ]
     
-    # ===========================================================================
-    # 2. VENTES QUOTIDIENNES
-    # ===========================================================================
-    ventes_quotidiennes = df_filtered.groupby('Date')['Montant'].sum().reset_index()
-    fig_ventes_quotidiennes = go.Figure()
-    fig_ventes_quotidiennes.add_trace(go.Scatter(
-        x=ventes_quotidiennes['Date'],
-        y=ventes_quotidiennes['Montant'],
-        mode='lines+markers',
-        line=dict(color='#667eea', width=3),
-        marker=dict(size=8, color='#764ba2'),
-        fill='tonexty',
-        fillcolor='rgba(102, 126, 234, 0.1)',
-        name='Ventes'
-    ))
-    fig_ventes_quotidiennes.update_layout(
-        title='Évolution des ventes quotidiennes',
-        xaxis_title='Date',
-        yaxis_title='Ventes (€)',
-        template='plotly_white',
-        hovermode='x unified',
-        font=dict(family='Poppins', size=12),
-        title_font=dict(size=18, color='#2d3748', family='Poppins')
-    )
+    return (kpi_cards,)
+
+
+# Nom de la trace selon la résolution affichée (légende de survol)
+NOMS_RESOLUTION = {'jour': 'Ventes', 'semaine': 'Ventes de la semaine',
+                   'mois': 'Ventes du mois', 'lttb': 'Ventes'}
+
+
+@app.callback(
+    [Output('graph-ventes-quotidiennes', 'figure')],
+    FILTRES + [Input('graph-ventes-quotidiennes', 'relayoutData')]
+)
+@section_en_cache('ventes_quotidiennes', parametres=fenetre_zoom)
+def maj_ventes_quotidiennes(selection, debut, fin):
+    """
+    Ventes quotidiennes ramenées à POINTS_SERIE points au plus : sur toute
+    la période filtrée, ou sur la zone zoomée (debut, fin) qui retrouve la
+    résolution du jour dès qu'elle tient dans le budget
+    """
+    jours, ventes_quotidiennes = selection.par_jour('montant')
+    if debut is not None:
+        visibles = (jours >= np.datetime64(debut)) & (jours <= np.datetime64(fin))
+        jours, ventes_quotidiennes = jours[visibles], ventes_quotidiennes[visibles]
+    jours, ventes_quotidiennes, resolution = reduire_serie(
+        jours, ventes_quotidiennes, POINTS_SERIE, DECIMATION)
+    fig_ventes_quotidiennes = donnees_traces([figures.gabarit('ventes-quotidiennes').trace(
+        x=np.datetime_as_string(jours, unit='D'),
+        y=ventes_quotidiennes,
+        name=NOMS_RESOLUTION[resolution],
+    )])
     
-    # ===========================================================================
-    # 3. ANALYSE PAR MAGASIN
-    # ===========================================================================
-    ventes_magasins = df_filtered.groupby('Magasin')['Montant'].sum().reset_index()
-    fig_repartition = px.pie(
-        ventes_magasins, values='Montant', names='Magasin',
-        title='Répartition des ventes par magasin',
-        hole=0.4,
-        color_discrete_sequence=px.colors.sequential.RdBu
-    )
-    fig_repartition.update_traces(textposition='inside', textinfo='percent+label', textfont_size=12)
-    fig_repartition.update_layout(font=dict(family='Inter'))
+    return (fig_ventes_quotidiennes,)
+
+
+# ==============================================================================
+# 2. ANALYSE PAR MAGASIN
+# ==============================================================================
+@app.callback(
+    [Output('graph-repartition-magasins', 'figure'),
+     Output('graph-montant-moyen-magasins', 'figure'),
+     Output('tableau-magasins', 'children')],
+    FILTRES
+)
+@section_en_cache('magasins')
+def maj_magasins(selection):
+    """Section magasins : répartition, montant moyen et tableau"""
+    stats_par_magasin = selection.tableau(['Magasin'])
+    fig_repartition = donnees_traces([figures.gabarit('repartition-magasins').trace(
+        labels=stats_par_magasin['Magasin'].to_numpy(),
+        values=stats_par_magasin['montant'].to_numpy(),
+    )])
     
-    montant_moyen_magasins = df_filtered.groupby('Magasin')['Montant'].mean().reset_index()
-    fig_montant_moyen = px.bar(
-        montant_moyen_magasins, x='Magasin', y='Montant',
-        title='Montant moyen par transaction et par magasin',
-        labels={'Montant': 'Montant moyen (€)'},
-        color='Montant',
-        color_continuous_scale='Purples'
-    )
-    fig_montant_moyen.update_layout(showlegend=False, font=dict(family='Inter'))
+    fig_montant_moyen = traces_barres(
+        figures.gabarit('montant-moyen-magasins'), stats_par_magasin, 'Magasin', 'montant_moyen')
     
-    stats_magasins = df_filtered.groupby('Magasin').agg({
-        'Montant': ['sum', 'count', 'mean']
-    }).round(2)
-    stats_magasins.columns = ['Ventes totales (€)', 'Nb transactions', 'Montant moyen (€)']
-    stats_magasins = stats_magasins.reset_index()
+    stats_magasins = stats_par_magasin[['Magasin', 'montant', 'n_montant', 'montant_moyen']].round(2)
+    stats_magasins.columns = ['Magasin', 'Ventes totales (€)', 'Nb transactions', 'Montant moyen (€)']
     
     tableau_magasins = dash_table.DataTable(
         data=stats_magasins.to_dict('records'),
@@ -601,42 +930,54 @@ def update_dashboard(magasin, categorie, paiement, start_date, end_date):
         style_table={'borderRadius': '10px', 'overflow': 'hidden'}
     )
     
-    # ===========================================================================
-    # 4. ANALYSE DES CATÉGORIES
-    # ===========================================================================
-    quantites_cat = df_filtered.groupby('Categorie_Produit')['Quantite'].sum().reset_index()
-    fig_quantites = px.bar(
-        quantites_cat, x='Categorie_Produit', y='Quantite',
-        title='Quantités vendues par catégorie',
-        labels={'Quantite': 'Quantité totale', 'Categorie_Produit': 'Catégorie'},
-        color='Quantite',
-        color_continuous_scale='Teal'
-    )
-    fig_quantites.update_layout(font=dict(family='Inter'))
+    return fig_repartition, fig_montant_moyen, tableau_magasins
+
+
+# ==============================================================================
+# 3. ANALYSE DES CATÉGORIES
+# ==============================================================================
+@app.callback(
+    [Output('graph-quantites-categories', 'figure'),
+     Output('graph-ca-categories-magasins', 'figure')],
+    FILTRES
+)
+@section_en_cache('categories')
+def maj_categories(selection):
+    """Section catégories : quantités et CA par magasin"""
+    stats_par_categorie = selection.tableau(['Categorie_Produit'])
+    fig_quantites = traces_barres(
+        figures.gabarit('quantites-categories'), stats_par_categorie, 'Categorie_Produit', 'quantite')
     
-    ca_cat_mag = df_filtered.groupby(['Magasin', 'Categorie_Produit'])['Montant'].sum().reset_index()
-    fig_ca_empile = px.bar(
-        ca_cat_mag, x='Magasin', y='Montant', color='Categorie_Produit',
-        title='Chiffre d\'affaires par catégorie et magasin',
-        labels={'Montant': 'CA (€)'},
-        barmode='stack',
-        color_discrete_sequence=px.colors.qualitative.Set2
+    # Une trace par catégorie présente, au style de sa catégorie dans le gabarit
+    ca_cat_mag = selection.tableau(['Magasin', 'Categorie_Produit'])
+    gabarit_ca = figures.gabarit('ca-categories-magasins', tuple(selection.valeurs['Categorie_Produit']))
+    fig_ca_empile = donnees_traces(
+        gabarit_ca.trace_nommee(categorie, x=lignes['Magasin'].to_numpy(), y=lignes['montant'].to_numpy())
+        for categorie, lignes in ca_cat_mag.groupby('Categorie_Produit', sort=False)
     )
-    fig_ca_empile.update_layout(font=dict(family='Inter'))
     
-    # ===========================================================================
-    # 5. MODES DE PAIEMENT
-    # ===========================================================================
-    modes_paiement = df_filtered['Mode_Paiement'].value_counts().reset_index()
+    return fig_quantites, fig_ca_empile
+
+
+# ==============================================================================
+# 4. MODES DE PAIEMENT
+# ==============================================================================
+@app.callback(
+    [Output('graph-modes-paiement', 'figure'),
+     Output('kpi-mode-paiement', 'children')],
+    FILTRES
+)
+@section_en_cache('paiements')
+def maj_paiements(selection):
+    """Section paiements : répartition et mode le plus utilisé"""
+    modes_paiement = selection.tableau(['Mode_Paiement'])[['Mode_Paiement', 'n_lignes']]
     modes_paiement.columns = ['Mode_Paiement', 'Count']
+    modes_paiement = modes_paiement.sort_values('Count', ascending=False, kind='stable')
     
-    fig_modes = px.pie(
-        modes_paiement, values='Count', names='Mode_Paiement',
-        title='Répartition des transactions par mode de paiement',
-        hole=0.3,
-        color_discrete_sequence=px.colors.qualitative.Set3
-    )
-    fig_modes.update_layout(font=dict(family='Inter'))
+    fig_modes = donnees_traces([figures.gabarit('modes-paiement').trace(
+        labels=modes_paiement['Mode_Paiement'].to_numpy(),
+        values=modes_paiement['Count'].to_numpy(),
+    )])
     
     mode_plus_utilise = modes_paiement.iloc[0]['Mode_Paiement']
     pct_mode = (modes_paiement.iloc[0]['Count'] / modes_paiement['Count'].sum() * 100)
@@ -650,32 +991,30 @@ def update_dashboard(magasin, categorie, paiement, start_date, end_date):
                  style={'marginTop': '20px', 'display': 'inline-block'})
     ])
     
-    # ===========================================================================
-    # 6. SATISFACTION CLIENT
-    # ===========================================================================
-    satisfaction_mag = df_filtered.groupby('Magasin')['Satisfaction_Client'].mean().reset_index()
-    fig_sat_mag = px.bar(
-        satisfaction_mag, x='Magasin', y='Satisfaction_Client',
-        title='Satisfaction moyenne par magasin',
-        labels={'Satisfaction_Client': 'Score moyen'},
-        color='Satisfaction_Client',
-        color_continuous_scale='RdYlGn',
-        range_color=[1, 5]
-    )
-    fig_sat_mag.update_layout(font=dict(family='Inter'))
-    
-    satisfaction_cat = df_filtered.groupby('Categorie_Produit')['Satisfaction_Client'].mean().reset_index()
-    fig_sat_cat = px.bar(
-        satisfaction_cat, x='Categorie_Produit', y='Satisfaction_Client',
-        title='Satisfaction moyenne par catégorie',
-        labels={'Satisfaction_Client': 'Score moyen', 'Categorie_Produit': 'Catégorie'},
-        color='Satisfaction_Client',
-        color_continuous_scale='RdYlGn',
-        range_color=[1, 5]
-    )
-    fig_sat_cat.update_layout(font=dict(family='Inter'))
+    return fig_modes, kpi_mode
+
+
+# ==============================================================================
+# 5. SATISFACTION CLIENT
+# ==============================================================================
+@app.callback(
+    [Output('graph-satisfaction-magasins', 'figure'),
+     Output('graph-satisfaction-categories', 'figure'),
+     Output('tableau-satisfaction', 'children')],
+    FILTRES
+)
+@section_en_cache('satisfaction')
+def maj_satisfaction(selection):
+    """Section satisfaction : moyennes et distribution des scores"""
+    stats_par_magasin = selection.tableau(['Magasin'])
+    stats_par_categorie = selection.tableau(['Categorie_Produit'])
+    fig_sat_mag = traces_barres(
+        figures.gabarit('satisfaction-magasins'), stats_par_magasin, 'Magasin', 'satisfaction_moyenne')
+    fig_sat_cat = traces_barres(
+        figures.gabarit('satisfaction-categories'), stats_par_categorie,
+        'Categorie_Produit', 'satisfaction_moyenne')
     
-    dist_satisfaction = df_filtered['Satisfaction_Client'].value_counts().sort_index().reset_index()
+    dist_satisfaction = selection.distribution_satisfaction().reset_index()
     dist_satisfaction.columns = ['Score', 'Nombre de transactions']
     dist_satisfaction['Pourcentage'] = (dist_satisfaction['Nombre de transactions'] / 
                                         dist_satisfaction['Nombre de transactions'].sum() * 100).round(2)
@@ -698,14 +1037,71 @@ def update_dashboard(magasin, categorie, paiement, start_date, end_date):
         style_table={'borderRadius': '10px', 'overflow': 'hidden'}
     )
     
-    return (kpi_cards, fig_ventes_quotidiennes, fig_repartition, fig_montant_moyen,
-            tableau_magasins, fig_quantites, fig_ca_empile, fig_modes, kpi_mode,
-            fig_sat_mag, fig_sat_cat, tableau_satisfaction)
+    return fig_sat_mag, fig_sat_cat, tableau_satisfaction
+
+
+# ==============================================================================
+# 6. DÉTAIL DES TRANSACTIONS
+# ==============================================================================
+@app.callback(
+    [Output('tableau-transactions', 'data'),
+     Output('tableau-transactions', 'page_count')],
+    FILTRES + [Input('tableau-transactions', 'page_current'),
+               Input('tableau-transactions', 'page_size'),
+               Input('tableau-transactions', 'sort_by'),
+               Input('tableau-transactions', 'filter_query')]
+)
+def maj_transactions(magasin, categorie, paiement, start_date, end_date,
+                     page_current, page_size, sort_by, filter_query):
+    """
+    Page visible du détail des transactions du classeur : lignes retenues
+    par l'index de filtrage, filtrées et triées selon les en-têtes du tableau
+    """
+    _, (moteur_filtres, _) = source.obtenir()
+    if moteur_filtres is None:  # lecture par blocs : pas d'index des lignes
+        return [], 1
+    # Un seul index pour toute la requête (fusion des segments en arrière-plan)
+    moteur_filtres = moteur_filtres.courant()
+    magasin, categorie, paiement, debut, fin = filtres_normalises(
+        magasin, categorie, paiement, start_date, end_date)
+    with etape('transactions', 'filtrage'):
+        indices = moteur_filtres.indices(
+            {'Magasin': magasin, 'Categorie_Produit': categorie, 'Mode_Paiement': paiement},
+            debut, fin
+        )
+    instrumentation.resumer('dashboard_lignes', 'transactions', len(indices))
+    with etape('transactions', 'page'):
+        lignes, nb_lignes = page_serveur(moteur_filtres, indices, page_current, page_size,
+                                         sort_by, filter_query)
+    
+    lignes = lignes[[colonne['id'] for colonne in COLONNES_TRANSACTIONS]].assign(
+        Date_Transaction=lignes['Date_Transaction'].dt.strftime('%Y-%m-%d'),
+        Montant=lignes['Montant'].round(2),
+    )
+    return lignes.to_dict('records'), max(1, -(-nb_lignes // page_size))
+
 
 # ==============================================================================
 # LANCEMENT DU SERVEUR
 # ==============================================================================
 server = app.server
+
+
+@server.route('/stats-cache')
+def stats_cache():
+    """Compteurs du cache (succès, échecs, évictions, mémoire)"""
+    return {'version_donnees': source.obtenir()[0], **cache.statistiques()}
+
+
+route_ingestion(server, source)
+# Durées par étape, lignes et tailles des réponses : /metrics (Prometheus),
+# et en-tête Server-Timing avec DASHBOARD_SERVER_TIMING=1
+installer_metriques(server)
+# Réponses compressées (brotli ou gzip, DASHBOARD_COMPRESSION)
+installer_compression(server)
+profileur.installer(server)
+
+
 if __name__ == '__main__':
     print("\n" + "="*80)
     print("🚀 DASHBOARD INTERACTIF STYLÉ LANCÉ")
@@ -713,5 +1109,8 @@ if __name__ == '__main__':
     print("\n📍 Ouvrez votre navigateur à l'adresse : http://127.0.0.1:8051/")
     print("\n💡 Design moderne avec animations et gradient")
     print("⏹️  Appuyez sur Ctrl+C pour arrêter le serveur\n")
+    if profileur.actif:
+        print(f"🔬 Profilage actif : profils écrits dans {profileur.dossier}\n")
     
-    app.run(debug=True, host='0.0.0.0', port=8051)
\ No newline at end of file
+    # Pas de rechargement automatique en profilage (il relancerait le démarrage)
+    app.run(debug=True, host='0.0.0.0', port=8051, use_reloader=not profileur.actif)
\ No newline at end of file
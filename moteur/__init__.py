@@ -0,0 +1,3 @@
+"""
+Moteur de données partagé par les dashboards des exercices 1 et 2
+"""
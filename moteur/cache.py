@@ -0,0 +1,399 @@
+"""
+Caches des calculs du dashboard
+Trois backends interchangeables, choisis par la variable d'environnement
+DASHBOARD_CACHE :
+- memoire (défaut)         : LRU dans le processus, plafonné en mémoire ;
+- sqlite:///chemin.sqlite  : fichier SQLite partagé par les workers d'un nœud ;
+- redis://hote:6379/0      : serveur Redis (ou compatible) local.
+Tous coalescent les requêtes identiques : une clé absente n'est calculée
+qu'une fois, les appels concurrents attendent puis relisent le résultat.
+"""
+
+import contextlib
+import hashlib
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou inter-processus
+    fcntl = None
+
+_MANQUANT = object()
+
+# Cache SQLite : délai (secondes) entre deux enregistrements groupés des dates d'accès
+DELAI_ACCES = 5.0
+
+
+def _tableau_racine(tableau):
+    """Tableau qui possède la mémoire d'une vue (la vue elle-même sinon)"""
+    while isinstance(tableau.base, np.ndarray):
+        tableau = tableau.base
+    return tableau
+
+
+def taille_objet(valeur, _vus=None):
+    """
+    Estimation (en octets) de la mémoire occupée par une valeur. Une vue
+    NumPy compte pour le tableau dont elle dépend (qu'elle garde en
+    mémoire), une seule fois par valeur ; les fichiers mappés en mémoire
+    (mémoire partagée) ne comptent que pour la vue.
+    """
+    _vus = set() if _vus is None else _vus
+    if isinstance(valeur, (str, bytes)):
+        return sys.getsizeof(valeur)
+    if isinstance(valeur, np.ndarray):
+        racine = _tableau_racine(valeur)
+        if racine.base is not None:  # mémoire mappée ou tampon externe
+            racine = valeur
+        if id(racine) in _vus:
+            return 0
+        _vus.add(id(racine))
+        return racine.nbytes
+    if isinstance(valeur, (pd.DataFrame, pd.Series)):
+        return int(np.sum(valeur.memory_usage(deep=True)))
+    if isinstance(valeur, dict):
+        return sum(taille_objet(k, _vus) + taille_objet(v, _vus) for k, v in valeur.items())
+    if isinstance(valeur, (list, tuple)):
+        return sum(taille_objet(v, _vus) for v in valeur)
+    if hasattr(valeur, '__dict__'):
+        return taille_objet(vars(valeur), _vus)
+    return sys.getsizeof(valeur)
+
+
+def cle_texte(cle):
+    """Clé textuelle stable pour les backends partagés"""
+    return hashlib.sha1(repr(cle).encode('utf-8')).hexdigest()
+
+
+class BackendCache:
+    """Base commune : compteurs et coalescence des calculs concurrents"""
+
+    def __init__(self):
+        self.succes = 0
+        self.echecs = 0
+        self.coalescences = 0
+        self._verrous_cles = {}
+        self._verrou_cles = threading.Lock()
+
+    # Méthodes à fournir par chaque backend -----------------------------------
+    def _lire(self, cle):
+        raise NotImplementedError
+
+    def _ecrire(self, cle, valeur):
+        raise NotImplementedError
+
+    def vider(self):
+        raise NotImplementedError
+
+    def verrou(self, cle):
+        """Verrou inter-processus sur une clé (aucun par défaut)"""
+        return contextlib.nullcontext()
+
+    # -------------------------------------------------------------------------
+    def obtenir(self, cle, defaut=None):
+        """Valeur associée à la clé, ou defaut"""
+        valeur = self._lire(cle)
+        if valeur is _MANQUANT:
+            self.echecs += 1
+            return defaut
+        self.succes += 1
+        return valeur
+
+    def stocker(self, cle, valeur):
+        """Ajoute (ou remplace) une entrée"""
+        self._ecrire(cle, valeur)
+
+    @contextlib.contextmanager
+    def _verrou_local(self, cle):
+        """Verrou par clé entre les threads du processus"""
+        with self._verrou_cles:
+            verrou, utilisateurs = self._verrous_cles.get(cle, (threading.Lock(), 0))
+            self._verrous_cles[cle] = (verrou, utilisateurs + 1)
+        try:
+            with verrou:
+                yield
+        finally:
+            with self._verrou_cles:
+                verrou, utilisateurs = self._verrous_cles[cle]
+                if utilisateurs == 1:
+                    del self._verrous_cles[cle]
+                else:
+                    self._verrous_cles[cle] = (verrou, utilisateurs - 1)
+
+    def calculer(self, cle, fonction):
+        """
+        Renvoie la valeur en cache, ou la calcule et la stocke. Les appels
+        concurrents sur une même clé (threads ou workers) attendent le
+        premier calcul au lieu de le refaire.
+        """
+        valeur = self.obtenir(cle, _MANQUANT)
+        if valeur is not _MANQUANT:
+            return valeur
+        with self._verrou_local(cle), self.verrou(cle):
+            valeur = self._lire(cle)
+            if valeur is not _MANQUANT:
+                self.coalescences += 1
+                return valeur
+            valeur = fonction()
+            self._ecrire(cle, valeur)
+            return valeur
+
+    def statistiques(self):
+        """Compteurs du cache"""
+        total = self.succes + self.echecs
+        return {
+            'backend': type(self).__name__,
+            'succes': self.succes,
+            'echecs': self.echecs,
+            'coalescences': self.coalescences,
+            'taux_succes': round(self.succes / total, 4) if total else None,
+        }
+
+
+# ==============================================================================
+# BACKEND MÉMOIRE (PAR PROCESSUS)
+# ==============================================================================
+class CacheLRU(BackendCache):
+    """Cache LRU avec plafond mémoire (thread-safe)"""
+
+    def __init__(self, max_entrees=256, max_octets=64 * 1024 ** 2):
+        super().__init__()
+        self.max_entrees = max_entrees
+        self.max_octets = max_octets
+        self._entrees = OrderedDict()
+        self._verrou = threading.Lock()
+        self.octets = 0
+        self.evictions = 0
+
+    def _lire(self, cle):
+        with self._verrou:
+            if cle not in self._entrees:
+                return _MANQUANT
+            self._entrees.move_to_end(cle)
+            return self._entrees[cle][0]
+
+    def _ecrire(self, cle, valeur, taille=None):
+        taille = taille_objet(valeur) if taille is None else taille
+        if taille > self.max_octets:
+            return
+        with self._verrou:
+            if cle in self._entrees:
+                self.octets -= self._entrees.pop(cle)[1]
+            self._entrees[cle] = (valeur, taille)
+            self.octets += taille
+            while len(self._entrees) > self.max_entrees or self.octets > self.max_octets:
+                _, (_, taille_evincee) = self._entrees.popitem(last=False)
+                self.octets -= taille_evincee
+                self.evictions += 1
+
+    def stocker(self, cle, valeur, taille=None):
+        """Ajoute une entrée puis évince les plus anciennes au-delà des plafonds"""
+        self._ecrire(cle, valeur, taille)
+
+    def vider(self):
+        """Supprime toutes les entrées (les compteurs sont conservés)"""
+        with self._verrou:
+            self._entrees.clear()
+            self.octets = 0
+
+    def statistiques(self):
+        with self._verrou:
+            return {**super().statistiques(), 'entrees': len(self._entrees),
+                    'octets': self.octets, 'evictions': self.evictions}
+
+
+# ==============================================================================
+# BACKEND SQLITE (PARTAGÉ PAR LES WORKERS D'UN NŒUD)
+# ==============================================================================
+class CacheSQLite(BackendCache):
+    """
+    Cache sur disque (SQLite), LRU plafonné en octets. Les dates d'accès
+    des lectures sont gardées en mémoire et enregistrées par groupes (au
+    plus toutes les DELAI_ACCES secondes, et avant chaque écriture) : une
+    lecture ne prend pas le verrou d'écriture de la base.
+    """
+
+    def __init__(self, chemin, max_octets=512 * 1024 ** 2):
+        super().__init__()
+        self.chemin = chemin
+        self.max_octets = max_octets
+        self.dossier_verrous = f'{chemin}.verrous'
+        os.makedirs(self.dossier_verrous, exist_ok=True)
+        self._local = threading.local()
+        self._acces = {}  # clé texte -> date du dernier accès non enregistrée
+        self._verrou_acces = threading.Lock()
+        self._envoi_acces = time.monotonic()
+        with self._connexion() as cnx:
+            cnx.execute('CREATE TABLE IF NOT EXISTS entrees ('
+                        'cle TEXT PRIMARY KEY, valeur BLOB, taille INTEGER, acces REAL)')
+            cnx.execute('CREATE INDEX IF NOT EXISTS entrees_acces ON entrees (acces)')
+
+    def _connexion(self):
+        """
+        Connexion SQLite propre au thread (mode WAL pour les lectures
+        concurrentes) ; une connexion héritée du processus maître (workers
+        lancés par fork après préchargement) n'est pas réutilisée
+        """
+        cnx, pid = getattr(self._local, 'cnx', (None, None))
+        if cnx is None or pid != os.getpid():
+            cnx = sqlite3.connect(self.chemin, timeout=30)
+            cnx.execute('PRAGMA journal_mode=WAL')
+            cnx.execute('PRAGMA synchronous=NORMAL')
+            self._local.cnx = cnx, os.getpid()
+        return cnx
+
+    def _enregistrer_acces(self, cnx):
+        """Enregistre les dates d'accès en attente (dans la transaction de cnx)"""
+        with self._verrou_acces:
+            acces, self._acces = self._acces, {}
+            self._envoi_acces = time.monotonic()
+        if acces:
+            cnx.executemany('UPDATE entrees SET acces = MAX(acces, ?) WHERE cle = ?',
+                            [(date, cle) for cle, date in acces.items()])
+
+    def _lire(self, cle):
+        cnx = self._connexion()
+        cle = cle_texte(cle)
+        ligne = cnx.execute('SELECT valeur FROM entrees WHERE cle = ?', (cle,)).fetchone()
+        if ligne is None:
+            return _MANQUANT
+        with self._verrou_acces:
+            self._acces[cle] = time.time()
+            echu = time.monotonic() - self._envoi_acces > DELAI_ACCES
+        if echu:
+            with cnx:
+                self._enregistrer_acces(cnx)
+        return pickle.loads(ligne[0])
+
+    def _ecrire(self, cle, valeur):
+        donnees = pickle.dumps(valeur, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(donnees) > self.max_octets:
+            return
+        cnx = self._connexion()
+        with cnx:
+            # Accès récents enregistrés avant une éventuelle éviction LRU
+            self._enregistrer_acces(cnx)
+            cnx.execute('INSERT OR REPLACE INTO entrees VALUES (?, ?, ?, ?)',
+                        (cle_texte(cle), donnees, len(donnees), time.time()))
+            total = cnx.execute('SELECT COALESCE(SUM(taille), 0) FROM entrees').fetchone()[0]
+            # Éviction LRU jusqu'à repasser sous le plafond
+            while total > self.max_octets:
+                cle_ancienne, taille = cnx.execute(
+                    'SELECT cle, taille FROM entrees ORDER BY acces LIMIT 1').fetchone()
+                cnx.execute('DELETE FROM entrees WHERE cle = ?', (cle_ancienne,))
+                total -= taille
+
+    def vider(self):
+        with self._verrou_acces:
+            self._acces.clear()
+        with self._connexion() as cnx:
+            cnx.execute('DELETE FROM entrees')
+
+    @contextlib.contextmanager
+    def verrou(self, cle):
+        """
+        Verrou fichier (flock) par clé, partagé entre processus. Le fichier
+        est supprimé par son détenteur avant d'être libéré : le dossier ne
+        garde que les verrous des calculs en cours. Un processus qui
+        obtient le verrou d'un fichier déjà supprimé (ou remplacé) réessaie
+        sur le fichier courant. Un verrou par clé, pris dans l'ordre des
+        calculs imbriqués (une section, puis sa sélection) : pas de cycle.
+        """
+        if fcntl is None:
+            yield
+            return
+        chemin = os.path.join(self.dossier_verrous, cle_texte(cle))
+        while True:
+            fichier = open(chemin, 'a')
+            try:
+                fcntl.flock(fichier, fcntl.LOCK_EX)
+                if os.stat(chemin).st_ino == os.fstat(fichier.fileno()).st_ino:
+                    break
+            except FileNotFoundError:
+                pass
+            except BaseException:
+                fichier.close()
+                raise
+            fichier.close()
+        try:
+            yield
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(chemin)
+            fichier.close()
+
+    def statistiques(self):
+        entrees, octets = self._connexion().execute(
+            'SELECT COUNT(*), COALESCE(SUM(taille), 0) FROM entrees').fetchone()
+        return {**super().statistiques(), 'entrees': entrees, 'octets': octets}
+
+
+# ==============================================================================
+# BACKEND REDIS
+# ==============================================================================
+class CacheRedis(BackendCache):
+    """Cache Redis : l'éviction LRU est déléguée au serveur (maxmemory-policy)"""
+
+    def __init__(self, url, prefixe='dashboard:', expiration=3600):
+        super().__init__()
+        import redis  # dépendance optionnelle
+        self.client = redis.Redis.from_url(url)
+        self.prefixe = prefixe
+        self.expiration = expiration
+
+    def _lire(self, cle):
+        donnees = self.client.get(self.prefixe + cle_texte(cle))
+        return _MANQUANT if donnees is None else pickle.loads(donnees)
+
+    def _ecrire(self, cle, valeur):
+        self.client.set(self.prefixe + cle_texte(cle),
+                        pickle.dumps(valeur, protocol=pickle.HIGHEST_PROTOCOL),
+                        ex=self.expiration)
+
+    def vider(self):
+        for cle in self.client.scan_iter(self.prefixe + '*'):
+            self.client.delete(cle)
+
+    @contextlib.contextmanager
+    def verrou(self, cle):
+        """
+        Verrou Redis de la clé ; s'il n'est pas obtenu à temps (ou expire
+        pendant le calcul), le calcul se fait sans lui plutôt qu'en erreur
+        """
+        from redis.exceptions import LockError
+
+        verrou = self.client.lock(f'{self.prefixe}verrou:{cle_texte(cle)}',
+                                  timeout=60, blocking_timeout=60)
+        try:
+            acquis = verrou.acquire()
+        except LockError:
+            acquis = False
+        try:
+            yield
+        finally:
+            if acquis:
+                try:
+                    verrou.release()
+                except LockError:
+                    pass
+
+
+def creer_cache(url=None, max_entrees=256, max_octets=64 * 1024 ** 2):
+    """Instancie le backend désigné par url (ou DASHBOARD_CACHE)"""
+    url = url or os.environ.get('DASHBOARD_CACHE', 'memoire')
+    if url.startswith('sqlite://'):
+        return CacheSQLite(url[len('sqlite://'):], max_octets=max_octets)
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        return CacheRedis(url)
+    if url != 'memoire':
+        raise ValueError(f"Backend de cache inconnu : {url}")
+    return CacheLRU(max_entrees=max_entrees, max_octets=max_octets)
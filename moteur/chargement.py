@@ -0,0 +1,395 @@
+"""
+Chargement des données avec cache colonnaire (Feather / Arrow IPC)
+Chaque classeur Excel n'est converti qu'une fois : les démarrages suivants
+relisent le fichier Feather en mémoire mappée, déjà nettoyé et typé.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+
+from moteur.schema import appliquer_schema, valider
+
+# ==============================================================================
+# PARAMÈTRES DU CACHE
+# ==============================================================================
+DOSSIER_CACHE = '.cache_donnees'
+
+# À incrémenter dès que la préparation des données change (invalide les caches)
+VERSION_FORMAT = 1
+
+
+def empreinte_fichier(chemin, taille_bloc=1 << 20):
+    """Calcule l'empreinte SHA-256 du contenu d'un fichier"""
+    sha = hashlib.sha256()
+    with open(chemin, 'rb') as f:
+        for bloc in iter(lambda: f.read(taille_bloc), b''):
+            sha.update(bloc)
+    return sha.hexdigest()
+
+
+# Nombre décimal simple (point décimal), convertible directement par Arrow
+MOTIF_NOMBRE = r'^[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?$'
+
+
+def _texte_en_nombres(textes):
+    """
+    Textes à virgule ou point décimal -> float64, par les noyaux texte
+    d'Arrow. Les rares textes hors motif (espaces, 'N/A', ...) passent par
+    pd.to_numeric, qui garde les règles de l'ancienne conversion.
+    """
+    chaines = pc.replace_substring(pa.array(textes, type=pa.string()), ',', '.')
+    simples = pc.match_substring_regex(chaines, MOTIF_NOMBRE).to_numpy(zero_copy_only=False)
+    nombres = np.full(len(textes), np.nan)
+    nombres[simples] = pc.cast(chaines.filter(simples), pa.float64()).to_numpy()
+    if not simples.all():
+        autres = chaines.filter(~simples).to_pandas()
+        nombres[~simples] = pd.to_numeric(autres, errors='coerce').to_numpy(dtype=float)
+    return nombres
+
+
+def convertir_montants(valeurs):
+    """
+    Convertit une colonne de montants en float64.
+
+    Une colonne déjà numérique est gardée telle quelle. Dans une colonne
+    objet, seules les cellules texte (virgule décimale du classeur) sont
+    analysées, par les noyaux texte d'Arrow ; les autres cellules passent
+    par pd.to_numeric (dates issues d'Excel -> NaN). Renvoie
+    (montants, nb_invalides), nb_invalides comptant les valeurs non vides
+    remplacées par NaN.
+    """
+    if pd.api.types.is_numeric_dtype(valeurs) and not pd.api.types.is_bool_dtype(valeurs):
+        return valeurs.astype(float), 0
+    brutes = valeurs.to_numpy(dtype=object)
+    texte = valeurs.map(type).to_numpy() == str
+    montants = np.full(len(brutes), np.nan)
+    if texte.any():
+        montants[texte] = _texte_en_nombres(brutes[texte])
+    if not texte.all():
+        autres = pd.to_numeric(pd.Series(brutes[~texte], dtype=object), errors='coerce')
+        montants[~texte] = autres.to_numpy(dtype=float)
+    montants = pd.Series(montants, index=valeurs.index, name=valeurs.name)
+    return montants, int((montants.isna() & valeurs.notna()).sum())
+
+
+def preparer_donnees(df, colonne_montant):
+    """
+    Nettoie le montant (virgule décimale) et convertit la date. Le nombre
+    de montants invalides est conservé dans df.attrs['montants_invalides'].
+    """
+    df[colonne_montant], df.attrs['montants_invalides'] = convertir_montants(df[colonne_montant])
+    df['Date_Transaction'] = pd.to_datetime(df['Date_Transaction'])
+    return df
+
+
+def _lire_meta(chemin_meta):
+    """Lit les métadonnées du cache (None si absentes ou illisibles)"""
+    try:
+        with open(chemin_meta, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _ecrire_json(chemin, contenu):
+    """Écrit un dictionnaire au format JSON"""
+    with open(chemin, 'w', encoding='utf-8') as f:
+        json.dump(contenu, f, indent=2)
+
+
+def _ecrire_atomique(chemin, ecrire):
+    """Écrit un fichier via un fichier temporaire puis un renommage atomique"""
+    temporaire = f'{chemin}.{os.getpid()}.tmp'
+    ecrire(temporaire)
+    os.replace(temporaire, chemin)
+
+
+def preparer_cache(chemin, colonne_montant, schema=None):
+    """
+    Garantit que le cache colonnaire du classeur est à jour.
+
+    Le cache est indexé par la date de modification et l'empreinte SHA-256
+    du classeur : l'empreinte n'est recalculée que si la date ou la taille
+    ont changé, et le classeur n'est reconverti que si son contenu a changé.
+    Avec un schéma (moteur.schema), les colonnes sont validées et les
+    dimensions stockées en catégories à la conversion.
+    Renvoie le couple (empreinte, chemin du fichier Feather).
+    """
+    dossier = os.path.join(os.path.dirname(os.path.abspath(chemin)), DOSSIER_CACHE)
+    os.makedirs(dossier, exist_ok=True)
+    nom = os.path.splitext(os.path.basename(chemin))[0]
+    chemin_meta = os.path.join(dossier, f'{nom}.json')
+
+    stat = os.stat(chemin)
+    meta = _lire_meta(chemin_meta)
+    meta_valide = (
+        meta is not None
+        and meta.get('version_format') == VERSION_FORMAT
+        and meta.get('colonne_montant') == colonne_montant
+        and meta.get('schema') == schema
+        and os.path.isfile(os.path.join(dossier, meta.get('fichier', '')))
+    )
+
+    if meta_valide and (meta['mtime_ns'], meta['taille']) == (stat.st_mtime_ns, stat.st_size):
+        empreinte = meta['sha256']
+    else:
+        empreinte = empreinte_fichier(chemin)
+        if not (meta_valide and meta['sha256'] == empreinte):
+            # Conversion unique : lecture Excel + nettoyage, puis écriture Feather
+            print(f"🗃️  Conversion de {os.path.basename(chemin)} vers le cache colonnaire...")
+            df = preparer_donnees(pd.read_excel(chemin), colonne_montant)
+            if df.attrs['montants_invalides']:
+                print(f"⚠️  {df.attrs['montants_invalides']} montant(s) non numérique(s) remplacé(s) par NaN")
+            if schema is not None:
+                df, avant, apres = appliquer_schema(df, schema, os.path.basename(chemin))
+                print(f"🗂️  Colonnes catégorielles : {avant / 1024 ** 2:.2f} Mo -> "
+                      f"{apres / 1024 ** 2:.2f} Mo ({1 - apres / max(avant, 1):.0%} économisés)")
+            fichier = f'{nom}-{empreinte[:16]}.feather'
+            _ecrire_atomique(
+                os.path.join(dossier, fichier),
+                lambda tmp: feather.write_feather(df, tmp, compression='uncompressed')
+            )
+            # Suppression des anciennes versions du cache
+            for ancien in os.listdir(dossier):
+                if ancien.startswith(f'{nom}-') and ancien.endswith('.feather') and ancien != fichier:
+                    os.remove(os.path.join(dossier, ancien))
+        else:
+            fichier = meta['fichier']
+
+        meta = {
+            'version_format': VERSION_FORMAT,
+            'colonne_montant': colonne_montant,
+            'schema': schema,
+            'mtime_ns': stat.st_mtime_ns,
+            'taille': stat.st_size,
+            'sha256': empreinte,
+            'fichier': fichier,
+        }
+        _ecrire_atomique(chemin_meta, lambda tmp: _ecrire_json(tmp, meta))
+
+    return empreinte, os.path.join(dossier, meta['fichier'])
+
+
+def charger_donnees(chemin, colonne_montant, schema=None):
+    """
+    Charge un classeur Excel en passant par le cache colonnaire.
+    La version des données (empreinte) est exposée dans df.attrs['version'].
+    """
+    empreinte, chemin_feather = preparer_cache(chemin, colonne_montant, schema)
+    df = feather.read_table(chemin_feather, memory_map=True).to_pandas()
+    df.attrs['version'] = empreinte
+    return df
+
+
+def version_apres_lot(version, lot):
+    """Version des données après l'ajout d'un lot (dérivée du contenu du lot)"""
+    sha = hashlib.sha1(str(version).encode('utf-8'))
+    sha.update(pd.util.hash_pandas_object(lot, index=False).to_numpy().tobytes())
+    return sha.hexdigest()
+
+
+class JournalLots:
+    """
+    Lots de transactions ajoutés à une version d'un classeur, partagés par
+    les processus : un fichier Feather par lot, numérotés sans trou
+    (000001.feather, 000002.feather, ...) dans un dossier du cache
+    colonnaire propre à l'empreinte du classeur. Un numéro est réservé par
+    création d'un lien physique (os.link échoue si le fichier existe) : un
+    lot n'apparaît que complet, et le lot n n'existe qu'après le lot n - 1.
+    """
+
+    def __init__(self, chemin, empreinte):
+        dossier = os.path.join(os.path.dirname(os.path.abspath(chemin)), DOSSIER_CACHE)
+        nom = os.path.splitext(os.path.basename(chemin))[0]
+        self.dossier = os.path.join(dossier, f'{nom}-{empreinte[:16]}.lots')
+        os.makedirs(self.dossier, exist_ok=True)
+        # Journaux des versions précédentes du classeur (qui fait foi)
+        for ancien in os.listdir(dossier):
+            if ancien.startswith(f'{nom}-') and ancien.endswith('.lots') \
+                    and ancien != os.path.basename(self.dossier):
+                shutil.rmtree(os.path.join(dossier, ancien), ignore_errors=True)
+
+    def _chemin(self, numero):
+        return os.path.join(self.dossier, f'{numero:06d}.feather')
+
+    def ecrire(self, lot):
+        """Ajoute un lot au journal ; renvoie son numéro"""
+        temporaire = os.path.join(self.dossier, f'.{os.getpid()}-{threading.get_ident()}.tmp')
+        feather.write_feather(lot, temporaire, compression='uncompressed')
+        try:
+            # Lots numérotés sans trou : leur nombre + 1 est le premier numéro libre
+            # (au pire déjà pris entre-temps, on essaie alors le suivant)
+            numero = sum(nom.endswith('.feather') for nom in os.listdir(self.dossier)) + 1
+            while True:
+                try:
+                    os.link(temporaire, self._chemin(numero))
+                    return numero
+                except FileExistsError:
+                    numero += 1
+        finally:
+            os.remove(temporaire)
+
+    def lire(self, apres=0):
+        """Lots de numéro supérieur à apres, dans l'ordre"""
+        lots = []
+        numero = apres + 1
+        while os.path.exists(self._chemin(numero)):
+            lots.append(feather.read_feather(self._chemin(numero)))
+            numero += 1
+        return lots
+
+
+def normaliser_lot(lot):
+    """Lot tel que relu du journal (types Arrow) : mêmes données dans tous les processus"""
+    return pa.Table.from_pandas(lot, preserve_index=False).to_pandas()
+
+
+class SourceDonnees:
+    """
+    Données préparées à partir d'un classeur, rechargées quand il change.
+
+    preparer(df) construit les structures utilisées par le dashboard. La
+    date de modification du classeur est vérifiée au plus toutes les
+    `intervalle` secondes ; en cas de nouveau contenu, les structures sont
+    reconstruites, la version change et sur_changement() est appelée.
+    charger(chemin, colonne_montant) lit les données (charger_donnees par
+    défaut, ou moteur.memoire_partagee.charger_partage).
+
+    integrer(structures, lot), si fournie, permet d'ajouter des transactions
+    sans relire le classeur (voir ajouter_transactions), après validation
+    par schema (moteur.schema) s'il est donné ; les lots sont alors journalisés sur disque (JournalLots) et intégrés par chaque
+    processus à la vérification suivante, puis sur_changement() est
+    appelée (versions précédentes des caches libérées). Avec taille_bloc,
+    le fichier est lu par blocs (moteur.lecture_flux) : preparer() reçoit le
+    premier bloc et integrer() les suivants, sans DataFrame complet en
+    mémoire (charger n'est alors pas utilisé).
+    """
+
+    def __init__(self, chemin, colonne_montant, preparer, intervalle=2.0, sur_changement=None,
+                 charger=charger_donnees, integrer=None, taille_bloc=None, schema=None):
+        if taille_bloc and integrer is None:
+            raise ValueError("La lecture par blocs nécessite une fonction integrer")
+        self.chemin = chemin
+        self.colonne_montant = colonne_montant
+        self.preparer = preparer
+        self.charger = charger
+        self.integrer = integrer
+        self.schema = schema
+        self.taille_bloc = taille_bloc
+        self.intervalle = intervalle
+        self.sur_changement = sur_changement
+        self._verrou = threading.Lock()
+        self._courant = None  # (version, structures préparées)
+        self._empreinte = None  # empreinte du classeur chargé
+        self._journal = None  # lots ajoutés à ce classeur
+        self._nb_lots = 0  # lots du journal intégrés
+        self._signature = None
+        self._derniere_verification = 0.0
+
+    @property
+    def version(self):
+        """Version (empreinte) des données actuellement servies"""
+        return self._courant[0] if self._courant else None
+
+    def _lire(self):
+        """Empreinte du fichier et fonction construisant les structures"""
+        if self.taille_bloc:
+            from moteur.lecture_flux import agreger_par_blocs, lire_par_blocs
+
+            def construire():
+                print(f"🧱 Lecture de {os.path.basename(self.chemin)} par blocs "
+                      f"de {self.taille_bloc:,} lignes...")
+                blocs = lire_par_blocs(self.chemin, self.colonne_montant, self.taille_bloc)
+                return agreger_par_blocs(blocs, self.preparer, self.integrer)
+            return empreinte_fichier(self.chemin), construire
+        df = self.charger(self.chemin, self.colonne_montant)
+        return df.attrs['version'], lambda: self.preparer(df)
+
+    def obtenir(self):
+        """Renvoie le couple (version, structures préparées)"""
+        courant = self._courant
+        if courant is not None and time.monotonic() - self._derniere_verification < self.intervalle:
+            return courant
+
+        with self._verrou:
+            self._derniere_verification = time.monotonic()
+            stat = os.stat(self.chemin)
+            signature = (stat.st_mtime_ns, stat.st_size)
+            premier_chargement = self._courant is None
+            change = False
+            if self._courant is None or signature != self._signature:
+                empreinte, construire = self._lire()
+                if self._courant is None or empreinte != self._empreinte:
+                    self._empreinte = empreinte
+                    self._courant = (empreinte, construire())
+                    if self.integrer is not None:
+                        self._journal = JournalLots(self.chemin, empreinte)
+                        self._nb_lots = 0
+                    change = True
+                self._signature = signature
+            change = self._synchroniser() or change
+            if change and not premier_chargement and self.sur_changement is not None:
+                self.sur_changement()
+            return self._courant
+
+    def _synchroniser(self):
+        """Intègre les lots du journal écrits depuis la dernière vérification (sous verrou)"""
+        if self._journal is None:
+            return False
+        lots = self._journal.lire(self._nb_lots)
+        if not lots:
+            return False
+        version, structures = self._courant
+        for lot in lots:
+            version, structures = version_apres_lot(version, lot), self.integrer(structures, lot)
+        self._courant = (version, structures)
+        self._nb_lots += len(lots)
+        return True
+
+    def ajouter_transactions(self, lot):
+        """
+        Intègre un lot de nouvelles transactions (DataFrame ou liste de
+        dictionnaires) aux structures courantes, en O(taille du lot).
+
+        Le lot est nettoyé comme le classeur et validé (colonnes et types
+        du schéma) avant toute intégration, puis intégré une seule fois :
+        un lot invalide lève une exception sans être écrit ni publié. Il
+        est ensuite écrit au journal : ce processus publie aussitôt la
+        version intégrée, les autres workers l'intègrent à leur vérification
+        suivante (au plus `intervalle` secondes), et tous en tirent la même
+        version (chaînée sur le contenu des lots). Un nouveau contenu du
+        classeur remplace les lots, celui-ci faisant foi.
+        """
+        if self.integrer is None:
+            raise ValueError("Cette source n'accepte pas d'ajout de transactions")
+        lot = pd.DataFrame(lot)
+        if lot.empty:
+            return self.obtenir()[0]
+        lot = normaliser_lot(preparer_donnees(lot.copy(), self.colonne_montant))
+        if self.schema is not None:
+            valider(lot, self.schema, 'le lot')
+        self.obtenir()
+        with self._verrou:
+            self._synchroniser()
+            version, structures = self._courant
+            structures = self.integrer(structures, lot)
+            numero = self._journal.ecrire(lot)
+            if numero == self._nb_lots + 1:
+                self._courant = (version_apres_lot(version, lot), structures)
+                self._nb_lots = numero
+            else:
+                # Lots d'autres workers écrits entre-temps : intégrés dans l'ordre du journal
+                self._synchroniser()
+            if self.sur_changement is not None:
+                self.sur_changement()
+            return self._courant[0]
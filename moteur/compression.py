@@ -0,0 +1,91 @@
+"""
+Compression des réponses HTTP (brotli ou gzip)
+Les réponses textuelles (JSON des callbacks et du layout, scripts et
+feuilles de style) sont compressées quand le client l'accepte
+(Accept-Encoding) et qu'elles dépassent une taille minimale : en brotli si
+le module brotli est installé et que le client l'accepte (navigateurs en
+HTTPS ou sur localhost), sinon en gzip. Les ressources statiques versionnées
+(en-tête ETag : bundles JavaScript de Dash et Plotly) ne sont compressées
+qu'une fois par processus et par encodage.
+
+DASHBOARD_COMPRESSION choisit les encodages : auto (défaut : brotli puis
+gzip), gzip, br ou aucune.
+"""
+
+import gzip
+import os
+import threading
+
+import flask
+
+try:
+    import brotli  # dépendance optionnelle
+except ImportError:
+    brotli = None
+
+TYPES_COMPRESSIBLES = ('application/json', 'application/javascript', 'text/')
+TAILLE_MIN = 500
+
+# Qualité brotli (0 à 11) : 5 compresse mieux que gzip -6 pour un coût voisin
+QUALITE_BROTLI = 5
+
+
+def _accepte(encodage):
+    """Le client accepte-t-il l'encodage (q=0 : refusé) ?"""
+    for element in flask.request.headers.get('Accept-Encoding', '').split(','):
+        nom, _, parametres = element.strip().partition(';')
+        if nom.strip().lower() == encodage:
+            return parametres.replace(' ', '') not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000')
+    return False
+
+
+def compresseurs(mode=None, niveau=6):
+    """
+    Encodages disponibles pour le mode, par ordre de préférence :
+    liste de (nom Content-Encoding, fonction de compression)
+    """
+    mode = mode or os.environ.get('DASHBOARD_COMPRESSION') or 'auto'
+    disponibles = []
+    if mode in ('auto', 'br') and brotli is not None:
+        disponibles.append(('br', lambda corps: brotli.compress(corps, quality=QUALITE_BROTLI)))
+    if mode in ('auto', 'gzip'):
+        disponibles.append(('gzip', lambda corps: gzip.compress(corps, niveau)))
+    return disponibles
+
+
+def installer_compression(server, niveau=6, taille_min=TAILLE_MIN, mode=None):
+    """Compresse les réponses compressibles du serveur Flask (sans effet en mode aucune)"""
+    encodages = compresseurs(mode, niveau)
+    if not encodages:
+        return
+    statiques = {}  # (chemin, ETag, encodage) -> corps compressé
+    verrou = threading.Lock()
+
+    @server.after_request
+    def compresser(reponse):
+        if (reponse.direct_passthrough or not 200 <= reponse.status_code < 300
+                or 'Content-Encoding' in reponse.headers
+                or not (reponse.mimetype or '').startswith(TYPES_COMPRESSIBLES)):
+            return reponse
+        reponse.vary.add('Accept-Encoding')
+        encodage = next(((nom, fonction) for nom, fonction in encodages if _accepte(nom)), None)
+        if encodage is None:
+            return reponse
+        nom, fonction = encodage
+        corps = reponse.get_data()
+        if len(corps) < taille_min:
+            return reponse
+        etag = reponse.headers.get('ETag')
+        if etag:
+            cle = (flask.request.path, etag, nom)
+            with verrou:
+                compresse = statiques.get(cle)
+            if compresse is None:
+                compresse = fonction(corps)
+                with verrou:
+                    statiques[cle] = compresse
+        else:
+            compresse = fonction(corps)
+        reponse.set_data(compresse)
+        reponse.headers['Content-Encoding'] = nom
+        return reponse
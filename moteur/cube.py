@@ -0,0 +1,314 @@
+"""
+Cube OLAP pré-agrégé pour le dashboard de l'exercice 2
+Grain : jour × magasin × catégorie × mode de paiement. Les sections du
+dashboard sont calculées en agrégeant les cellules du cube retenues par
+les filtres : le coût dépend du nombre de valeurs distinctes des
+dimensions, plus du nombre de transactions.
+"""
+
+import copy
+import threading
+
+import numpy as np
+import pandas as pd
+
+from moteur.instrumentation import etape
+
+
+def ordinaux_jours(dates):
+    """Jour de chaque date en int32 : nombre de jours depuis le 1970-01-01"""
+    return np.asarray(dates).astype('datetime64[D]').astype(np.int32)
+
+
+def indexer_jours(ordinaux):
+    """
+    Axe des jours présents (datetime64[D]) et code de chaque ligne sur cet
+    axe, par comptage sur la plage des ordinaux (bincount) plutôt que par tri
+    """
+    if len(ordinaux) == 0:
+        return np.empty(0, dtype='datetime64[D]'), np.empty(0, dtype=np.int64)
+    premier = int(ordinaux.min())
+    decales = ordinaux.astype(np.int64) - premier
+    presents = np.bincount(decales) > 0
+    rang = np.cumsum(presents) - 1
+    jours = (np.flatnonzero(presents) + premier).astype('datetime64[D]')
+    return jours, rang[decales]
+
+
+def _ratio(numerateur, denominateur):
+    """Division élément par élément (NaN quand le dénominateur est nul)"""
+    numerateur = np.asarray(numerateur, dtype=float)
+    denominateur = np.asarray(denominateur, dtype=float)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(denominateur > 0, numerateur / denominateur, np.nan)
+
+
+class CubeVentes:
+    """Cube des ventes construit à partir d'un MoteurFiltres"""
+
+    def __init__(self, moteur, colonne_montant='Montant', colonne_quantite='Quantite',
+                 colonne_satisfaction='Satisfaction_Client'):
+        df = moteur.df
+        self.colonne_montant = colonne_montant
+        self.colonne_quantite = colonne_quantite
+        self.colonne_satisfaction = colonne_satisfaction
+        self.dimensions = list(moteur.codes)
+        self.valeurs = {'Jour': None, **{d: moteur.valeurs[d] for d in self.dimensions}}
+
+        # Axe des jours, à partir des ordinaux int32 des dates ; comme un
+        # groupby (dropna=True), les lignes sans date ou sans valeur de
+        # dimension (code -1) sont ignorées
+        dates, codes = moteur.dates, [moteur.codes[d] for d in self.dimensions]
+        retenues = ~np.isnat(dates)
+        for code in codes:
+            retenues &= code >= 0
+        if not retenues.all():
+            df, dates, codes = df[retenues], dates[retenues], [c[retenues] for c in codes]
+        self.jours, code_jour = indexer_jours(ordinaux_jours(dates))
+        self.valeurs['Jour'] = self.jours
+        self.forme = (len(self.jours),) + tuple(len(moteur.valeurs[d]) for d in self.dimensions)
+
+        # Numéro de cellule de chaque ligne
+        cellule = self._cellules([code_jour] + codes)
+        nb_cellules = int(np.prod(self.forme))
+
+        # Mesures additives de chaque cellule (comptes entiers, sommes en flottant)
+        entiers = pd.api.types.is_integer_dtype(df[colonne_quantite])
+        poids, satisfaction, satisfaction_ok = self._poids_lignes(df, quantite_entiere=entiers)
+        self.mesures = {}
+        for mesure, valeurs in poids.items():
+            cellules = np.bincount(cellule, weights=valeurs, minlength=nb_cellules)
+            if valeurs.dtype.kind == 'i':
+                cellules = np.rint(cellules).astype(np.int64)
+            self.mesures[mesure] = cellules.reshape(self.forme)
+
+        # Histogramme des scores de satisfaction (dernier axe : score)
+        self.scores, code_score = np.unique(satisfaction[satisfaction_ok], return_inverse=True)
+        if np.array_equal(self.scores, np.round(self.scores)):
+            self.scores = self.scores.astype(np.int64)
+        self.histogramme = np.bincount(
+            cellule[satisfaction_ok] * len(self.scores) + code_score,
+            minlength=nb_cellules * len(self.scores)
+        ).reshape(self.forme + (len(self.scores),))
+
+    def _cellules(self, codes):
+        """Numéro de cellule à partir des codes de chaque axe (jour en premier)"""
+        cellule = np.asarray(codes[0], dtype=np.int64)
+        for code, taille in zip(codes[1:], self.forme[1:]):
+            cellule = cellule * taille + code
+        return cellule
+
+    def _poids_lignes(self, df, quantite_entiere):
+        """Contribution de chaque ligne aux mesures, et scores de satisfaction"""
+        montant = df[self.colonne_montant].to_numpy(dtype=float)
+        satisfaction = df[self.colonne_satisfaction].to_numpy(dtype=float)
+        montant_ok = ~np.isnan(montant)
+        satisfaction_ok = ~np.isnan(satisfaction)
+        montant_0 = np.where(montant_ok, montant, 0.0)
+        quantite = np.nan_to_num(df[self.colonne_quantite].to_numpy(dtype=float))
+        if quantite_entiere:
+            quantite = np.rint(quantite).astype(np.int64)
+        poids = {
+            'n_lignes': np.ones(len(df), dtype=np.int64),
+            'n_montant': montant_ok.astype(np.int64),
+            'montant': montant_0,
+            'montant_carre': montant_0 ** 2,
+            'quantite': quantite,
+            'n_satisfaction': satisfaction_ok.astype(np.int64),
+            'satisfaction': np.where(satisfaction_ok, satisfaction, 0.0),
+        }
+        return poids, satisfaction, satisfaction_ok
+
+    def ajouter(self, lot, colonne_date='Date_Transaction'):
+        """
+        Nouveau cube incluant un lot de transactions, en O(lot + cellules) ;
+        le cube courant n'est pas modifié (les sélections en cours restent
+        cohérentes). Les nouveaux jours sont insérés dans l'ordre, les
+        nouvelles valeurs de dimension et de score ajoutées en fin d'axe.
+        Comme un groupby, les lignes sans date ou sans valeur de dimension
+        sont ignorées.
+        """
+        lot = lot.dropna(subset=[colonne_date] + self.dimensions)
+        nouveau = copy.copy(self)
+
+        # Axes étendus et position des anciennes valeurs sur ces axes
+        jours_lot = lot[colonne_date].to_numpy().astype('datetime64[D]')
+        nouveau.jours = np.union1d(self.jours, jours_lot)
+        nouveau.valeurs = {'Jour': nouveau.jours}
+        positions = [np.searchsorted(nouveau.jours, self.jours)]
+        codes = [np.searchsorted(nouveau.jours, jours_lot)]
+        for dimension in self.dimensions:
+            valeurs_lot = lot[dimension].to_numpy(dtype=object)
+            connues = set(self.valeurs[dimension])
+            valeurs = self.valeurs[dimension] + [v for v in pd.unique(valeurs_lot) if v not in connues]
+            nouveau.valeurs[dimension] = valeurs
+            positions.append(np.arange(len(self.valeurs[dimension])))
+            codes.append(pd.Index(valeurs).get_indexer(valeurs_lot))
+        nouveau.forme = tuple(len(v) for v in nouveau.valeurs.values())
+
+        poids, satisfaction, satisfaction_ok = self._poids_lignes(
+            lot, quantite_entiere=self.mesures['quantite'].dtype.kind == 'i')
+        cellule = nouveau._cellules(codes)
+        nouveau.mesures = {}
+        for mesure, cellules in self.mesures.items():
+            etendu = np.zeros(nouveau.forme, dtype=cellules.dtype)
+            etendu[np.ix_(*positions)] = cellules
+            np.add.at(etendu.reshape(-1), cellule, poids[mesure])
+            nouveau.mesures[mesure] = etendu
+
+        scores_lot = satisfaction[satisfaction_ok]
+        if self.scores.dtype.kind == 'i' and np.array_equal(scores_lot, np.round(scores_lot)):
+            scores_lot = scores_lot.astype(np.int64)
+        nouveau.scores = np.union1d(self.scores, scores_lot)
+        etendu = np.zeros(nouveau.forme + (len(nouveau.scores),), dtype=self.histogramme.dtype)
+        etendu[np.ix_(*positions, np.searchsorted(nouveau.scores, self.scores))] = self.histogramme
+        code_score = np.searchsorted(nouveau.scores, scores_lot)
+        np.add.at(etendu.reshape(-1), cellule[satisfaction_ok] * len(nouveau.scores) + code_score, 1)
+        nouveau.histogramme = etendu
+        return nouveau
+
+    def selection(self, filtres, debut=None, fin=None):
+        """
+        Sous-cube retenu par les filtres (granularité jour).
+
+        filtres associe une dimension à une valeur ('ALL' ou None : pas de
+        filtre) ; la période [debut, fin] retient les jours entièrement
+        compris entre les deux bornes.
+        """
+        lo, hi = 0, len(self.jours)
+        if debut is not None:
+            premier = pd.Timestamp(debut).ceil('D').to_datetime64().astype('datetime64[D]')
+            lo = int(np.searchsorted(self.jours, premier, side='left'))
+        if fin is not None:
+            dernier = pd.Timestamp(fin).floor('D').to_datetime64().astype('datetime64[D]')
+            hi = max(lo, int(np.searchsorted(self.jours, dernier, side='right')))
+
+        tranches = [slice(lo, hi)]
+        valeurs = {'Jour': self.jours[lo:hi]}
+        for dimension in self.dimensions:
+            valeur = filtres.get(dimension)
+            if valeur is None or valeur == 'ALL':
+                tranches.append(slice(None))
+                valeurs[dimension] = self.valeurs[dimension]
+            elif valeur in self.valeurs[dimension]:
+                k = self.valeurs[dimension].index(valeur)
+                tranches.append(slice(k, k + 1))
+                valeurs[dimension] = [valeur]
+            else:
+                tranches.append(slice(0, 0))
+                valeurs[dimension] = []
+
+        tranches = tuple(tranches)
+        return SelectionCube(
+            {mesure: cellules[tranches] for mesure, cellules in self.mesures.items()},
+            self.histogramme[tranches],
+            self.scores,
+            valeurs,
+        )
+
+
+class SelectionCube:
+    """
+    Cellules du cube retenues par les filtres, prêtes à être agrégées.
+
+    Agrégation fusionnée : les mesures sont sommées une seule fois sur
+    l'axe des jours (seule passe sur toutes les cellules retenues) ; les
+    totaux et les tableaux par dimension ou croisement sont ensuite des
+    réductions de ce petit cube, et chaque tableau est mémorisé pour la
+    sélection, partagée par les sections du dashboard.
+    """
+
+    def __init__(self, mesures, histogramme, scores, valeurs):
+        self.mesures = mesures
+        self.histogramme = histogramme
+        self.scores = scores
+        self.valeurs = valeurs
+        self.axes = list(valeurs)
+        self._initialiser_memo()
+
+    def _initialiser_memo(self):
+        self._verrou = threading.Lock()
+        self._hors_jours = None
+        self._tableaux = {}
+
+    def __getstate__(self):
+        # Les résultats mémorisés ne sont pas stockés dans les caches partagés
+        etat = self.__dict__.copy()
+        for attribut in ('_verrou', '_hors_jours', '_tableaux'):
+            etat.pop(attribut, None)
+        return etat
+
+    def __setstate__(self, etat):
+        self.__dict__.update(etat)
+        self._initialiser_memo()
+
+    def hors_jours(self):
+        """Mesures sommées sur l'axe des jours (calculées une fois)"""
+        with self._verrou:
+            if self._hors_jours is None:
+                with etape('cube', 'hors_jours'):
+                    self._hors_jours = {mesure: cellules.sum(axis=0)
+                                        for mesure, cellules in self.mesures.items()}
+            return self._hors_jours
+
+    def _reduire(self, mesure, dimensions):
+        """Somme une mesure sur les axes absents de dimensions"""
+        if 'Jour' in dimensions:
+            cellules, axes = self.mesures[mesure], self.axes
+        else:
+            cellules, axes = self.hors_jours()[mesure], self.axes[1:]
+        return cellules.sum(axis=tuple(i for i, axe in enumerate(axes) if axe not in dimensions))
+
+    def totaux(self):
+        """KPI globaux de la sélection"""
+        t = {mesure: cellules.sum() for mesure, cellules in self.hors_jours().items()}
+        return {
+            'total_ventes': t['montant'],
+            'nb_transactions': int(t['n_lignes']),
+            'montant_moyen': float(_ratio(t['montant'], t['n_montant'])),
+            'satisfaction_moyenne': float(_ratio(t['satisfaction'], t['n_satisfaction'])),
+        }
+
+    def tableau(self, dimensions):
+        """
+        Agrégats par combinaison des dimensions demandées (équivalent d'un
+        groupby : seules les combinaisons contenant des lignes sont gardées).
+        Le tableau est calculé une fois par sélection ; une copie est renvoyée.
+        """
+        dimensions = tuple(axe for axe in self.axes if axe in dimensions)
+        resultat = self._tableaux.get(dimensions)
+        if resultat is None:
+            with etape('cube', 'tableau:' + '+'.join(dimensions)):
+                resultat = self._tableaux.setdefault(dimensions, self._calculer_tableau(dimensions))
+        return resultat.copy()
+
+    def _calculer_tableau(self, dimensions):
+        sommes = {mesure: self._reduire(mesure, dimensions).ravel() for mesure in self.mesures}
+        presents = np.flatnonzero(sommes['n_lignes'] > 0)
+        # Valeurs des dimensions pour les seules combinaisons présentes
+        positions = np.unravel_index(presents, [len(self.valeurs[d]) for d in dimensions])
+        colonnes = {d: pd.Index(self.valeurs[d]).take(p) for d, p in zip(dimensions, positions)}
+        colonnes.update({mesure: valeurs[presents] for mesure, valeurs in sommes.items()})
+        n, somme = colonnes['n_montant'], colonnes['montant']
+        colonnes['montant_moyen'] = _ratio(somme, n)
+        # Écart-type (échantillon) à partir de la somme et de la somme des carrés
+        variance = _ratio(colonnes['montant_carre'] - somme * colonnes['montant_moyen'], n - 1)
+        colonnes['ecart_type'] = np.sqrt(np.maximum(variance, 0))
+        colonnes['satisfaction_moyenne'] = _ratio(colonnes['satisfaction'], colonnes['n_satisfaction'])
+        return pd.DataFrame(colonnes)
+
+    def par_jour(self, mesure):
+        """
+        Mesure sommée par jour, pour les jours contenant des lignes : les
+        cellules sont réduites directement sur l'axe des jours (premier axe),
+        sans l'index ni le DataFrame de tableau()
+        """
+        autres = tuple(range(1, len(self.axes)))
+        presents = self.mesures['n_lignes'].sum(axis=autres) > 0
+        return self.valeurs['Jour'][presents], self.mesures[mesure].sum(axis=autres)[presents]
+
+    def distribution_satisfaction(self):
+        """Nombre de transactions par score de satisfaction (scores présents)"""
+        comptes = self.histogramme.reshape(-1, len(self.scores)).sum(axis=0)
+        presents = comptes > 0
+        return pd.Series(comptes[presents], index=self.scores[presents])
@@ -0,0 +1,193 @@
+"""
+Gabarits de figures et mises à jour partielles (dash.Patch)
+La partie statique de chaque figure (mise en page, thème, titres, polices,
+échelles de couleurs, style des traces) est construite une fois par un
+gabarit, avec le même code Plotly qu'une figure complète mais sur des
+données vides. Les callbacks ne produisent ensuite que les traces (style du
+gabarit + données) : la figure affichée les reçoit par un dash.Patch qui
+remplace sa liste de traces, sans renvoyer la mise en page.
+
+Les sorties mises en cache sont les données des traces (JSON simple) ; le
+Patch est reconstruit à chaque réponse par en_sortie().
+
+Les données des traces sont compactées (compacter) : nombres arrondis à la
+précision affichée, et longs tableaux numériques des axes envoyés en
+tableaux typés de plotly.js ({'dtype', 'bdata'} : binaire en base64, entiers
+sur 1 à 4 octets, flottants sur 4 octets quand l'arrondi le permet) s'ils
+sont plus courts que leur texte, avant et après compression. DASHBOARD_FIGURES_COMPACTES=0 désactive la
+compaction.
+"""
+
+import base64
+import copy
+import json
+import os
+import threading
+import zlib
+
+import numpy as np
+import pandas as pd
+from dash import Patch
+
+# Clé marquant, dans une sortie de section, des données de traces
+CLE_TRACES = 'traces_gabarit'
+
+FIGURES_COMPACTES = os.environ.get('DASHBOARD_FIGURES_COMPACTES', '1') != '0'
+
+# Précision des valeurs des traces (montants au centime, moyennes à 2 décimales)
+DECIMALES = 2
+
+# Attributs « data_array » de plotly.js acceptant les tableaux typés, et
+# taille à partir de laquelle un tableau typé est envisagé
+ATTRIBUTS_TYPES = frozenset({'x', 'y', 'z', 'values'})
+TAILLE_MIN_TYPEE = 16
+
+TYPES_ENTIERS = [('u1', np.uint8), ('i1', np.int8), ('u2', np.uint16),
+                 ('i2', np.int16), ('u4', np.uint32), ('i4', np.int32)]
+
+
+class Gabarit:
+    """Figure statique d'un gabarit et style de chacune de ses traces"""
+
+    def __init__(self, figure):
+        self.figure = figure
+        self.styles = [trace.to_plotly_json() for trace in figure.data]
+        self.noms = [style.get('name') for style in self.styles]
+
+    def trace(self, indice=0, **donnees):
+        """
+        Trace indice du gabarit complétée par ses données ; un nom
+        composé désigne un attribut imbriqué (marker_color : marker.color)
+        """
+        trace = copy.deepcopy(self.styles[indice])
+        for attribut, valeur in donnees.items():
+            *chemin, dernier = attribut.split('_')
+            cible = trace
+            for cle in chemin:
+                cible = cible.setdefault(cle, {})
+            cible[dernier] = valeur
+        return trace
+
+    def trace_nommee(self, nom, **donnees):
+        """Trace du gabarit portant ce nom (ex. une catégorie de la légende)"""
+        return self.trace(self.noms.index(nom), **donnees)
+
+
+class RegistreGabarits:
+    """
+    Constructeurs de figures enregistrés par nom ; chaque gabarit est
+    construit une fois par jeu de paramètres (ex. liste des catégories)
+    """
+
+    def __init__(self):
+        self._constructeurs = {}
+        self._gabarits = {}
+        self._verrou = threading.Lock()
+
+    def enregistrer(self, nom):
+        """Décorateur : constructeur(*parametres) renvoyant la figure statique"""
+        def decorateur(constructeur):
+            self._constructeurs[nom] = constructeur
+            return constructeur
+        return decorateur
+
+    def gabarit(self, nom, *parametres):
+        """Gabarit nom pour ces paramètres (construit au premier appel)"""
+        cle = (nom,) + parametres
+        with self._verrou:
+            if cle not in self._gabarits:
+                self._gabarits[cle] = Gabarit(self._constructeurs[nom](*parametres))
+            return self._gabarits[cle]
+
+    def figure(self, nom, *parametres):
+        """Figure statique du gabarit (figure initiale du layout)"""
+        return self.gabarit(nom, *parametres).figure
+
+
+def _tableau_numerique(valeur):
+    """Tableau NumPy d'une séquence de nombres (None pour tout autre valeur)"""
+    if isinstance(valeur, (list, tuple, np.ndarray, pd.Series, pd.Index)):
+        tableau = np.asarray(valeur)
+        if tableau.dtype.kind in 'iuf' and tableau.size:
+            return tableau
+    return None
+
+
+def tableau_type(valeurs, decimales=DECIMALES):
+    """
+    Tableau typé plotly.js des valeurs (1 dimension, déjà arrondies), ou
+    None s'il ne serait pas plus court que le texte JSON, tel quel et
+    compressé (le binaire en base64 se compresse moins bien que le texte)
+    """
+    if valeurs.ndim != 1 or len(valeurs) < TAILLE_MIN_TYPEE:
+        return None
+    if valeurs.dtype.kind in 'iu':
+        mini, maxi = valeurs.min(), valeurs.max()
+        codes = [(code, type_) for code, type_ in TYPES_ENTIERS
+                 if np.iinfo(type_).min <= mini and maxi <= np.iinfo(type_).max]
+        if not codes:
+            return None
+        code, type_ = codes[0]
+    else:
+        simples = valeurs.astype(np.float32)
+        ecarts = np.abs(simples - valeurs)
+        if np.all((ecarts <= 0.5 * 10 ** -decimales) | np.isnan(valeurs)):
+            code, type_ = 'f4', np.float32
+        else:
+            code, type_ = 'f8', np.float64
+    binaire = valeurs.astype(np.dtype(type_).newbyteorder('<')).tobytes()
+    bdata = base64.b64encode(binaire).decode('ascii')
+    texte = json.dumps([None if v != v else v for v in valeurs.tolist()])
+    if len(bdata) + len(code) + 24 >= len(texte):
+        return None
+    if len(zlib.compress(bdata.encode('ascii'))) >= len(zlib.compress(texte.encode('ascii'))):
+        return None
+    return {'dtype': code, 'bdata': bdata}
+
+
+def compacter(valeur, cle=None, decimales=DECIMALES):
+    """
+    Données d'une trace (dictionnaire) compactées : flottants arrondis à
+    decimales, entiers écrits sans décimale, tableaux typés pour les
+    attributs d'axes quand ils sont plus courts
+    """
+    if isinstance(valeur, dict):
+        return {nom: compacter(v, nom, decimales) for nom, v in valeur.items()}
+    tableau = _tableau_numerique(valeur)
+    if tableau is None:
+        if isinstance(valeur, float):
+            return round(valeur, decimales)
+        if isinstance(valeur, (list, tuple)):
+            return [compacter(v, None, decimales) for v in valeur]
+        return valeur
+    if tableau.dtype.kind == 'f':
+        tableau = np.round(tableau, decimales)
+        if np.isfinite(tableau).all() and (tableau == np.trunc(tableau)).all():
+            tableau = tableau.astype(np.int64)
+    if cle in ATTRIBUTS_TYPES:
+        return tableau_type(tableau, decimales) or tableau
+    return tableau
+
+
+def figure_compacte(figure):
+    """Figure complète (layout d'une page) aux traces compactées"""
+    if not FIGURES_COMPACTES:
+        return figure
+    return {'data': [compacter(trace.to_plotly_json()) for trace in figure.data],
+            'layout': figure.layout.to_plotly_json()}
+
+
+def donnees_traces(traces):
+    """Sortie de section pour une figure : ses traces, envoyées par un Patch"""
+    if not FIGURES_COMPACTES:
+        return {CLE_TRACES: list(traces)}
+    return {CLE_TRACES: [compacter(trace) for trace in traces]}
+
+
+def en_sortie(valeur):
+    """Convertit les données de traces (issues du cache) en dash.Patch"""
+    if isinstance(valeur, dict) and CLE_TRACES in valeur:
+        patch = Patch()
+        patch['data'] = valeur[CLE_TRACES]
+        return patch
+    return valeur
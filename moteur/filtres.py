@@ -0,0 +1,339 @@
+"""
+Moteur de filtrage pré-indexé
+Les lignes sont triées une fois par date (le filtre de période devient une
+tranche obtenue par searchsorted) et chaque dimension est codée en entiers,
+avec la liste triée des positions de lignes pour chaque valeur. Les
+permutations de tri des colonnes (tableaux paginés côté serveur) sont
+calculées une fois, à la première demande. Les lignes ajoutées par lots
+forment un segment secondaire (MoteurFiltresAjouts), fusionné à l'index
+principal en arrière-plan.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from moteur.schema import codes_categories
+
+# Lignes ajoutées au-delà desquelles l'index principal est reconstruit (fusion
+# des deux segments) dans un thread, hors du chemin des requêtes
+LIGNES_AVANT_FUSION = 50_000
+
+
+def _concatener(ancienne, nouvelle):
+    """
+    Colonne de l'index suivie de celle d'un lot ; une colonne catégorielle
+    le reste, catégories triées étendues aux nouvelles valeurs
+    """
+    if isinstance(ancienne.dtype, pd.CategoricalDtype):
+        try:
+            nouvelle = nouvelle.astype(ancienne.cat.categories.dtype)
+        except (TypeError, ValueError):
+            pass
+        try:
+            return pd.Series(union_categoricals(
+                [ancienne.array, pd.Categorical(nouvelle)], sort_categories=True), name=ancienne.name)
+        except TypeError:  # types de valeurs incompatibles : colonne objet
+            ancienne = ancienne.astype(object)
+    return pd.concat([ancienne, nouvelle], ignore_index=True)
+
+
+class MoteurFiltres:
+    """Index de filtrage sur un DataFrame de transactions"""
+
+    def __init__(self, df, dimensions, colonne_date='Date_Transaction'):
+        # Tri unique des lignes par date : df est conservé dans cet ordre
+        # (aucune copie si les lignes sont déjà triées, ex. mémoire partagée)
+        dates = df[colonne_date].to_numpy()
+        if len(dates) and not (dates[1:] >= dates[:-1]).all():
+            ordre = np.argsort(dates, kind='stable')
+            df = df.take(ordre).reset_index(drop=True)
+        self.df = df
+        self.colonne_date = colonne_date
+        self.dates = df[colonne_date].to_numpy()
+        self._permutations = {}
+        self._rangs = {}
+        self._verrou = threading.Lock()
+
+        self.valeurs = {}
+        self.codes = {}
+        self.postings = {}
+        for dimension in dimensions:
+            # Codes catégoriels déjà disponibles (schéma), sinon factorisation
+            codes, valeurs = codes_categories(df[dimension])
+            # Positions de lignes groupées par code (triées grâce au tri stable)
+            ordre_codes = np.argsort(codes, kind='stable')
+            bornes = np.searchsorted(codes[ordre_codes], np.arange(len(valeurs) + 1))
+            self.codes[dimension] = codes
+            self.valeurs[dimension] = list(valeurs)
+            self.postings[dimension] = {
+                valeur: ordre_codes[bornes[k]:bornes[k + 1]]
+                for k, valeur in enumerate(valeurs)
+            }
+
+    @property
+    def nb_lignes(self):
+        return len(self.dates)
+
+    @property
+    def colonnes(self):
+        return list(self.df.columns)
+
+    def courant(self):
+        """Index à utiliser pour une requête (voir MoteurFiltresAjouts.courant)"""
+        return self
+
+    def segments(self, indices):
+        """(segment, masque sur indices, positions dans le segment) de chaque segment"""
+        yield self, slice(None), indices
+
+    def tranche_periode(self, debut=None, fin=None):
+        """Bornes [lo, hi) des lignes dont la date est dans [debut, fin]"""
+        lo = 0 if debut is None else int(np.searchsorted(
+            self.dates, np.datetime64(pd.Timestamp(debut)), side='left'))
+        hi = len(self.dates) if fin is None else int(np.searchsorted(
+            self.dates, np.datetime64(pd.Timestamp(fin)), side='right'))
+        return lo, max(lo, hi)
+
+    def indices(self, selection, debut=None, fin=None):
+        """
+        Positions (triées) des lignes retenues par les filtres.
+
+        selection associe une dimension à une valeur ('ALL' ou None : pas de
+        filtre). Les listes de positions sont restreintes à la période, puis
+        intersectées en partant de la plus courte.
+        """
+        lo, hi = self.tranche_periode(debut, fin)
+        listes = []
+        for dimension, valeur in selection.items():
+            if valeur is None or valeur == 'ALL':
+                continue
+            positions = self.postings[dimension].get(valeur)
+            if positions is None:
+                return np.empty(0, dtype=np.intp)
+            debut_p, fin_p = np.searchsorted(positions, [lo, hi])
+            listes.append(positions[debut_p:fin_p])
+
+        if not listes:
+            return np.arange(lo, hi)
+
+        listes.sort(key=len)
+        resultat = listes[0]
+        for autre in listes[1:]:
+            if len(resultat) == 0 or len(autre) == 0:
+                return np.empty(0, dtype=np.intp)
+            # Test d'appartenance par recherche dichotomique dans la liste triée
+            pos = np.searchsorted(autre, resultat)
+            pos[pos == len(autre)] = 0
+            resultat = resultat[autre[pos] == resultat]
+        return resultat
+
+    def permutation(self, colonne, decroissant=False):
+        """
+        Positions des lignes triées selon colonne (tri stable : à valeurs
+        égales, ordre des dates ; valeurs manquantes en dernier)
+        """
+        cle = (colonne, decroissant)
+        with self._verrou:
+            if cle not in self._permutations:
+                if colonne == self.colonne_date and not decroissant:
+                    # Lignes déjà triées par date (NaT en dernier)
+                    self._permutations[cle] = np.arange(len(self.dates))
+                else:
+                    self._permutations[cle] = np.argsort(self._cles_tri(colonne, decroissant),
+                                                         kind='stable')
+            return self._permutations[cle]
+
+    def rangs_de(self, colonne, decroissant, indices):
+        """Rangs (voir rangs) des lignes aux positions indices"""
+        return self.rangs(colonne, decroissant)[indices]
+
+    def rangs(self, colonne, decroissant=False):
+        """
+        Rang de la valeur de chaque ligne dans l'ordre de permutation(colonne),
+        égal pour des valeurs égales (clés de tri sur plusieurs colonnes)
+        """
+        permutation = self.permutation(colonne, decroissant)
+        cle = (colonne, decroissant)
+        with self._verrou:
+            if cle not in self._rangs:
+                triees = self._cles_tri(colonne, decroissant)[permutation]
+                nouvelles = np.empty(len(triees), dtype=bool)
+                nouvelles[:1] = True
+                nouvelles[1:] = triees[1:] != triees[:-1]
+                rangs = np.empty(len(permutation), dtype=np.intp)
+                rangs[permutation] = np.cumsum(nouvelles) - 1
+                self._rangs[cle] = rangs
+            return self._rangs[cle]
+
+    def _cles_tri(self, colonne, decroissant):
+        """Clés dont l'ordre croissant est l'ordre de tri demandé"""
+        manquantes = None
+        if colonne == self.colonne_date:
+            cles = self.dates.astype('datetime64[ns]').view(np.int64)
+            manquantes = np.isnat(self.dates)
+        elif isinstance(self.df[colonne].dtype, pd.CategoricalDtype):
+            # Catégories triées : l'ordre des codes est celui des valeurs
+            cles = self.df[colonne].cat.codes.to_numpy().astype(np.int64)
+            manquantes = cles < 0
+        else:
+            # Nombres : NaN placés en dernier par argsort
+            cles = self.df[colonne].to_numpy()
+            if cles.dtype.kind == 'b':
+                cles = cles.astype(np.int64)
+        if decroissant:
+            cles = -cles
+        if manquantes is not None:
+            cles = np.where(manquantes, np.iinfo(np.int64).max, cles)
+        return cles
+
+    def ajouter(self, lot):
+        """
+        Nouvel index incluant un lot de transactions (colonnes de l'index) ;
+        l'index courant n'est pas modifié ni recopié : les lignes du lot
+        forment un segment secondaire (voir MoteurFiltresAjouts).
+        """
+        return MoteurFiltresAjouts(self, lot[self.colonnes].reset_index(drop=True))
+
+    def lignes(self, idx):
+        """Sous-ensemble des lignes correspondant aux positions"""
+        return self.df.take(idx)
+
+
+class MoteurFiltresAjouts:
+    """
+    Index de filtrage d'un MoteurFiltres principal suivi des lignes
+    ajoutées par lots, indexées à part (MoteurFiltres secondaire, reconstruit
+    en O(lignes ajoutées) à chaque lot) : positions 0..n-1 pour le principal,
+    n.. pour les ajouts. Même interface que MoteurFiltres pour le filtrage,
+    les pages et le tri (rangs calculés sur les seules lignes retenues), mais
+    sans recopier les colonnes du principal (mappées en mémoire partagée le
+    cas échéant).
+
+    Au-delà de LIGNES_AVANT_FUSION lignes ajoutées, un thread reconstruit
+    l'index complet ; courant() le renvoie dès qu'il est prêt (avec les
+    lignes arrivées depuis en segment secondaire). Une requête travaille sur
+    un seul index (celui de courant() à son début) : les positions n'ont
+    pas le même sens d'un index à l'autre.
+    """
+
+    def __init__(self, principal, ajoutees, fusion=None):
+        self.principal = principal
+        self.ajoutees = ajoutees  # lignes ajoutées, dans leur ordre d'arrivée
+        self.ajouts = MoteurFiltres(ajoutees, list(principal.codes), principal.colonne_date)
+        self.colonne_date = principal.colonne_date
+        self.codes = principal.codes
+        self._verrou = threading.Lock()
+        self._courant = None
+        # Fusion partagée par les versions suivantes : {'nb_ajoutees', 'index'}
+        self._fusion = fusion
+        if fusion is None and len(ajoutees) >= LIGNES_AVANT_FUSION:
+            self._fusion = {'nb_ajoutees': len(ajoutees), 'index': None}
+            threading.Thread(target=self._fusionner, args=(self._fusion,), daemon=True).start()
+
+    def _fusionner(self, fusion):
+        """Index complet (lignes triées par date) du principal et des ajouts"""
+        df = pd.DataFrame({colonne: _concatener(self.principal.df[colonne], self.ajoutees[colonne])
+                           for colonne in self.principal.colonnes})
+        fusion['index'] = MoteurFiltres(df, list(self.codes), self.colonne_date)
+
+    @property
+    def nb_lignes(self):
+        return self.principal.nb_lignes + self.ajouts.nb_lignes
+
+    @property
+    def colonnes(self):
+        return self.principal.colonnes
+
+    def courant(self):
+        """Index fusionné si la fusion en arrière-plan est terminée, sinon celui-ci"""
+        fusion = self._fusion
+        if fusion is None or fusion['index'] is None:
+            return self
+        with self._verrou:
+            if self._courant is None:
+                reste = self.ajoutees.iloc[fusion['nb_ajoutees']:].reset_index(drop=True)
+                self._courant = fusion['index'] if reste.empty else MoteurFiltresAjouts(fusion['index'], reste)
+            return self._courant
+
+    def ajouter(self, lot):
+        """Nouvel index incluant un lot : seul le segment des ajouts est reconstruit"""
+        courant = self.courant()
+        if courant is not self:
+            return courant.ajouter(lot)
+        lot = lot[self.colonnes].reset_index(drop=True)
+        ajoutees = pd.DataFrame({colonne: _concatener(self.ajoutees[colonne], lot[colonne])
+                                 for colonne in self.colonnes})
+        return MoteurFiltresAjouts(self.principal, ajoutees, self._fusion)
+
+    def segments(self, indices):
+        """(segment, masque sur indices, positions dans le segment) de chaque segment"""
+        n = self.principal.nb_lignes
+        ajout = indices >= n
+        yield self.principal, ~ajout, indices[~ajout]
+        yield self.ajouts, ajout, indices[ajout] - n
+
+    def indices(self, selection, debut=None, fin=None):
+        """
+        Positions des lignes retenues par les filtres, dans l'ordre des
+        dates (à date égale : principal, puis ajouts dans leur ordre) ;
+        les deux listes, triées par date, sont fusionnées
+        """
+        principales = self.principal.indices(selection, debut, fin)
+        ajoutees = self.ajouts.indices(selection, debut, fin)
+        if len(ajoutees) == 0:
+            return principales
+        rangs = np.searchsorted(self.principal.dates[principales], self.ajouts.dates[ajoutees], side='right')
+        return np.insert(principales, rangs, ajoutees + self.principal.nb_lignes)
+
+    def permutation(self, colonne, decroissant=False):
+        """Pas de permutation pré-calculée sur les deux segments (tri par rangs_de)"""
+        return None
+
+    def rangs_de(self, colonne, decroissant, indices):
+        """
+        Rangs des lignes aux positions indices, comparables entre elles :
+        clés de tri des deux segments ramenées à un même ordre, puis rangées
+        """
+        segments = list(self.segments(indices))
+        if colonne == self.colonne_date:
+            dates = np.empty(len(indices), dtype='datetime64[ns]')
+            for segment, retenues, positions in segments:
+                dates[retenues] = segment.dates[positions]
+            cles = dates.view(np.int64)
+            if decroissant:
+                cles = -cles
+            cles = np.where(np.isnat(dates), np.iinfo(np.int64).max, cles)
+        elif all(segment.df[colonne].dtype.kind in 'biuf' for segment, _, _ in segments):
+            # Nombres : NaN rangés en dernier par np.unique
+            cles = np.empty(len(indices), dtype=float)
+            for segment, retenues, positions in segments:
+                cles[retenues] = segment.df[colonne].to_numpy()[positions]
+            if decroissant:
+                cles = -cles
+        else:
+            # Catégories et textes : codes sur l'union triée des valeurs des segments
+            codes = [codes_categories(segment.df[colonne].iloc[positions]) for segment, _, positions in segments]
+            communes = pd.Index(codes[0][1]).union(pd.Index(codes[1][1]))
+            cles = np.empty(len(indices), dtype=np.int64)
+            for (_, retenues, _), (codes_segment, valeurs) in zip(segments, codes):
+                correspondance = np.append(communes.get_indexer(valeurs), -1)
+                cles[retenues] = correspondance[codes_segment]
+            manquantes = cles < 0
+            if decroissant:
+                cles = -cles
+            cles = np.where(manquantes, np.iinfo(np.int64).max, cles)
+        return np.unique(cles, return_inverse=True)[1].reshape(-1)
+
+    def lignes(self, idx):
+        """Sous-ensemble des lignes correspondant aux positions (dans leur ordre)"""
+        parties = [segment.lignes(positions) for segment, _, positions in self.segments(idx)
+                   if len(positions)]
+        if len(parties) < 2:
+            return parties[0] if parties else self.principal.lignes(idx)
+        lignes = pd.concat(parties)
+        # Concaténation : lignes du principal puis des ajouts ; retour à l'ordre de idx
+        ordre = np.argsort(idx >= self.principal.nb_lignes, kind='stable')
+        return lignes.iloc[np.argsort(ordre, kind='stable')]
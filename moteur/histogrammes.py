@@ -0,0 +1,47 @@
+"""
+Histogrammes pré-calculés côté serveur
+Au lieu d'embarquer toutes les valeurs brutes dans la figure (px.histogram,
+regroupement fait par le navigateur), les classes sont calculées avec NumPy
+et seule une barre par classe est envoyée.
+"""
+
+import numpy as np
+import plotly.graph_objects as go
+
+
+def bornes_classes(valeurs, nb_classes='fd'):
+    """
+    Bornes des classes : nb_classes entier, ou 'fd' (règle de
+    Freedman–Diaconis). Les valeurs entières sur une petite plage sont
+    regroupées une classe par valeur.
+    """
+    valeurs = valeurs[np.isfinite(valeurs)]
+    if len(valeurs) == 0:
+        return np.array([0.0, 1.0])
+    mini, maxi = valeurs.min(), valeurs.max()
+    plafond = nb_classes if isinstance(nb_classes, int) else 50
+    if np.array_equal(valeurs, np.round(valeurs)) and maxi - mini + 1 <= plafond:
+        return np.arange(mini - 0.5, maxi + 1.5)
+    return np.histogram_bin_edges(valeurs, bins=nb_classes)
+
+
+def figure_histogramme(valeurs, nb_classes='fd', titre=None, titre_x=None,
+                       titre_y='Nombre', couleur='#667eea'):
+    """Figure go.Bar d'un histogramme calculé côté serveur"""
+    valeurs = np.asarray(valeurs, dtype=float)
+    bornes = bornes_classes(valeurs, nb_classes)
+    comptes, bornes = np.histogram(valeurs[np.isfinite(valeurs)], bins=bornes)
+    return go.Figure(go.Bar(
+        x=(bornes[:-1] + bornes[1:]) / 2,
+        y=comptes,
+        width=np.diff(bornes),
+        customdata=np.column_stack([bornes[:-1], bornes[1:]]),
+        hovertemplate=f'{titre_x} : %{{customdata[0]:.2f}} – %{{customdata[1]:.2f}}'
+                      f'<br>{titre_y} : %{{y}}<extra></extra>',
+        marker_color=couleur,
+    )).update_layout(
+        title=titre,
+        xaxis_title=titre_x,
+        yaxis_title=titre_y,
+        bargap=0,
+    )
@@ -0,0 +1,43 @@
+"""
+Route d'ingestion de transactions
+POST /api/transactions avec un JSON : liste de transactions, ou
+{"transactions": [...]}, chaque transaction ayant les colonnes du classeur.
+La route n'est active que si DASHBOARD_INGESTION définit un jeton, à
+fournir dans l'en-tête « Authorization: Bearer <jeton> ».
+
+Les lots sont journalisés dans le cache colonnaire (.cache_donnees) :
+le processus qui reçoit la requête les intègre aussitôt, les autres
+workers à leur vérification suivante du classeur (qui fait foi à sa
+prochaine modification).
+"""
+
+import hmac
+import os
+
+import flask
+
+
+def route_ingestion(server, source, chemin='/api/transactions'):
+    """Ajoute au serveur Flask la route d'ingestion si un jeton est configuré"""
+    jeton = os.environ.get('DASHBOARD_INGESTION')
+    if not jeton:
+        return
+
+    @server.route(chemin, methods=['POST'])
+    def ingerer_transactions():
+        """Intègre un lot de transactions sans relire le classeur"""
+        autorisation = flask.request.headers.get('Authorization', '')
+        if not hmac.compare_digest(autorisation, f'Bearer {jeton}'):
+            return {'erreur': 'jeton invalide'}, 401
+        lot = flask.request.get_json(silent=True)
+        if isinstance(lot, dict):
+            lot = lot.get('transactions')
+        if not isinstance(lot, list):
+            return {'erreur': 'liste de transactions attendue'}, 400
+        try:
+            version = source.ajouter_transactions(lot)
+        except KeyError as erreur:
+            return {'erreur': f'colonne manquante : {erreur}'}, 400
+        except (TypeError, ValueError) as erreur:
+            return {'erreur': f'lot invalide : {erreur}'}, 400
+        return {'version': version, 'nb_lignes': len(lot)}
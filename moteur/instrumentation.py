@@ -0,0 +1,169 @@
+"""
+Instrumentation des callbacks et des KPI
+Chaque étape d'un calcul (sélection du cube, calcul d'une section,
+sérialisation JSON, KPI de l'exercice 1, ...) est chronométrée par
+etape(section, nom) ; les durées alimentent des histogrammes, et le nombre
+de lignes traitées et la taille des réponses des résumés (nombre, somme).
+
+installer_metriques(server) expose le tout au format texte de Prometheus
+sur /metrics. Avec DASHBOARD_SERVER_TIMING=1, chaque réponse porte en plus
+un en-tête Server-Timing détaillant les étapes de la requête (visible dans
+l'onglet réseau du navigateur).
+
+Les mesures sont propres au processus : avec plusieurs workers, chacun
+expose les siennes (à agréger par Prometheus, une cible par worker).
+"""
+
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+import flask
+
+# Bornes (secondes) des histogrammes de durée
+BORNES = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+AIDES = {
+    'dashboard_etape_secondes': ('histogram', "Durée d'une étape de calcul"),
+    'dashboard_lignes': ('summary', "Lignes de données traitées par un calcul"),
+    'dashboard_reponse_octets': ('summary', "Taille du corps des réponses envoyées (compressé le cas échéant)"),
+    'dashboard_cache_total': ('counter', "Sorties de section lues dans le cache ou calculées"),
+}
+
+
+def _echapper(valeur):
+    return str(valeur).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _etiquettes(etiquettes):
+    return ','.join(f'{nom}="{_echapper(valeur)}"' for nom, valeur in etiquettes)
+
+
+class Instrumentation:
+    """Registre thread-safe des mesures du processus"""
+
+    def __init__(self, bornes=BORNES):
+        self.bornes = bornes
+        self._verrou = threading.Lock()
+        self._histogrammes = {}  # (métrique, étiquettes) -> [comptes par borne, nombre, somme]
+        self._resumes = {}  # (métrique, étiquettes) -> [nombre, somme]
+        self._compteurs = {}  # (métrique, étiquettes) -> valeur
+
+    def observer(self, section, etape, secondes):
+        """Ajoute une durée à l'histogramme de l'étape (et à la requête en cours)"""
+        cle = ('dashboard_etape_secondes', (('section', section), ('etape', etape)))
+        with self._verrou:
+            comptes, nombre, somme = self._histogrammes.get(cle) or ([0] * len(self.bornes), 0, 0.0)
+            for i, borne in enumerate(self.bornes):
+                if secondes <= borne:
+                    comptes[i] += 1
+            self._histogrammes[cle] = [comptes, nombre + 1, somme + secondes]
+        if flask.has_request_context():
+            flask.g.setdefault('etapes', []).append((f'{section}.{etape}', secondes))
+
+    def resumer(self, metrique, section, valeur):
+        """Ajoute une valeur (lignes, octets) au résumé de la section"""
+        cle = (metrique, (('section', section),))
+        with self._verrou:
+            nombre, somme = self._resumes.get(cle, (0, 0))
+            self._resumes[cle] = [nombre + 1, somme + valeur]
+
+    def compter(self, metrique, increment=1, **etiquettes):
+        cle = (metrique, tuple(etiquettes.items()))
+        with self._verrou:
+            self._compteurs[cle] = self._compteurs.get(cle, 0) + increment
+
+    @contextmanager
+    def etape(self, section, etape):
+        """Chronomètre le bloc comme étape de la section"""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observer(section, etape, time.perf_counter() - t0)
+
+    def exposition(self):
+        """Mesures au format texte de Prometheus (version 0.0.4)"""
+        with self._verrou:
+            histogrammes = {cle: (list(v[0]), v[1], v[2]) for cle, v in self._histogrammes.items()}
+            resumes = {cle: tuple(v) for cle, v in self._resumes.items()}
+            compteurs = dict(self._compteurs)
+        lignes = []
+        for metrique, (genre, aide) in AIDES.items():
+            lignes += [f'# HELP {metrique} {aide}', f'# TYPE {metrique} {genre}']
+            for (nom, etiquettes), (comptes, nombre, somme) in sorted(histogrammes.items()):
+                if nom == metrique:
+                    for borne, compte in zip(self.bornes, comptes):
+                        lignes.append(f'{nom}_bucket{{{_etiquettes(etiquettes + (("le", borne),))}}} {compte}')
+                    lignes.append(f'{nom}_bucket{{{_etiquettes(etiquettes + (("le", "+Inf"),))}}} {nombre}')
+                    lignes.append(f'{nom}_count{{{_etiquettes(etiquettes)}}} {nombre}')
+                    lignes.append(f'{nom}_sum{{{_etiquettes(etiquettes)}}} {somme}')
+            for (nom, etiquettes), (nombre, somme) in sorted(resumes.items()):
+                if nom == metrique:
+                    lignes.append(f'{nom}_count{{{_etiquettes(etiquettes)}}} {nombre}')
+                    lignes.append(f'{nom}_sum{{{_etiquettes(etiquettes)}}} {somme}')
+            for (nom, etiquettes), valeur in sorted(compteurs.items()):
+                if nom == metrique:
+                    lignes.append(f'{nom}{{{_etiquettes(etiquettes)}}} {valeur}')
+        return '\n'.join(lignes) + '\n'
+
+
+# Registre du processus, partagé par les dashboards et les moteurs de calcul
+instrumentation = Instrumentation()
+etape = instrumentation.etape
+
+
+def _jeton(nom):
+    """Nom de mesure Server-Timing (jeton HTTP : ni espace ni accent)"""
+    return re.sub(r'[^A-Za-z0-9.:+_-]', '_', nom)
+
+
+def section_requete():
+    """
+    Section d'une requête : composants mis à jour pour un callback Dash,
+    sinon la règle de la route (nombre d'étiquettes borné)
+    """
+    if flask.request.path.endswith('/_dash-update-component'):
+        sorties = (flask.request.get_json(silent=True) or {}).get('outputs') or []
+        if isinstance(sorties, dict):
+            sorties = [sorties]
+        ids = [str(sortie.get('id')) for sortie in sorties if isinstance(sortie, dict)]
+        if ids:
+            return 'callback:' + '+'.join(dict.fromkeys(ids))
+    regle = flask.request.url_rule
+    return regle.rule if regle is not None else 'inconnue'
+
+
+def installer_metriques(server, registre=instrumentation, chemin='/metrics'):
+    """
+    Ajoute au serveur Flask la route /metrics et la mesure de chaque
+    requête (durée, taille de la réponse), et, avec
+    DASHBOARD_SERVER_TIMING=1, l'en-tête Server-Timing
+    """
+    server_timing = os.environ.get('DASHBOARD_SERVER_TIMING') == '1'
+
+    @server.route(chemin)
+    def metriques():
+        """Mesures du processus au format Prometheus"""
+        return flask.Response(registre.exposition(),
+                              content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    @server.before_request
+    def debut_requete():
+        flask.g.debut_requete = time.perf_counter()
+
+    @server.after_request
+    def fin_requete(reponse):
+        if flask.request.path == chemin or 'debut_requete' not in flask.g:
+            return reponse
+        section = section_requete()
+        duree = time.perf_counter() - flask.g.debut_requete
+        registre.observer(section, 'requete', duree)
+        if not reponse.direct_passthrough:
+            registre.resumer('dashboard_reponse_octets', section, len(reponse.get_data()))
+        if server_timing:
+            reponse.headers['Server-Timing'] = ', '.join(
+                f'{_jeton(nom)};dur={secondes * 1000:.2f}' for nom, secondes in flask.g.etapes)
+        return reponse
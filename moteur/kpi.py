@@ -0,0 +1,564 @@
+"""
+Service des 6 KPI de l'exercice 1
+Les KPI sont dérivés d'agrégats (sommes et comptes par catégorie, client et
+mode de paiement) que l'on peut compléter par lots de transactions sans
+relire l'historique. Chaque KPI est calculé à la première demande puis
+mémorisé pour la version courante des données ; les intermédiaires communs
+(ca_par_categorie, clv_par_client, ...) ne sont calculés qu'une fois.
+"""
+
+import copy
+import threading
+from functools import wraps
+
+import numpy as np
+import pandas as pd
+
+from moteur.cube import ordinaux_jours
+from moteur.instrumentation import etape
+from moteur.quantiles import QUANTILES_KPI, creer_quantiles
+from moteur.schema import codes_categories
+
+
+# ==============================================================================
+# AGRÉGATS MIS À JOUR PAR LOTS
+# ==============================================================================
+class Groupes:
+    """
+    Comptes (et sommes) par clé, équivalents d'un groupby.
+
+    ajouter() renvoie une nouvelle version sans modifier la courante : les
+    tableaux sont recopiés (O(nombre de clés), en mémoire contiguë), la
+    table des clés est partagée et seulement complétée (O(lot)). Une
+    version ne voit que ses len(comptes) premières clés : celles ajoutées
+    par une version jamais publiée (lot écarté) ne lui sont pas visibles.
+    """
+
+    def __init__(self, cles, comptes, sommes=None, nom=None):
+        self.nom = nom
+        self.cles = list(cles)
+        self.index = {cle: i for i, cle in enumerate(self.cles)}
+        self.comptes = np.asarray(comptes, dtype=np.int64)
+        self.sommes = None if sommes is None else np.asarray(sommes, dtype=float)
+
+    @classmethod
+    def depuis_groupby(cls, cles, valeurs):
+        """Groupes construits d'un bloc (les clés manquantes sont ignorées)"""
+        # Colonne catégorielle : regroupement sur les codes, sans hacher les
+        # valeurs (observed=True : seules les catégories présentes)
+        groupes = valeurs.groupby(cles, observed=True)
+        sommes = groupes.sum()
+        return cls(sommes.index, groupes.size().to_numpy(), sommes.to_numpy(), nom=cles.name)
+
+    @classmethod
+    def depuis_codes(cls, cles):
+        """
+        Comptes par valeur d'une colonne catégorielle, par comptage de ses
+        codes (bincount) ; seules les catégories présentes sont gardées
+        """
+        codes, categories = codes_categories(cles)
+        comptes = np.bincount(codes[codes >= 0], minlength=len(categories))
+        return cls(categories[comptes > 0], comptes[comptes > 0], nom=cles.name)
+
+    def position(self, cle):
+        """Position de la clé dans cette version (None si absente)"""
+        position = self.index.get(cle)
+        return position if position is not None and position < len(self.comptes) else None
+
+    def ajouter(self, cles, valeurs=None):
+        """
+        Nouvelle version incluant un lot (cles et valeurs alignées). Si la
+        table des clés a été complétée au-delà de cette version (lot écarté
+        en cours d'intégration), elle est d'abord recopiée sans ces clés.
+        """
+        inverse, uniques = pd.factorize(np.asarray(cles, dtype=object))
+        nouveau = copy.copy(self)
+        nouvelles = [cle for cle in uniques if self.position(cle) is None]
+        if nouvelles and len(self.cles) > len(self.comptes):
+            nouveau.cles = self.cles[:len(self.comptes)]
+            nouveau.index = {cle: i for i, cle in enumerate(nouveau.cles)}
+        for cle in nouvelles:
+            nouveau.index[cle] = len(nouveau.cles)
+            nouveau.cles.append(cle)
+        garder = inverse >= 0
+        codes = np.array([nouveau.index[cle] for cle in uniques], dtype=np.int64)[inverse[garder]]
+
+        taille = len(self.comptes) + len(nouvelles)
+        nouveau.comptes = np.zeros(taille, dtype=np.int64)
+        nouveau.comptes[:len(self.comptes)] = self.comptes
+        np.add.at(nouveau.comptes, codes, 1)
+        if self.sommes is not None:
+            nouveau.sommes = np.zeros(taille)
+            nouveau.sommes[:len(self.sommes)] = self.sommes
+            np.add.at(nouveau.sommes, codes, np.nan_to_num(np.asarray(valeurs, dtype=float)[garder]))
+        return nouveau
+
+    def codes(self, valeurs):
+        """Position de chaque valeur dans cette version (-1 si absente)"""
+        return pd.Index(self.cles[:len(self.comptes)]).get_indexer(valeurs)
+
+    def serie(self, mesure, nom=None):
+        """Series indexée par les clés de cette version"""
+        valeurs = getattr(self, mesure)
+        return pd.Series(valeurs, index=pd.Index(self.cles[:len(valeurs)], name=self.nom), name=nom)
+
+
+def entiers_compacts(valeurs):
+    """Entiers dans le plus petit type qui contient leurs valeurs"""
+    if len(valeurs) == 0:
+        return valeurs.astype(np.int8)
+    bas, haut = valeurs.min(), valeurs.max()
+    for type_entier in (np.int8, np.uint8, np.int16, np.uint16, np.int32, np.uint32):
+        if np.iinfo(type_entier).min <= bas and haut <= np.iinfo(type_entier).max:
+            return valeurs.astype(type_entier)
+    return valeurs.astype(np.int64)
+
+
+class VentesClients:
+    """
+    Sommes et comptes des transactions par clé distincte, pour les
+    classements de clients filtrés : par (client, catégorie, mode de
+    paiement) pour les filtres de catégorie et de mode, et par jour en plus
+    (transactions datées) pour les filtres de période. Codes : positions
+    dans les Groupes des agrégats (-1 si manquant) ; montants NaN comptés 0,
+    comme dans les sommes. Mémoire et coût des requêtes suivent le nombre de
+    clés distinctes, non celui des transactions.
+
+    Chaque niveau est fait de listes de morceaux agrégés, triés par clé :
+    une liste sans jour, une par tranche de JOURS_PAR_TRANCHE jours
+    pour le niveau jours (une période ne lit que ses tranches). Dans un
+    morceau par jour, le jour des clés est donné par des positions de début
+    (jours distincts et debuts, comme une matrice creuse CSR). ajouter()
+    agrège le lot en morceaux et ne refond une liste que lorsque ses derniers
+    morceaux pèsent le quart du premier (ou qu'ils sont plus de
+    MAX_MORCEAUX) : coût amorti en O(lot), copie limitée à une tranche.
+    """
+
+    CLES = ('clients', 'categories', 'modes')
+    JOURS_PAR_TRANCHE = 32
+    MAX_MORCEAUX = 8
+    JOUR_MANQUANT = np.iinfo(np.int32).min
+
+    def __init__(self, sans_jour=(), tranches=None):
+        self.sans_jour = list(sans_jour)  # morceaux par (client, catégorie, mode)
+        self.tranches = dict(tranches or {})  # tranche de jours -> morceaux par jour
+
+    @staticmethod
+    def morceau(lot, colonne_montant, clients, categories, modes):
+        """Colonnes d'un lot, codées sur les clés des Groupes (déjà complétés)"""
+        dates = lot['Date_Transaction'].to_numpy()
+        jours = np.where(np.isnat(dates), VentesClients.JOUR_MANQUANT, ordinaux_jours(dates))
+        return {
+            'clients': clients.codes(lot['ID_Client']).astype(np.int32),
+            'categories': categories.codes(lot['Categorie_Produit']).astype(np.int16),
+            'modes': modes.codes(lot['Mode_Paiement']).astype(np.int16),
+            'jours': jours.astype(np.int32),
+            'montants': np.nan_to_num(lot[colonne_montant].to_numpy(dtype=float)),
+        }
+
+    @staticmethod
+    def agreger(colonnes, sommes, comptes):
+        """
+        Morceau agrégé : sommes et comptes par clé distincte des colonnes de
+        codes (clé composée en un entier, première colonne la plus
+        significative), triés par clé, codes et comptes en entiers compacts
+        """
+        cle = np.zeros(len(sommes), dtype=np.int64)
+        bornes = {}
+        for nom, codes in colonnes.items():
+            bas, haut = (int(codes.min()), int(codes.max())) if len(codes) else (0, 0)
+            bornes[nom] = (bas, haut - bas + 1)
+            cle = cle * bornes[nom][1] + (codes.astype(np.int64) - bas)
+        uniques, inverse = np.unique(cle, return_inverse=True)
+        nb_cles = len(uniques)
+        morceau = {}
+        for nom in reversed(list(colonnes)):
+            bas, etendue = bornes[nom]
+            morceau[nom] = entiers_compacts(uniques % etendue + bas)
+            uniques = uniques // etendue
+        morceau['sommes'] = np.bincount(inverse, weights=sommes, minlength=nb_cles)
+        morceau['comptes'] = entiers_compacts(np.rint(np.bincount(inverse, weights=comptes,
+                                                                  minlength=nb_cles)).astype(np.int64))
+        if 'jours' in morceau:
+            jours, debuts = np.unique(morceau.pop('jours'), return_index=True)
+            morceau['jours'] = jours.astype(np.int32)
+            morceau['debuts'] = np.append(debuts, nb_cles)
+        return morceau
+
+    @staticmethod
+    def _codes(morceau):
+        """Colonnes de codes d'un morceau agrégé (jour de chaque clé d'abord, s'il y a lieu)"""
+        codes = {}
+        if 'jours' in morceau:
+            codes['jours'] = np.repeat(morceau['jours'], np.diff(morceau['debuts']))
+        return {**codes, **{cle: morceau[cle] for cle in VentesClients.CLES}}
+
+    def _fusionner(self, morceaux):
+        """Morceaux d'une liste, refondus en un seul s'ils deviennent trop nombreux ou gros"""
+        if len(morceaux) <= self.MAX_MORCEAUX \
+                and 4 * sum(len(m['sommes']) for m in morceaux[1:]) <= len(morceaux[0]['sommes']):
+            return morceaux
+        codes = [self._codes(m) for m in morceaux]
+        return [self.agreger({cle: np.concatenate([c[cle] for c in codes]) for cle in codes[0]},
+                             np.concatenate([m['sommes'] for m in morceaux]),
+                             np.concatenate([m['comptes'] for m in morceaux]))]
+
+    def ajouter(self, morceau):
+        """Nouvelle version incluant les colonnes d'un lot (la courante est inchangée)"""
+        retenues = morceau['clients'] >= 0
+        sans_jour = self._fusionner(self.sans_jour + [self.agreger(
+            {cle: morceau[cle][retenues] for cle in self.CLES},
+            morceau['montants'][retenues], np.ones(int(retenues.sum())))])
+
+        retenues &= morceau['jours'] != self.JOUR_MANQUANT
+        par_jour = self.agreger({cle: morceau[cle][retenues] for cle in ('jours',) + self.CLES},
+                                morceau['montants'][retenues], np.ones(int(retenues.sum())))
+        tranches = dict(self.tranches)
+        numeros = par_jour['jours'] // self.JOURS_PAR_TRANCHE
+        for numero in np.unique(numeros):
+            premier, dernier = np.searchsorted(numeros, [numero, numero + 1])
+            cles = slice(par_jour['debuts'][premier], par_jour['debuts'][dernier])
+            partie = {nom: par_jour[nom][cles] for nom in self.CLES + ('sommes', 'comptes')}
+            partie['jours'] = par_jour['jours'][premier:dernier]
+            partie['debuts'] = par_jour['debuts'][premier:dernier + 1] - cles.start
+            tranches[int(numero)] = self._fusionner(tranches.get(int(numero), []) + [partie])
+        return VentesClients(sans_jour, tranches)
+
+    def jours_extremes(self):
+        """Premier et dernier jour ordinal des transactions datées (None s'il n'y en a pas)"""
+        if not self.tranches:
+            return None
+        return (min(m['jours'][0] for m in self.tranches[min(self.tranches)] if len(m['jours'])),
+                max(m['jours'][-1] for m in self.tranches[max(self.tranches)] if len(m['jours'])))
+
+    def octets(self):
+        """Mémoire des morceaux agrégés"""
+        return sum(colonne.nbytes for morceaux in [self.sans_jour, *self.tranches.values()]
+                   for morceau in morceaux for colonne in morceau.values())
+
+    def totaux(self, nb_clients, categorie=-1, mode=-1, debut=None, fin=None):
+        """
+        Sommes et comptes par client (position) des transactions retenues :
+        catégorie et mode donnés par leur code (-1 : pas de filtre), jours
+        ordinaux extrêmes inclus (None : pas de borne ; une borne écarte les
+        transactions sans date)
+        """
+        if debut is None and fin is None:
+            morceaux = [(morceau, slice(None)) for morceau in self.sans_jour]
+        else:
+            # Tranches de la période, puis dans chaque morceau la tranche de ses clés
+            morceaux = []
+            for numero, liste in self.tranches.items():
+                if (debut is not None and numero < debut // self.JOURS_PAR_TRANCHE) \
+                        or (fin is not None and numero > fin // self.JOURS_PAR_TRANCHE):
+                    continue
+                for morceau in liste:
+                    jours, debuts = morceau['jours'], morceau['debuts']
+                    morceaux.append((morceau, slice(
+                        debuts[0 if debut is None else np.searchsorted(jours, debut)],
+                        debuts[len(jours) if fin is None else np.searchsorted(jours, fin, 'right')])))
+        sommes = np.zeros(nb_clients)
+        comptes = np.zeros(nb_clients)
+        for morceau, tranche in morceaux:
+            clients = morceau['clients'][tranche]
+            retenues = np.ones(len(clients), dtype=bool)
+            if categorie >= 0:
+                retenues &= morceau['categories'][tranche] == categorie
+            if mode >= 0:
+                retenues &= morceau['modes'][tranche] == mode
+            clients = clients[retenues]
+            sommes += np.bincount(clients, weights=morceau['sommes'][tranche][retenues], minlength=nb_clients)
+            comptes += np.bincount(clients, weights=morceau['comptes'][tranche][retenues], minlength=nb_clients)
+        return sommes, np.rint(comptes).astype(np.int64)
+
+
+def plus_grands(cles, valeurs, comptes, k, nom_index=None):
+    """
+    Les k clés de plus grandes valeurs parmi celles de compte non nul, par
+    sélection (argpartition) sans tri complet ; à valeurs égales, ordre
+    croissant des clés, comme nlargest sur une série triée par clé.
+    DataFrame indexé par clé : clv, nb_transactions.
+    """
+    candidats = np.flatnonzero(comptes > 0)
+    if 0 < k < len(candidats):
+        rang = len(candidats) - k
+        seuil = valeurs[candidats[np.argpartition(valeurs[candidats], rang)[rang]]]
+        candidats = candidats[valeurs[candidats] >= seuil]
+    top = pd.DataFrame({
+        'clv': valeurs[candidats],
+        'nb_transactions': comptes[candidats],
+    }, index=pd.Index([cles[i] for i in candidats], name=nom_index))
+    top = top.sort_index(kind='stable').sort_values('clv', ascending=False, kind='stable')
+    return top.head(max(k, 0))
+
+
+class AgregatsKPI:
+    """
+    Sommes et comptes derrière les KPI de l'exercice 1, et résumé des
+    montants pour leurs quantiles (mode 'auto', 'exact' ou 'kll', voir
+    moteur.quantiles.creer_quantiles)
+    """
+
+    def __init__(self, df, colonne_montant='Montant_Transaction', quantiles='auto'):
+        self.colonne_montant = colonne_montant
+        montant = df[colonne_montant]
+        self.nb_transactions = len(df)
+        self.nb_montants = int(montant.count())
+        self.somme_montants = montant.sum()
+        self.min_montant = montant.min()
+        self.max_montant = montant.max()
+        self.quantiles_montants = creer_quantiles(montant.to_numpy(dtype=float), quantiles)
+        self.categories = Groupes.depuis_groupby(df['Categorie_Produit'], montant)
+        self.clients = Groupes.depuis_groupby(df['ID_Client'], montant)
+        if isinstance(df['Mode_Paiement'].dtype, pd.CategoricalDtype):
+            self.modes = Groupes.depuis_codes(df['Mode_Paiement'])
+        else:
+            modes = df['Mode_Paiement'].value_counts()
+            self.modes = Groupes(modes.index, modes.to_numpy(), nom=modes.index.name)
+        self.ventes_clients = VentesClients().ajouter(VentesClients.morceau(
+            df, colonne_montant, self.clients, self.categories, self.modes))
+
+    def ajouter(self, lot):
+        """Nouvelle version des agrégats incluant un lot, en O(lot)"""
+        montant = lot[self.colonne_montant]
+        valides = montant.dropna().to_numpy(dtype=float)
+        nouveau = copy.copy(self)
+        nouveau.nb_transactions = self.nb_transactions + len(lot)
+        nouveau.nb_montants = self.nb_montants + len(valides)
+        nouveau.somme_montants = self.somme_montants + valides.sum()
+        if len(valides):
+            nouveau.min_montant = np.fmin(self.min_montant, valides.min())
+            nouveau.max_montant = np.fmax(self.max_montant, valides.max())
+        nouveau.quantiles_montants = self.quantiles_montants.ajouter(valides)
+        nouveau.categories = self.categories.ajouter(lot['Categorie_Produit'], montant)
+        nouveau.clients = self.clients.ajouter(lot['ID_Client'], montant)
+        nouveau.modes = self.modes.ajouter(lot['Mode_Paiement'])
+        nouveau.ventes_clients = self.ventes_clients.ajouter(VentesClients.morceau(
+            lot, self.colonne_montant, nouveau.clients, nouveau.categories, nouveau.modes))
+        return nouveau
+
+
+# ==============================================================================
+# KPI CALCULÉS À LA DEMANDE
+# ==============================================================================
+def indicateur(calcul):
+    """
+    Déclare un KPI calculé à la demande et mémorisé pour la version ; la
+    durée du calcul (dépendances comprises) est mesurée comme étape kpi
+    """
+    nom = calcul.__name__
+
+    @property
+    @wraps(calcul)
+    def propriete(self):
+        with self._verrou:
+            if nom not in self._valeurs:
+                with etape('kpi', nom):
+                    self._valeurs[nom] = calcul(self)
+            return self._valeurs[nom]
+    return propriete
+
+
+class IndicateursKPI:
+    """KPI d'une version des données, calculés paresseusement"""
+
+    def __init__(self, version, agregats):
+        self.version = version
+        self.agregats = agregats
+        self._verrou = threading.RLock()
+        self._valeurs = {}
+
+    # ==========================================================================
+    # KPI 1 : VALEUR MOYENNE DES TRANSACTIONS
+    # ==========================================================================
+    @indicateur
+    def moyenne_transactions(self):
+        a = self.agregats
+        return a.somme_montants / a.nb_montants if a.nb_montants else np.nan
+
+    @indicateur
+    def min_transaction(self):
+        return self.agregats.min_montant
+
+    @indicateur
+    def max_transaction(self):
+        return self.agregats.max_montant
+
+    @indicateur
+    def quantiles_transactions(self):
+        """Médiane, p90 et p99 des montants (exacts ou estimés selon le mode)"""
+        valeurs = self.agregats.quantiles_montants.quantile(QUANTILES_KPI)
+        return dict(zip(QUANTILES_KPI, valeurs))
+
+    @indicateur
+    def mediane_transaction(self):
+        return self.quantiles_transactions[0.5]
+
+    # ==========================================================================
+    # KPI 2 : RÉPARTITION DES CATÉGORIES DE PRODUITS
+    # ==========================================================================
+    @indicateur
+    def ca_par_categorie(self):
+        a = self.agregats
+        return a.categories.serie('sommes', a.colonne_montant).sort_index()
+
+    @indicateur
+    def ca_total(self):
+        return self.ca_par_categorie.sum()
+
+    @indicateur
+    def pourcentage_par_categorie(self):
+        return (self.ca_par_categorie / self.ca_total * 100).round(2)
+
+    # ==========================================================================
+    # KPI 3 : TAUX DE RÉCURRENCE DES CLIENTS
+    # ==========================================================================
+    @indicateur
+    def transactions_par_client(self):
+        return self.agregats.clients.serie('comptes').sort_index()
+
+    @indicateur
+    def nombre_clients_recurrents(self):
+        return int((self.transactions_par_client > 1).sum())
+
+    @indicateur
+    def nombre_total_clients(self):
+        return len(self.transactions_par_client)
+
+    @indicateur
+    def taux_recurrence(self):
+        return self.nombre_clients_recurrents / self.nombre_total_clients * 100
+
+    # ==========================================================================
+    # KPI 4 : MODES DE PAIEMENT
+    # ==========================================================================
+    @indicateur
+    def modes_paiement(self):
+        comptes = self.agregats.modes.serie('comptes', 'count')
+        return comptes.sort_values(ascending=False, kind='stable')
+
+    @indicateur
+    def total_transactions(self):
+        return self.agregats.nb_transactions
+
+    @indicateur
+    def pourcentage_modes(self):
+        return (self.modes_paiement / self.total_transactions * 100).round(2)
+
+    @indicateur
+    def mode_plus_utilise(self):
+        return self.modes_paiement.index[0]
+
+    # ==========================================================================
+    # KPI 5 : CUSTOMER LIFETIME VALUE (CLV)
+    # ==========================================================================
+    @indicateur
+    def clv_par_client(self):
+        a = self.agregats
+        return a.clients.serie('sommes', a.colonne_montant).sort_index()
+
+    @indicateur
+    def clv_moyenne(self):
+        return self.clv_par_client.mean()
+
+    @indicateur
+    def clv_min(self):
+        return self.clv_par_client.min()
+
+    @indicateur
+    def clv_max(self):
+        return self.clv_par_client.max()
+
+    @indicateur
+    def quantiles_clv(self):
+        """
+        Médiane, p90 et p99 de la CLV. La CLV d'un client change à chacune
+        de ses transactions : sans suppression possible dans un sketch, les
+        quantiles sont calculés exactement (sélection en O(clients)) sur les
+        sommes par client déjà agrégées, une fois par version.
+        """
+        return self.clv_par_client.quantile(list(QUANTILES_KPI)).to_dict()
+
+    @indicateur
+    def clv_mediane(self):
+        return self.quantiles_clv[0.5]
+
+    @indicateur
+    def top_5_clients(self):
+        return self.top_clients(5)['clv'].rename(self.agregats.colonne_montant)
+
+    @indicateur
+    def periode_transactions(self):
+        """Premier et dernier jour des transactions datées (datetime64[D])"""
+        jours = self.agregats.ventes_clients.jours_extremes()
+        if jours is None:
+            return None, None
+        return tuple(np.datetime64(int(jour), 'D') for jour in jours)
+
+    def top_clients(self, k, categorie=None, mode_paiement=None, debut=None, fin=None):
+        """
+        Les k clients de plus grande CLV sur les transactions retenues par
+        les filtres (None ou 'ALL' : pas de filtre ; période en jours
+        inclus). Sans filtre, sélection sur les sommes par client déjà
+        agrégées ; sinon, sommes des clés de VentesClients retenues
+        (bincount), sans groupby. DataFrame indexé par client : clv, nb_transactions.
+        """
+        a = self.agregats
+        filtres = {'categorie': -1, 'mode': -1}
+        for nom, groupes, valeur in (('categorie', a.categories, categorie),
+                                     ('mode', a.modes, mode_paiement)):
+            if valeur is not None and valeur != 'ALL':
+                filtres[nom] = groupes.position(valeur)
+                if filtres[nom] is None:
+                    return plus_grands([], np.empty(0), np.empty(0, dtype=np.int64), k, a.clients.nom)
+        for nom, jour in (('debut', debut), ('fin', fin)):
+            filtres[nom] = None if jour is None else int(ordinaux_jours([np.datetime64(jour, 'D')])[0])
+
+        if filtres == {'categorie': -1, 'mode': -1, 'debut': None, 'fin': None}:
+            sommes, comptes = a.clients.sommes, a.clients.comptes
+        else:
+            sommes, comptes = a.ventes_clients.totaux(len(a.clients.comptes), **filtres)
+        return plus_grands(a.clients.cles, sommes, comptes, k, a.clients.nom)
+
+    # ==========================================================================
+    # KPI 6 : INDICE DE PERFORMANCE DES CATÉGORIES
+    # ==========================================================================
+    @indicateur
+    def categorie_top(self):
+        return self.ca_par_categorie.idxmax()
+
+    @indicateur
+    def ca_top(self):
+        return self.ca_par_categorie.max()
+
+    @indicateur
+    def part_ca_top(self):
+        return self.ca_top / self.ca_total * 100
+
+
+class ServiceKPI:
+    """
+    KPI de l'exercice 1 sur une SourceDonnees dont les structures sont des
+    AgregatsKPI (preparer=AgregatsKPI, integrer=integrer_lot).
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self._courant = None
+
+    def actualiser(self):
+        """KPI de la version courante des données (mémorisés par version)"""
+        version, agregats = self.source.obtenir()
+        courant = self._courant
+        if courant is None or courant.version != version:
+            courant = self._courant = IndicateursKPI(version, agregats)
+        return courant
+
+    def ajouter_transactions(self, lot):
+        """Intègre un lot de transactions ; renvoie la nouvelle version"""
+        return self.source.ajouter_transactions(lot)
+
+
+def integrer_lot(agregats, lot):
+    """Fonction d'intégration des lots pour SourceDonnees"""
+    return agregats.ajouter(lot)
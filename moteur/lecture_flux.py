@@ -0,0 +1,95 @@
+"""
+Lecture par blocs des fichiers de transactions (Excel, CSV, Parquet)
+Pour les fichiers plus gros que la mémoire : les lignes sont lues par blocs
+de taille fixe (openpyxl en lecture seule, read_csv par morceaux, lots
+Parquet), chaque bloc est nettoyé comme le classeur (montant, date) puis
+intégré aux agrégats, qui seuls restent en mémoire.
+"""
+
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+
+from moteur.chargement import preparer_donnees
+
+TAILLE_BLOC = 250_000
+
+
+def _blocs_excel(chemin, taille_bloc):
+    import openpyxl
+
+    classeur = openpyxl.load_workbook(chemin, read_only=True, data_only=True)
+    try:
+        lignes = classeur.active.iter_rows(values_only=True)
+        entetes = next(lignes, None)
+        if entetes is None:
+            return
+        # Lignes entièrement vides ignorées, comme pd.read_excel
+        lignes = (ligne for ligne in lignes if any(v is not None for v in ligne))
+        while True:
+            paquet = list(itertools.islice(lignes, taille_bloc))
+            if not paquet:
+                break
+            yield _entiers_excel(pd.DataFrame.from_records(paquet, columns=entetes))
+    finally:
+        classeur.close()
+
+
+def _entiers_excel(bloc):
+    """
+    Excel stocke les nombres en flottants : comme pd.read_excel, les
+    colonnes aux valeurs toutes entières redeviennent des entiers
+    """
+    for colonne in bloc.columns:
+        valeurs = bloc[colonne]
+        if valeurs.dtype.kind == 'f' and valeurs.notna().all() and (valeurs % 1 == 0).all():
+            bloc[colonne] = valeurs.astype(np.int64)
+    return bloc
+
+
+def _blocs_csv(chemin, taille_bloc, colonne_montant):
+    # Montant lu en texte : la virgule décimale est traitée au nettoyage
+    yield from pd.read_csv(chemin, chunksize=taille_bloc, dtype={colonne_montant: str})
+
+
+def _blocs_parquet(chemin, taille_bloc):
+    import pyarrow.parquet as pq
+
+    for lot in pq.ParquetFile(chemin).iter_batches(batch_size=taille_bloc):
+        yield lot.to_pandas()
+
+
+def lire_par_blocs(chemin, colonne_montant, taille_bloc=TAILLE_BLOC):
+    """Itère sur les blocs nettoyés d'un fichier .xlsx, .csv ou .parquet"""
+    extension = os.path.splitext(chemin)[1].lower()
+    if extension in ('.xlsx', '.xlsm'):
+        blocs = _blocs_excel(chemin, taille_bloc)
+    elif extension == '.csv':
+        blocs = _blocs_csv(chemin, taille_bloc, colonne_montant)
+    elif extension == '.parquet':
+        blocs = _blocs_parquet(chemin, taille_bloc)
+    else:
+        raise ValueError(f"Format non pris en charge pour la lecture par blocs : {extension}")
+    invalides = 0
+    for bloc in blocs:
+        bloc = preparer_donnees(bloc, colonne_montant)
+        invalides += bloc.attrs['montants_invalides']
+        yield bloc
+    if invalides:
+        print(f"⚠️  {invalides} montant(s) non numérique(s) remplacé(s) par NaN")
+
+
+def agreger_par_blocs(blocs, preparer, integrer):
+    """
+    Construit les structures du dashboard bloc par bloc : preparer() sur
+    le premier bloc, puis integrer(structures, bloc) pour les suivants
+    (les mêmes fonctions que pour l'ajout de transactions).
+    """
+    structures = None
+    for bloc in blocs:
+        structures = preparer(bloc) if structures is None else integrer(structures, bloc)
+    if structures is None:
+        raise ValueError("Aucune ligne à agréger")
+    return structures
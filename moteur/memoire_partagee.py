@@ -0,0 +1,102 @@
+"""
+Jeu de données partagé entre processus (fichiers NumPy mappés en mémoire)
+Les colonnes nettoyées sont écrites une fois, triées par date, dans un
+dossier par version des données : les dimensions sous forme de codes
+catégoriels, Date_Transaction en int64 (ns). Chaque worker s'y attache sans
+copie : les pages restent dans le cache du système et sont partagées.
+"""
+
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pyarrow.feather as feather
+
+from moteur.chargement import preparer_cache
+from moteur.schema import codes_categories
+
+COLONNE_DATE = 'Date_Transaction'
+
+
+def _type_codes(nb_valeurs):
+    """Plus petit type entier signé pouvant contenir les codes"""
+    for type_entier in (np.int8, np.int16, np.int32):
+        if nb_valeurs < np.iinfo(type_entier).max:
+            return type_entier
+    return np.int64
+
+
+def exporter_colonnes(df, dossier, dimensions, version=None):
+    """Écrit les colonnes du DataFrame (triées par date) dans dossier"""
+    ordre = np.argsort(df[COLONNE_DATE].to_numpy(), kind='stable')
+    temporaire = f'{dossier}.{os.getpid()}.tmp'
+    shutil.rmtree(temporaire, ignore_errors=True)
+    os.makedirs(temporaire)
+
+    schema = {'version': version, 'nb_lignes': len(df), 'colonnes': {}}
+    for colonne in df.columns:
+        if colonne in dimensions or isinstance(df[colonne].dtype, pd.CategoricalDtype):
+            codes, categories = codes_categories(df[colonne])
+            valeurs = codes[ordre].astype(_type_codes(len(categories)))
+            schema['colonnes'][colonne] = {'type': 'categorie', 'categories': categories.tolist()}
+        else:
+            valeurs = df[colonne].to_numpy()[ordre]
+            if colonne == COLONNE_DATE:
+                valeurs = valeurs.astype('datetime64[ns]').view(np.int64)
+                schema['colonnes'][colonne] = {'type': 'date_ns'}
+            elif valeurs.dtype.kind in 'biuf':
+                schema['colonnes'][colonne] = {'type': 'numerique'}
+            else:
+                continue  # colonnes texte libres : non partagées
+        np.save(os.path.join(temporaire, f'{colonne}.npy'), np.ascontiguousarray(valeurs))
+
+    with open(os.path.join(temporaire, 'schema.json'), 'w', encoding='utf-8') as f:
+        json.dump(schema, f, ensure_ascii=False, default=str)
+    try:
+        os.rename(temporaire, dossier)
+    except OSError:
+        # Un autre processus a exporté la même version entre-temps
+        shutil.rmtree(temporaire, ignore_errors=True)
+
+
+def attacher_colonnes(dossier):
+    """DataFrame construit sans copie sur les fichiers mappés en mémoire"""
+    with open(os.path.join(dossier, 'schema.json'), encoding='utf-8') as f:
+        schema = json.load(f)
+    colonnes = {}
+    for colonne, description in schema['colonnes'].items():
+        valeurs = np.load(os.path.join(dossier, f'{colonne}.npy'), mmap_mode='r')
+        if description['type'] == 'categorie':
+            colonnes[colonne] = pd.Categorical.from_codes(
+                valeurs, categories=description['categories'], validate=False)
+        elif description['type'] == 'date_ns':
+            colonnes[colonne] = valeurs.view('datetime64[ns]')
+        else:
+            colonnes[colonne] = valeurs
+    df = pd.DataFrame(colonnes, copy=False)
+    df.attrs['version'] = schema['version']
+    return df
+
+
+def charger_partage(chemin, colonne_montant, dimensions, schema=None):
+    """
+    Équivalent de charger_donnees en mode mémoire partagée : le premier
+    processus exporte les colonnes de la version courante, les suivants
+    (et les redémarrages) s'y attachent directement.
+    """
+    empreinte, chemin_feather = preparer_cache(chemin, colonne_montant, schema)
+    dossier = f'{os.path.splitext(chemin_feather)[0]}.colonnes'
+    if not os.path.isdir(dossier):
+        print("🧩 Export des colonnes en mémoire partagée...")
+        df = feather.read_table(chemin_feather, memory_map=True).to_pandas()
+        exporter_colonnes(df, dossier, dimensions, version=empreinte)
+        # Suppression des exports des versions précédentes
+        prefixe = os.path.basename(chemin_feather).rsplit('-', 1)[0] + '-'
+        parent = os.path.dirname(dossier)
+        for ancien in os.listdir(parent):
+            if ancien.startswith(prefixe) and ancien.endswith('.colonnes') and \
+                    os.path.join(parent, ancien) != dossier:
+                shutil.rmtree(os.path.join(parent, ancien), ignore_errors=True)
+    return attacher_colonnes(dossier)
@@ -0,0 +1,133 @@
+"""
+Mode profilage des dashboards
+Activé par DASHBOARD_PROFIL=<dossier> ou par l'option --profil <dossier>
+des scripts : le chargement des données au démarrage et chaque requête
+de callback (ou de layout) sont profilés, et deux fichiers sont écrits par
+requête dans le dossier :
+- <pid>-<n°>-<section>.prof   : profil cProfile (snakeviz, python -m pstats) ;
+- <pid>-<n°>-<section>.folded : piles échantillonnées toutes les
+  DASHBOARD_PROFIL_INTERVALLE secondes (0,005 par défaut), au format
+  « replié » (une pile par ligne, puis son nombre d'échantillons), lu par
+  flamegraph.pl, speedscope ou inferno.
+
+cProfile ne pouvant suivre qu'un profil à la fois, les requêtes profilées
+sont traitées l'une après l'autre : ce mode sert à capturer des chemins
+chauds, pas à mesurer un débit.
+"""
+
+import cProfile
+import itertools
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+import flask
+
+from moteur.instrumentation import section_requete
+
+# Requêtes profilées : callbacks et layout (pas les fichiers statiques)
+CHEMINS_PROFILES = ('/_dash-update-component', '/_dash-layout')
+
+# Numéro des profils, propre au processus (le pid est aussi dans le nom)
+_numeros = itertools.count(1)
+
+
+def dossier_profil(argv=None):
+    """Dossier des profils : option --profil <dossier> (ou --profil=<dossier>), sinon DASHBOARD_PROFIL"""
+    argv = sys.argv[1:] if argv is None else argv
+    for i, argument in enumerate(argv):
+        if argument.startswith('--profil='):
+            return argument.split('=', 1)[1]
+        if argument == '--profil' and i + 1 < len(argv):
+            return argv[i + 1]
+    return os.environ.get('DASHBOARD_PROFIL') or None
+
+
+class Echantillonneur(threading.Thread):
+    """Relève à intervalle régulier la pile d'un thread (piles repliées)"""
+
+    def __init__(self, id_thread, intervalle):
+        super().__init__(daemon=True)
+        self.id_thread = id_thread
+        self.intervalle = intervalle
+        self.piles = Counter()
+        self._arret = threading.Event()
+
+    def run(self):
+        while not self._arret.wait(self.intervalle):
+            cadre = sys._current_frames().get(self.id_thread)
+            pile = []
+            while cadre is not None:
+                code = cadre.f_code
+                pile.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                cadre = cadre.f_back
+            if pile:
+                self.piles[';'.join(reversed(pile))] += 1
+
+    def arreter(self):
+        self._arret.set()
+        self.join()
+        return self.piles
+
+
+class Profileur:
+    """Profils cProfile et piles échantillonnées, écrits dans dossier (inactif si None)"""
+
+    def __init__(self, dossier=None, intervalle=None):
+        self.dossier = dossier
+        self.intervalle = intervalle or float(os.environ.get('DASHBOARD_PROFIL_INTERVALLE') or 0.005)
+        self._verrou = threading.Lock()
+        if dossier:
+            os.makedirs(dossier, exist_ok=True)
+
+    @property
+    def actif(self):
+        return self.dossier is not None
+
+    def _ecrire(self, nom, profil, piles, duree):
+        base = os.path.join(self.dossier, f'{os.getpid()}-{next(_numeros):05d}-'
+                                          f'{re.sub(r"[^A-Za-z0-9_.+-]", "_", nom)}')
+        profil.dump_stats(base + '.prof')
+        with open(base + '.folded', 'w', encoding='utf-8') as f:
+            f.writelines(f'{pile} {compte}\n' for pile, compte in piles.most_common())
+        print(f"🔬 {nom} : {duree * 1000:.0f} ms -> {base}.prof / .folded")
+
+    @contextmanager
+    def _profiler(self, nom):
+        with self._verrou:
+            echantillonneur = Echantillonneur(threading.get_ident(), self.intervalle)
+            profil = cProfile.Profile()
+            echantillonneur.start()
+            t0 = time.perf_counter()
+            profil.enable()
+            try:
+                yield
+            finally:
+                profil.disable()
+                duree = time.perf_counter() - t0
+                self._ecrire(nom, profil, echantillonneur.arreter(), duree)
+
+    def profiler(self, nom):
+        """Profile le bloc sous le nom donné (sans effet si le mode est inactif)"""
+        return self._profiler(nom) if self.actif else nullcontext()
+
+    def installer(self, server):
+        """Profile les requêtes de callback et de layout du serveur Flask"""
+        if not self.actif:
+            return
+
+        @server.before_request
+        def debut_profil():
+            if flask.request.path.endswith(CHEMINS_PROFILES):
+                flask.g.profil = self.profiler(section_requete())
+                flask.g.profil.__enter__()
+
+        @server.teardown_request
+        def fin_profil(erreur=None):
+            profil = flask.g.pop('profil', None)
+            if profil is not None:
+                profil.__exit__(None, None, None)
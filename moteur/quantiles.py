@@ -0,0 +1,183 @@
+"""
+Quantiles en flux : sketch KLL et mode exact
+Les deux résumés ont la même interface (ajouter, fusionner, quantile) et,
+comme les agrégats du dashboard, ajouter() et fusionner() renvoient un
+nouveau résumé sans modifier le courant.
+
+Sketch KLL (Karnin, Lang, Liberty, 2016) : des compacteurs empilés, le
+niveau h contenant des valeurs de poids 2^h ; quand un niveau dépasse sa
+capacité, il est trié et une valeur sur deux (décalage aléatoire) monte au
+niveau suivant. La mémoire est en O(k log(n / k)) et deux sketches se
+fusionnent niveau par niveau (partitions, workers).
+
+Borne d'erreur : l'erreur est en rang, pas en valeur. Le rang normalisé
+de la valeur renvoyée pour le quantile q est dans [q - ε, q + ε] avec 99 %
+de confiance, ε = 2,296 / k^0,9723 (formule empirique de la bibliothèque
+DataSketches pour le même algorithme), soit ≈ 1,3 % pour k = 200 et
+≈ 0,3 % pour k = 1000. Voir SketchKLL.erreur_rang et
+benchmarks/bench_quantiles.py.
+"""
+
+import copy
+
+import numpy as np
+
+# Quantiles servis par les KPI (médiane, 90e et 99e centiles)
+QUANTILES_KPI = (0.5, 0.9, 0.99)
+
+# Mode 'auto' : valeurs conservées (quantiles exacts) jusqu'à ce nombre,
+# puis bascule sur un sketch KLL
+LIMITE_EXACTE = 100_000
+
+
+def _valeurs_finies(valeurs):
+    valeurs = np.asarray(valeurs, dtype=float).ravel()
+    return valeurs[np.isfinite(valeurs)]
+
+
+class QuantilesExacts:
+    """
+    Quantiles exacts : toutes les valeurs sont conservées (par lots).
+    Avec une limite, le résumé devient un SketchKLL au-delà de limite valeurs.
+    """
+
+    def __init__(self, valeurs=(), limite=None, k=200):
+        valeurs = _valeurs_finies(valeurs)
+        self.lots = (valeurs,) if len(valeurs) else ()
+        self.n = len(valeurs)
+        self.limite = limite
+        self.k = k
+        self._triees = None
+
+    def ajouter(self, valeurs):
+        """Nouveau résumé incluant valeurs"""
+        valeurs = _valeurs_finies(valeurs)
+        nouveau = copy.copy(self)
+        nouveau.lots = self.lots + (valeurs,)
+        nouveau.n = self.n + len(valeurs)
+        nouveau._triees = None
+        return nouveau._borner()
+
+    def fusionner(self, autre):
+        """Nouveau résumé des valeurs des deux résumés"""
+        if isinstance(autre, SketchKLL):
+            return autre.fusionner(self)
+        nouveau = copy.copy(self)
+        nouveau.lots = self.lots + autre.lots
+        nouveau.n = self.n + autre.n
+        nouveau._triees = None
+        return nouveau._borner()
+
+    def _borner(self):
+        if self.limite is not None and self.n > self.limite:
+            return SketchKLL(self.k).ajouter(self.valeurs())
+        return self
+
+    def valeurs(self):
+        """Toutes les valeurs conservées"""
+        return np.concatenate(self.lots) if self.lots else np.empty(0)
+
+    def quantile(self, q):
+        """Quantile(s) exact(s), interpolation linéaire (comme Series.quantile)"""
+        if self.n == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        if self._triees is None:
+            self._triees = np.sort(self.valeurs())
+        return np.quantile(self._triees, q)
+
+
+class SketchKLL:
+    """Sketch KLL de quantiles (paramètre de précision k)"""
+
+    def __init__(self, k=200, graine=None):
+        self.k = k
+        self.niveaux = [np.empty(0)]
+        self.n = 0
+        self._rng = np.random.default_rng(graine)
+        self._resume = None
+
+    @property
+    def erreur_rang(self):
+        """Erreur de rang normalisée ε (99 % de confiance)"""
+        return 2.296 / self.k ** 0.9723
+
+    def _capacite(self, niveau):
+        """Capacité d'un niveau : k au sommet, facteur 2/3 par niveau en dessous"""
+        profondeur = len(self.niveaux) - 1 - niveau
+        return max(2, int(np.ceil(self.k * (2 / 3) ** profondeur)))
+
+    def _compacter(self):
+        """Compacte les niveaux jusqu'à respecter la capacité totale"""
+        while sum(map(len, self.niveaux)) > sum(map(self._capacite, range(len(self.niveaux)))):
+            niveau = next(h for h in range(len(self.niveaux))
+                          if len(self.niveaux[h]) > self._capacite(h))
+            valeurs = np.sort(self.niveaux[niveau])
+            # Nombre impair : une valeur reste au niveau courant
+            reste, valeurs = valeurs[:len(valeurs) % 2], valeurs[len(valeurs) % 2:]
+            promues = valeurs[self._rng.integers(2)::2]
+            self.niveaux[niveau] = reste
+            if niveau + 1 == len(self.niveaux):
+                self.niveaux.append(np.empty(0))
+            self.niveaux[niveau + 1] = np.concatenate([self.niveaux[niveau + 1], promues])
+
+    def _copie(self):
+        nouveau = copy.copy(self)
+        nouveau.niveaux = list(self.niveaux)
+        nouveau._resume = None
+        return nouveau
+
+    def ajouter(self, valeurs):
+        """Nouveau sketch incluant valeurs"""
+        valeurs = _valeurs_finies(valeurs)
+        nouveau = self._copie()
+        nouveau.niveaux[0] = np.concatenate([self.niveaux[0], valeurs])
+        nouveau.n = self.n + len(valeurs)
+        nouveau._compacter()
+        return nouveau
+
+    def fusionner(self, autre):
+        """Nouveau sketch résumant les valeurs des deux résumés"""
+        if isinstance(autre, QuantilesExacts):
+            return self.ajouter(autre.valeurs())
+        nouveau = self._copie()
+        nouveau.k = min(self.k, autre.k)
+        for niveau, valeurs in enumerate(autre.niveaux):
+            if niveau == len(nouveau.niveaux):
+                nouveau.niveaux.append(np.empty(0))
+            nouveau.niveaux[niveau] = np.concatenate([nouveau.niveaux[niveau], valeurs])
+        nouveau.n = self.n + autre.n
+        nouveau._compacter()
+        return nouveau
+
+    def resume(self):
+        """Valeurs retenues triées et leurs poids cumulés (calculés une fois)"""
+        if self._resume is None:
+            valeurs = np.concatenate(self.niveaux)
+            poids = np.concatenate([np.full(len(v), 2.0 ** h) for h, v in enumerate(self.niveaux)])
+            ordre = np.argsort(valeurs, kind='stable')
+            self._resume = valeurs[ordre], np.cumsum(poids[ordre])
+        return self._resume
+
+    def quantile(self, q):
+        """Quantile(s) estimé(s) : erreur de rang au plus erreur_rang"""
+        if self.n == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else np.nan
+        valeurs, cumul = self.resume()
+        rangs = np.searchsorted(cumul, np.asarray(q) * cumul[-1], side='left')
+        return valeurs[np.minimum(rangs, len(valeurs) - 1)]
+
+
+def creer_quantiles(valeurs=(), mode='auto', k=200):
+    """
+    Résumé de quantiles selon le mode : 'exact' (toutes les valeurs),
+    'kll' (sketch) ou 'auto' (exact jusqu'à LIMITE_EXACTE valeurs, limite
+    appliquée dès la création : un chargement complet au-delà donne
+    directement un sketch, sans bascule au premier lot ajouté).
+    """
+    if mode == 'kll':
+        return SketchKLL(k).ajouter(valeurs)
+    if mode == 'exact':
+        return QuantilesExacts(valeurs)
+    if mode == 'auto':
+        return QuantilesExacts(valeurs, limite=LIMITE_EXACTE, k=k)._borner()
+    raise ValueError(f"Mode de quantiles inconnu : {mode}")
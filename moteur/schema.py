@@ -0,0 +1,83 @@
+"""
+Schéma typé des classeurs
+Chaque classeur déclare le type de ses colonnes : dimensions catégorielles,
+date, montant et mesures numériques. Le schéma est vérifié puis appliqué une
+fois, à la conversion vers le cache colonnaire (le fichier Feather conserve
+les catégories) : les colonnes catégorielles sont stockées en codes entiers
+avec des catégories triées, donc les mêmes codes à chaque conversion, et
+les calculs travaillent directement sur ces codes (codes_categories).
+"""
+
+import pandas as pd
+
+CATEGORIE = 'categorie'
+DATE = 'date'
+MONTANT = 'montant'
+NUMERIQUE = 'numerique'
+
+# Exercice 1 : data_kpi.xlsx
+SCHEMA_KPI = {
+    'ID_Client': CATEGORIE,
+    'Montant_Transaction': MONTANT,
+    'Date_Transaction': DATE,
+    'Categorie_Produit': CATEGORIE,
+    'Mode_Paiement': CATEGORIE,
+}
+
+# Exercice 2 : data_dashboard_large.xlsx
+SCHEMA_VENTES = {
+    'ID_Client': CATEGORIE,
+    'Date_Transaction': DATE,
+    'Montant': MONTANT,
+    'Magasin': CATEGORIE,
+    'Categorie_Produit': CATEGORIE,
+    'Quantite': NUMERIQUE,
+    'Mode_Paiement': CATEGORIE,
+    'Satisfaction_Client': NUMERIQUE,
+}
+
+
+def valider(df, schema, nom='données'):
+    """
+    Vérifie que les colonnes déclarées sont présentes et, après nettoyage,
+    du type attendu (ValueError sinon)
+    """
+    manquantes = [colonne for colonne in schema if colonne not in df.columns]
+    if manquantes:
+        raise ValueError(f"Colonne(s) manquante(s) dans {nom} : {', '.join(manquantes)}")
+    erreurs = []
+    for colonne, type_colonne in schema.items():
+        dtype = df[colonne].dtype
+        if type_colonne == DATE and not pd.api.types.is_datetime64_any_dtype(dtype):
+            erreurs.append(f"{colonne} (date attendue, {dtype} trouvé)")
+        elif type_colonne in (MONTANT, NUMERIQUE) and (
+                not pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_bool_dtype(dtype)):
+            erreurs.append(f"{colonne} (nombre attendu, {dtype} trouvé)")
+    if erreurs:
+        raise ValueError(f"Type de colonne invalide dans {nom} : {'; '.join(erreurs)}")
+
+
+def appliquer_schema(df, schema, nom='données'):
+    """
+    Valide df puis convertit en catégories les colonnes déclarées comme
+    telles. Renvoie (df, octets avant, octets après) pour ces colonnes.
+    """
+    valider(df, schema, nom)
+    colonnes = [colonne for colonne, type_colonne in schema.items()
+                if type_colonne == CATEGORIE and not isinstance(df[colonne].dtype, pd.CategoricalDtype)]
+    avant = int(df[colonnes].memory_usage(deep=True, index=False).sum())
+    for colonne in colonnes:
+        # Catégories triées : codes stables d'une conversion à l'autre
+        df[colonne] = df[colonne].astype('category')
+    apres = int(df[colonnes].memory_usage(deep=True, index=False).sum())
+    return df, avant, apres
+
+
+def codes_categories(valeurs):
+    """
+    Codes entiers (-1 : valeur manquante) et catégories triées d'une
+    colonne : lus directement si elle est catégorielle, sinon factorisés
+    """
+    if isinstance(valeurs.dtype, pd.CategoricalDtype):
+        return valeurs.cat.codes.to_numpy(), valeurs.cat.categories
+    return pd.factorize(valeurs, sort=True)
@@ -0,0 +1,80 @@
+"""
+Résolution adaptative des séries quotidiennes
+Au-delà d'un budget de points, une série par jour est agrégée par semaine
+ou par mois (sommes, 'periodes'), ou décimée par LTTB ('lttb' : Largest
+Triangle Three Buckets, Steinarsson 2013), qui garde la forme de la courbe
+avec des valeurs d'origine. Les jours sont en datetime64[D].
+"""
+
+import numpy as np
+
+METHODES = ('periodes', 'lttb')
+
+
+def choisir_resolution(nb_jours, budget):
+    """Plus fine résolution ('jour', 'semaine', 'mois') tenant dans le budget"""
+    if nb_jours <= budget:
+        return 'jour'
+    if nb_jours / 7 <= budget:
+        return 'semaine'
+    return 'mois'
+
+
+def agreger_periodes(jours, valeurs, resolution):
+    """Sommes par semaine (datée du lundi) ou par mois (datée du 1er)"""
+    if resolution == 'jour':
+        return jours, valeurs
+    if resolution == 'semaine':
+        # Le 1970-01-01 (ordinal 0) est un jeudi : décalage de 3 jours
+        ordinaux = jours.astype(np.int64)
+        debuts = ((ordinaux + 3) // 7 * 7 - 3).astype('datetime64[D]')
+    else:
+        debuts = jours.astype('datetime64[M]').astype('datetime64[D]')
+    periodes, codes = np.unique(debuts, return_inverse=True)
+    return periodes, np.bincount(codes, weights=valeurs, minlength=len(periodes))
+
+
+def lttb(x, y, nb_points):
+    """
+    Positions des nb_points points gardés par LTTB : le premier et le
+    dernier, puis dans chaque seau le point formant le plus grand triangle
+    avec le point gardé précédent et la moyenne du seau suivant
+    """
+    n = len(y)
+    if nb_points >= n or nb_points < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    bornes = np.linspace(1, n - 1, nb_points - 1).astype(np.int64)
+    garder = np.empty(nb_points, dtype=np.int64)
+    garder[0], garder[-1] = 0, n - 1
+    precedent = 0
+    for i in range(nb_points - 2):
+        debut, fin = bornes[i], bornes[i + 1]
+        suivant = slice(fin, bornes[i + 2]) if i + 2 < len(bornes) else slice(n - 1, n)
+        mx, my = x[suivant].mean(), y[suivant].mean()
+        aires = np.abs((x[precedent] - mx) * (y[debut:fin] - y[precedent])
+                       - (x[precedent] - x[debut:fin]) * (my - y[precedent]))
+        precedent = debut + int(np.argmax(aires))
+        garder[i + 1] = precedent
+    return garder
+
+
+def reduire_serie(jours, valeurs, budget, methode='periodes'):
+    """
+    Série par jour ramenée au budget de points. Renvoie (abscisses,
+    valeurs, résolution), résolution valant 'jour', 'semaine', 'mois' ou
+    'lttb'.
+    """
+    if methode not in METHODES:
+        raise ValueError(f"Méthode de réduction inconnue : {methode}")
+    if len(jours) == 0:
+        return jours, valeurs, 'jour'
+    if methode == 'lttb':
+        if len(jours) <= budget:
+            return jours, valeurs, 'jour'
+        garder = lttb(jours.astype(np.int64), valeurs, budget)
+        return jours[garder], valeurs[garder], 'lttb'
+    etendue = int((jours[-1] - jours[0]).astype(np.int64)) + 1
+    resolution = choisir_resolution(etendue, budget)
+    return (*agreger_periodes(jours, valeurs, resolution), resolution)
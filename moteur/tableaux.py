@@ -0,0 +1,170 @@
+"""
+Tableaux paginés côté serveur (DataTable en mode 'custom')
+Le navigateur n'envoie que la page demandée (page_current, page_size), le
+tri (sort_by) et le filtre saisi dans les en-têtes (filter_query) ; le
+serveur filtre les positions de lignes retenues par un MoteurFiltres, les
+trie avec les permutations pré-calculées du moteur et renvoie la seule
+page visible.
+"""
+
+import operator
+import re
+
+import numpy as np
+import pandas as pd
+
+# Opérateurs de filter_query (forme abrégée ou symbole) : un préfixe 'i' ou
+# 's' indique une comparaison insensible ou sensible à la casse
+MOTIF_CONDITION = re.compile(
+    r'^\{(?P<colonne>.+?)\}\s*(?P<casse>[is]?)'
+    r'(?P<operateur>contains|datestartswith|ge|le|lt|gt|ne|eq|>=|<=|!=|<|>|=)'
+    r'\s*(?P<valeur>.*?)\s*$'
+)
+SYMBOLES = {'>=': 'ge', '<=': 'le', '<': 'lt', '>': 'gt', '!=': 'ne', '=': 'eq'}
+COMPARAISONS = {'ge': operator.ge, 'le': operator.le, 'lt': operator.lt,
+                'gt': operator.gt, 'ne': operator.ne, 'eq': operator.eq}
+
+
+def _valeur(texte):
+    """Valeur d'une condition : chaîne entre guillemets, sinon nombre si possible"""
+    if len(texte) >= 2 and texte[0] == texte[-1] and texte[0] in '"\'`':
+        return re.sub(r'\\(.)', r'\1', texte[1:-1])
+    try:
+        return float(texte)
+    except ValueError:
+        return texte
+
+
+def analyser_filtre(filter_query):
+    """
+    Conditions (colonne, opérateur, valeur, insensible) d'un filter_query
+    de DataTable ; les parties non reconnues sont ignorées
+    """
+    conditions = []
+    for partie in (filter_query or '').split(' && '):
+        correspondance = MOTIF_CONDITION.match(partie.strip())
+        if correspondance is None:
+            continue
+        operateur = correspondance['operateur']
+        conditions.append((correspondance['colonne'], SYMBOLES.get(operateur, operateur),
+                           _valeur(correspondance['valeur']), correspondance['casse'] == 'i'))
+    return conditions
+
+
+def _comparer(valeurs, operateur, valeur, insensible):
+    """Masque des valeurs vérifiant la condition (None si elle est invalide)"""
+    if valeurs.dtype.kind == 'M':
+        try:
+            if operateur == 'datestartswith':
+                # '2024', '2024-12' ou '2024-12-01' : période couverte
+                periode = pd.Period(str(valeur))
+                debut, fin = periode.start_time, periode.end_time
+                return (valeurs >= np.datetime64(debut)) & (valeurs <= np.datetime64(fin))
+            valeur = np.datetime64(pd.Timestamp(str(valeur)))
+        except ValueError:
+            return None
+    elif operateur in ('contains', 'datestartswith'):
+        textes = valeurs.astype(str)
+        valeur = str(valeur)
+        if insensible:
+            textes, valeur = np.char.lower(textes), valeur.lower()
+        if operateur == 'contains':
+            return np.char.find(textes, valeur) >= 0
+        return np.char.startswith(textes, valeur)
+    elif valeurs.dtype.kind in 'biuf':
+        if isinstance(valeur, str):
+            return None
+    else:
+        valeurs, valeur = valeurs.astype(str), str(valeur)
+    if operateur not in COMPARAISONS:
+        return None
+    return COMPARAISONS[operateur](valeurs, valeur)
+
+
+def filtrer(moteur, indices, conditions):
+    """Positions (dans leur ordre) des lignes vérifiant toutes les conditions"""
+    for colonne, operateur, valeur, insensible in conditions:
+        if colonne not in moteur.colonnes or len(indices) == 0:
+            continue
+        masque = np.zeros(len(indices), dtype=bool)
+        for segment, retenues, positions in moteur.segments(indices):
+            serie = segment.df[colonne]
+            if isinstance(serie.dtype, pd.CategoricalDtype):
+                # Condition évaluée sur les catégories, puis lue par les codes
+                categories = _comparer(serie.cat.categories.to_numpy(), operateur, valeur, insensible)
+                if categories is None:
+                    break
+                masque[retenues] = np.append(categories, False)[serie.cat.codes.to_numpy()[positions]]
+            else:
+                masque_segment = _comparer(serie.to_numpy()[positions], operateur, valeur, insensible)
+                if masque_segment is None:
+                    break
+                masque[retenues] = masque_segment
+        else:
+            indices = indices[masque]
+    return indices
+
+
+def _cle_composee(moteur, indices, sort_by):
+    """
+    Clé entière de chaque ligne retenue : rangs des colonnes de tri puis
+    position (clés toutes distinctes) ; None si elle dépasse 62 bits
+    """
+    cle = np.zeros(len(indices), dtype=np.int64)
+    borne = 1
+    for colonne, decroissant in sort_by:
+        rangs = moteur.rangs_de(colonne, decroissant, indices)
+        etendue = int(rangs.max()) + 1
+        borne *= etendue
+        if borne * len(indices) >= 2 ** 62:
+            return None
+        cle = cle * etendue + rangs
+    return cle * len(indices) + np.arange(len(indices))
+
+
+def trier(moteur, indices, sort_by, limite=None):
+    """
+    Positions réordonnées selon sort_by ([{'column_id', 'direction'}]),
+    limitées aux limite premières. Avec une seule colonne et beaucoup de
+    lignes, la permutation de la colonne est parcourue et filtrée (index
+    sans segment d'ajouts) ; sinon seules les limite premières clés
+    composées sont triées (argpartition).
+    """
+    sort_by = [(tri['column_id'], tri['direction'] == 'desc') for tri in (sort_by or [])
+               if tri['column_id'] in moteur.colonnes]
+    if limite is None or limite > len(indices):
+        limite = len(indices)
+    if not sort_by or len(indices) < 2:
+        return indices[:limite]
+    nb_lignes = moteur.nb_lignes
+    permutation = None
+    if len(sort_by) == 1 and len(indices) * 16 >= nb_lignes:
+        permutation = moteur.permutation(*sort_by[0])
+    if permutation is not None:
+        retenues = np.zeros(nb_lignes, dtype=bool)
+        retenues[indices] = True
+        return permutation[retenues[permutation]][:limite]
+    cle = _cle_composee(moteur, indices, sort_by)
+    if cle is None:
+        # lexsort : la dernière clé est la clé principale
+        cles = [moteur.rangs_de(colonne, decroissant, indices) for colonne, decroissant in reversed(sort_by)]
+        return indices[np.lexsort(cles)][:limite]
+    if limite < len(indices):
+        premieres = np.argpartition(cle, limite - 1)[:limite]
+    else:
+        premieres = np.arange(len(indices))
+    return indices[premieres[np.argsort(cle[premieres])]]
+
+
+def page_serveur(moteur, indices, page_current, page_size, sort_by=None, filter_query=''):
+    """
+    Lignes (DataFrame) de la page demandée, après filtre et tri des
+    positions indices, et nombre total de lignes retenues
+    """
+    indices = filtrer(moteur, indices, analyser_filtre(filter_query))
+    nb_lignes = len(indices)
+    debut = (page_current or 0) * page_size
+    if debut >= nb_lignes:
+        debut = max(nb_lignes - 1, 0) // page_size * page_size
+    indices = trier(moteur, indices, sort_by, limite=debut + page_size)
+    return moteur.lignes(indices[debut:]), nb_lignes
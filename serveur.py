@@ -0,0 +1,91 @@
+"""
+Lancement de production des dashboards
+Sert app.server par gunicorn (plusieurs processus workers, plusieurs
+threads par worker) au lieu du serveur de développement de app.run
+(debug, rechargement automatique, un seul processus). Avec le
+préchargement, les données sont lues et préparées une fois dans le
+processus maître, avant le fork : les workers les partagent par copie sur
+écriture au lieu de les recharger chacun. Les réponses sont compressées
+par les dashboards eux-mêmes (moteur.compression : brotli ou gzip).
+
+Usage : python serveur.py exercice1|exercice2 [--workers 2] [--threads 4]
+        [--port 8050] [--hote 0.0.0.0] [--sans-compression] [--timeout 120]
+Workers et port par défaut : WEB_CONCURRENCY et PORT (hébergeurs), sinon
+nombre de CPU et port du script.
+"""
+
+import argparse
+import importlib
+import os
+
+from gunicorn.app.base import BaseApplication
+
+from moteur.compression import compresseurs
+
+# Dashboard -> (module, port par défaut)
+DASHBOARDS = {
+    'exercice1': ('exercice1_dashboard_kpi', 8050),
+    'exercice2': ('exercice2_dashboard_style', 8051),
+}
+
+
+def charger_application(nom):
+    """
+    Importe le dashboard et charge ses données (préparées avant le fork
+    des workers), puis renvoie son serveur Flask
+    """
+    module = importlib.import_module(DASHBOARDS[nom][0])
+    module.source.obtenir()
+    return module.server
+
+
+class ServeurDashboard(BaseApplication):
+    """Application gunicorn configurée par dictionnaire (sans fichier de configuration)"""
+
+    def __init__(self, nom, options):
+        self.nom = nom
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for cle, valeur in self.options.items():
+            self.cfg.set(cle, valeur)
+
+    def load(self):
+        return charger_application(self.nom)
+
+
+def main(arguments=None):
+    parseur = argparse.ArgumentParser(description="Lancement de production des dashboards")
+    parseur.add_argument('dashboard', choices=DASHBOARDS)
+    parseur.add_argument('--workers', type=int,
+                         default=int(os.environ.get('WEB_CONCURRENCY') or os.cpu_count() or 1))
+    parseur.add_argument('--threads', type=int, default=4, help="threads par worker")
+    parseur.add_argument('--hote', default='0.0.0.0')
+    parseur.add_argument('--port', type=int, default=None)
+    parseur.add_argument('--timeout', type=int, default=120,
+                         help="durée maximale d'une requête (secondes)")
+    parseur.add_argument('--sans-compression', action='store_true',
+                         help="réponses non compressées (proxy qui compresse déjà)")
+    options = parseur.parse_args(arguments)
+
+    if options.sans_compression:
+        os.environ['DASHBOARD_COMPRESSION'] = 'aucune'
+    port = options.port or int(os.environ.get('PORT') or DASHBOARDS[options.dashboard][1])
+    encodages = [nom for nom, _ in compresseurs()]
+    print(f"🚀 {options.dashboard} sur http://{options.hote}:{port}/ : {options.workers} worker(s) "
+          f"× {options.threads} thread(s), compression "
+          f"{' puis '.join(encodages) or 'désactivée'}")
+    ServeurDashboard(options.dashboard, {
+        'bind': f'{options.hote}:{port}',
+        'workers': options.workers,
+        'threads': options.threads,
+        'worker_class': 'gthread' if options.threads > 1 else 'sync',
+        'preload_app': True,
+        'timeout': options.timeout,
+        'accesslog': '-' if os.environ.get('DASHBOARD_JOURNAL_ACCES') == '1' else None,
+    }).run()
+
+
+if __name__ == '__main__':
+    main()